@@ -1,18 +1,52 @@
+from datetime import datetime
+
 import streamlit as st
 
 # Import services
 from services.groq_client import get_groq_client, get_api_key
-from services.transcription_service import transcribe_audio
-from services.analysis_service import analyze_call
-from services.trend_service import analyze_trends
+from services.analysis_service import get_analysis_cache_stats, stream_call_analysis, stream_preview
+from services.ingestion_pipeline import DEFAULT_WORKERS as INGEST_WORKERS
+from services.ingestion_pipeline import IngestionResult, persistable_records, run_pipeline
+from services.request_scheduler import get_scheduler_stats
+from services.streaming import get_latency_stats
+from services.token_budget import get_compaction_stats
+from services.transcription_service import (
+    VAD_TRIM,
+    get_preprocess_stats,
+    get_transcript_cache_stats,
+    transcribe_audio,
+)
+from services.trend_service import stream_trends
+from services.job_queue import INGEST_MODE, JOB_STATUS_POLL_SECONDS
+from services.upload_ledger import (
+    collect_jobs,
+    enqueue_uploads,
+    forget,
+    get_ledger,
+    pending_jobs,
+    record_results,
+    stored_results,
+    upload_keys,
+)
 from data.repository import (
     database_exists, 
-    get_all_records, 
+    get_recent_records, 
     get_record_count, 
-    prepare_trend_summary, 
-    save_record
+    get_store_version, 
+    get_transcript, 
+    get_trend_summary, 
+    save_records
 )
 
+try:
+    # Only the S3 repository has a read cache
+    from data.repository import get_read_cache_stats
+except ImportError:
+    get_read_cache_stats = None
+
+# Rows shown in the "View Database" expander for the "All calls" scope
+VIEW_DATABASE_ROWS = 1000
+
 # ==================== PAGE CONFIG ====================
 st.set_page_config(
     page_title="AI Call Intelligence",
@@ -571,7 +605,7 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Initialize Groq client
+# Groq client (one per process, so reruns reuse its connection pool)
 try:
     client = get_groq_client()
     GROQ_API_KEY = get_api_key()
@@ -591,131 +625,358 @@ if not GROQ_API_KEY:
     st.error("⚠️ Please set your GROQ_API_KEY in the .env file")
     st.stop()
 
+# ==================== STORE READS ====================
+# Cached per store version: reruns reuse these until records are written
+@st.cache_data(show_spinner=False)
+def cached_store_overview(store_version):
+    """(store exists, record count) for a store version"""
+    if not database_exists():
+        return False, 0
+    return True, int(get_record_count())
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def cached_recent_records(n, store_version):
+    return get_recent_records(n).reset_index(drop=True)
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def cached_trend_summary(last_n, store_version):
+    return get_trend_summary(last_n)
+
+
 # ==================== SIDEBAR ====================
-st.sidebar.markdown("### Analytics")
-st.sidebar.markdown("")
-
-total_calls_metric = None
-base_record_count = 0
-
-if database_exists():
-    base_record_count = int(get_record_count())
-    total_calls_metric = st.sidebar.empty()
-    total_calls_metric.metric("Total Calls", base_record_count)
-    st.sidebar.markdown("")
-
-    trend_scope = st.sidebar.radio(
-        "Trend scope",
-        ["All calls", "Last N calls"],
-        index=0,
+# Each panel is a fragment: its widgets rerun only that panel, not the page
+@st.fragment
+def analytics_sidebar():
+    """Record count, trend controls and service stats"""
+    st.markdown("### Analytics")
+    st.markdown("")
+
+    store_exists, record_count = cached_store_overview(get_store_version())
+    if store_exists:
+        st.metric("Total Calls", record_count)
+        st.markdown("")
+
+        trend_scope = st.radio(
+            "Trend scope",
+            ["All calls", "Last N calls"],
+            index=0,
+        )
+        last_n = None
+        if trend_scope == "Last N calls":
+            # Initialize default value only once
+            if 'last_n_value' not in st.session_state:
+                st.session_state.last_n_value = min(20, record_count) if record_count > 0 else 1
+
+            last_n = st.number_input(
+                "N",
+                min_value=1,
+                max_value=max(1, record_count),
+                value=st.session_state.last_n_value,
+                step=1,
+                key="last_n_input"
+            )
+            st.session_state.last_n_value = last_n
+
+        if st.button("Analyze Trends", width="stretch", type="primary"):
+            # The trends are drawn by the trend panel, so this one needs a full rerun
+            st.session_state.trend_request = {"last_n": last_n}
+            st.rerun()
+    else:
+        st.info("No data yet")
+
+    transcript_cache_stats = get_transcript_cache_stats()
+    analysis_cache_stats = get_analysis_cache_stats()
+    st.caption(
+        f"Transcript cache: {transcript_cache_stats['hits']} hits / "
+        f"{transcript_cache_stats['misses']} misses  \n"
+        f"Analysis cache: {analysis_cache_stats['hits']} hits / "
+        f"{analysis_cache_stats['misses']} misses"
     )
-    last_n = None
-    if trend_scope == "Last N calls":
-        # Initialize default value only once
-        if 'last_n_value' not in st.session_state:
-            st.session_state.last_n_value = min(20, int(base_record_count)) if int(base_record_count) > 0 else 1
-        
-        last_n = st.sidebar.number_input(
-            "N",
-            min_value=1,
-            max_value=max(1, int(base_record_count)),
-            value=st.session_state.last_n_value,
-            step=1,
-            key="last_n_input"
+    if get_read_cache_stats is not None:
+        read_cache_stats = get_read_cache_stats()
+        st.caption(
+            f"S3 read cache: {read_cache_stats['hits']} hits / {read_cache_stats['misses']} misses, "
+            f"{read_cache_stats['bytes_saved'] / (1024 * 1024):.1f} MB not downloaded"
+        )
+    preprocess_stats = get_preprocess_stats()
+    if preprocess_stats["applied"]:
+        st.caption(
+            f"Audio preprocessing: {preprocess_stats['bytes_in'] / (1024 * 1024):.1f} MB → "
+            f"{preprocess_stats['bytes_out'] / (1024 * 1024):.1f} MB uploaded "
+            f"({preprocess_stats['applied']} of {preprocess_stats['files']} files), "
+            f"~{preprocess_stats['upload_seconds_saved']:.0f}s upload saved"
+        )
+    if preprocess_stats["trimmed"]:
+        st.caption(
+            f"Silence trimming: {preprocess_stats['removed_seconds'] / 60:.1f} of "
+            f"{preprocess_stats['audio_seconds'] / 60:.1f} audio minutes cut "
+            f"({preprocess_stats['trimmed']} files)"
+        )
+    for label, latency_stats in get_latency_stats().items():
+        st.caption(
+            f"{label.replace('_', ' ').capitalize()}: first token p50 {latency_stats['ttft_p50']:.1f}s, "
+            f"total p50 {latency_stats['total_p50']:.1f}s ({latency_stats['count']} calls)"
         )
-        st.session_state.last_n_value = last_n
-    
-    if st.sidebar.button("Analyze Trends", width="stretch", type="primary"):
-        df = get_all_records()
-        df_for_trends = df
-        if last_n is not None:
-            df_for_trends = df.tail(int(last_n))
-
-        summary = prepare_trend_summary(df_for_trends)
-        
-        with st.spinner("Analyzing..."):
-            trend_analysis = analyze_trends(client, summary)
-        
+    for label, compaction_stats in get_compaction_stats().items():
+        if compaction_stats["compacted"]:
+            st.caption(
+                f"{label.replace('_', ' ').capitalize()} prompts: {compaction_stats['saved_per_request']:,.0f} "
+                f"tokens saved per request ({compaction_stats['compacted']} of {compaction_stats['requests']} compacted)"
+            )
+    for model, scheduler_stats in get_scheduler_stats().items():
+        st.caption(
+            f"{model}: {scheduler_stats['queued']} queued, {scheduler_stats['in_flight']} in flight, "
+            f"wait p95 {scheduler_stats['wait_p95']:.1f}s, {scheduler_stats['rate_limited']} rate limited"
+        )
+
+    st.markdown("---")
+
+
+with st.sidebar:
+    analytics_sidebar()
+
+# ==================== TRENDS ====================
+@st.fragment
+def trend_panel():
+    """Streams a requested trend analysis; keeps the last one and the database view"""
+    store_version = get_store_version()
+    trend_request = st.session_state.pop("trend_request", None)
+    if trend_request is not None:
+        summary = cached_trend_summary(trend_request["last_n"], store_version)
+
         st.markdown("### Trends & Insights")
-        st.markdown(trend_analysis)
-        
-        with st.expander("View Database"):
-            st.dataframe(df_for_trends, width="stretch", height=300)
-else:
-    st.sidebar.info("No data yet")
+        trend_stream = stream_trends(client, summary)
+        st.write_stream(trend_stream)
+        st.caption(
+            f"First token after {trend_stream.ttft_seconds:.1f}s, complete after {trend_stream.total_seconds:.1f}s"
+        )
+        # Kept across reruns so picking a transcript below doesn't clear it
+        st.session_state.trend_view = {"analysis": trend_stream.text, "last_n": trend_request["last_n"]}
 
-st.sidebar.markdown("---")
+    trend_view = st.session_state.get("trend_view")
+    if trend_view is None:
+        return
+    if trend_request is None:
+        st.markdown("### Trends & Insights")
+        st.markdown(trend_view["analysis"])
+
+    with st.expander("View Database"):
+        _, record_count = cached_store_overview(store_version)
+        view_last_n = trend_view["last_n"]
+        view_rows = int(view_last_n) if view_last_n is not None else VIEW_DATABASE_ROWS
+        if view_last_n is None and record_count > view_rows:
+            st.caption(f"Showing the most recent {view_rows:,} of {record_count:,} calls")
+        view_records = cached_recent_records(view_rows, store_version)
+        st.dataframe(
+            view_records.drop(columns=["Transcript"], errors="ignore"),
+            width="stretch",
+            height=300,
+        )
+
+        # Transcripts are stored separately; fetch only the one asked for
+        selected_row = st.selectbox(
+            "Show transcript",
+            options=[None] + list(reversed(view_records.index)),
+            format_func=lambda i: "Select a call" if i is None else (
+                f"{view_records.at[i, 'Date']} — {view_records.at[i, 'File Name']}"
+            ),
+        )
+        if selected_row is not None:
+            transcript = view_records.at[selected_row, "Transcript"]
+            if not isinstance(transcript, str) and "Record ID" in view_records.columns:
+                transcript = get_transcript(view_records.at[selected_row, "Record ID"])
+            st.text(transcript if isinstance(transcript, str) else "Transcript not available")
+
+
+trend_panel()
 
 # ==================== MAIN ====================
-uploaded_files = st.file_uploader(
-    "Upload audio files",
-    type=["mp3", "wav", "m4a", "flac", "mpeg", "mpga", "mp4"],
-    accept_multiple_files=True,
-    help="Support for MP3, WAV, M4A, FLAC, MPEG • Max 25MB"
-)
+def render_result(result, total, note=None):
+    """Show one file's transcript, analysis and error under its name"""
+    st.markdown(f"#### {result.filename}")
+    st.caption(note or f"File {result.index} of {total}")
+    if result.transcript is not None:
+        st.success("Transcription complete")
+        with st.expander("Transcript", expanded=False):
+            st.text(result.transcript)
+    if result.analysis is not None:
+        st.success("Analysis complete")
+        st.markdown(result.analysis.to_markdown())
+    if not result.ok:
+        st.error(result.error)
+
+
+@st.fragment
+def ingestion_panel():
+    """Upload, transcribe, analyze and save audio files"""
+    trim_silence = st.toggle(
+        "Trim silence and hold music",
+        value=VAD_TRIM,
+        key="trim_silence",
+        help="Cut non-speech out of the next uploads before transcription: "
+             "fewer billed audio seconds and no text invented over hold music",
+    )
+    uploaded_files = st.file_uploader(
+        "Upload audio files",
+        type=["mp3", "wav", "m4a", "flac", "mpeg", "mpga", "mp4"],
+        accept_multiple_files=True,
+        help="Support for MP3, WAV, M4A, FLAC, MPEG • Files over 25MB are transcribed in chunks"
+    )
+
+    if uploaded_files:
+        # Reruns (any widget interaction) keep the uploads: finished ones are
+        # rendered from the ledger, and audio already in the store is not saved again
+        keys = upload_keys(st.session_state, uploaded_files)
+        reprocess = st.button(
+            "Reprocess uploaded files",
+            help="Transcribe and analyze these files again without cached results, and save new records",
+        )
+        if reprocess:
+            forget(st.session_state, keys)
+        ledger = get_ledger(st.session_state)
+        known = {key: ledger[key] for key in keys if key in ledger}
+        if not reprocess and len(known) < len(keys):
+            unseen = [(key, f.name) for key, f in zip(keys, uploaded_files) if key not in known]
+            from_store = stored_results([key for key, _ in unseen], [name for _, name in unseen])
+            record_results(st.session_state, from_store)
+            known.update(from_store)
+
+        todo = [i for i, key in enumerate(keys) if key not in known]
+        for i, key in enumerate(keys):
+            if key in known:
+                result = known[key]
+                result.index = i + 1
+                if i:
+                    st.divider()
+                saved = f"saved {result.saved_at:%Y-%m-%d %H:%M}" if result.saved_at is not None else "not saved"
+                render_result(result, len(keys), note=f"File {i + 1} of {len(keys)} · already processed, {saved}")
+
+        if todo and INGEST_MODE == "queue":
+            # Job workers (python -m services.job_worker) do the work; job_status_panel polls it
+            enqueue_uploads(
+                st.session_state, [keys[i] for i in todo], [uploaded_files[i] for i in todo],
+                use_cache=not reprocess, trim_silence=trim_silence,
+            )
+            st.info(
+                f"Queued {len(todo)} file(s) for background processing. "
+                "Results are saved even if you close this tab."
+            )
+        elif todo:
+            progress_bar = st.progress(0)
+            files = [(uploaded_files[i].name, uploaded_files[i].getvalue()) for i in todo]
+            use_cache = not reprocess
+            finished = []
+
+            if len(files) == 1:
+                # A single file: stream the analysis as it is generated instead of waiting for all of it
+                filename, audio_bytes = files[0]
+                result = IngestionResult(todo[0] + 1, filename, audio_hash=keys[todo[0]][1])
+                if known:
+                    st.divider()
+                st.markdown(f"#### {filename}")
+                try:
+                    with st.spinner("Transcribing..."):
+                        result.transcript = transcribe_audio(
+                            client, audio_bytes, filename, use_cache=use_cache, trim_silence=trim_silence
+                        )
+                    st.success("Transcription complete")
+                    with st.expander("Transcript", expanded=False):
+                        st.text(result.transcript)
+
+                    analysis_stream = stream_call_analysis(client, result.transcript, use_cache=use_cache)
+                    analysis_view = st.empty()
+                    with analysis_view.container():
+                        st.write_stream(stream_preview(analysis_stream))
+                    result.analysis = analysis_stream.result
+                    analysis_view.markdown(result.analysis.to_markdown())
+                    st.success("Analysis complete")
+                    if analysis_stream.ttft_seconds is not None:
+                        st.caption(
+                            f"First token after {analysis_stream.ttft_seconds:.1f}s, "
+                            f"complete after {analysis_stream.total_seconds:.1f}s"
+                        )
+                except Exception as e:
+                    result.error = str(e)
+                    st.error(result.error)
+                finished.append(result)
+                progress_bar.progress(1.0)
+
+            # Files stream in as they finish; all successful rows are saved in one write
+            pipeline_files = files if len(files) > 1 else []
+            for result in run_pipeline(
+                client, pipeline_files, workers=INGEST_WORKERS, use_cache=use_cache, trim_silence=trim_silence
+            ):
+                result.index = todo[result.index - 1] + 1
+                finished.append(result)
+                progress_bar.progress(len(finished) / len(files))
+                if known or len(finished) > 1:
+                    st.divider()
+                render_result(result, len(keys))
+
+            progress_bar.empty()
+
+            records = persistable_records(finished)
+            saved = True
+            if records:
+                saved, error = save_records(records)
+                if saved:
+                    st.session_state.upload_notice = f"Saved {len(records)} record(s) to database"
+                else:
+                    st.warning(error)
+            if saved:
+                # A failed save is retried on the next rerun; cached results make that cheap
+                now = datetime.now()
+                for result in finished:
+                    if result.ok:
+                        result.saved_at = now
+                record_results(st.session_state, {keys[result.index - 1]: result for result in finished})
+                if records:
+                    # Refresh the sidebar count and trend controls; the ledger redraws these results
+                    st.rerun()
+
+        notice = st.session_state.pop("upload_notice", None)
+        if notice:
+            st.success(notice, icon="✅")
+        if not todo or INGEST_MODE != "queue":
+            st.success(f"Processed {len(uploaded_files)} file(s)")
+    else:
+        with st.container():
+            st.markdown("""
+            <div style="
+                background-color: white;
+                padding: 1rem;
+                border-radius: 10px;
+                border: 1px solid #e0e0e0;
+                color: black;
+            ">
+                Upload call recordings to begin analysis
+            </div>
+            """, unsafe_allow_html=True)
+
+
+ingestion_panel()
+
+
+@st.fragment(run_every=JOB_STATUS_POLL_SECONDS)
+def job_status_panel():
+    """Progress of queued uploads; finished ones are drawn by the upload panel"""
+    if not pending_jobs(st.session_state):
+        return
+    finished, running = collect_jobs(st.session_state)
+    if finished:
+        # Redraw the upload panel from the ledger and refresh the sidebar count
+        st.rerun()
+    st.markdown("#### Background processing")
+    for job in running.values():
+        attempt = f", attempt {job.attempts} of {job.max_attempts}" if job.attempts else ""
+        last_error = f" · last error: {job.error}" if job.error else ""
+        st.caption(f"{job.filename}: {job.status}{attempt}{last_error}")
+
 
-if uploaded_files:
-    progress_bar = st.progress(0)
-    saved_this_run = 0
-    
-    for idx, audio_file in enumerate(uploaded_files, 1):
-        progress_bar.progress(idx / len(uploaded_files))
-        
-        st.markdown(f"#### {audio_file.name}")
-        st.caption(f"File {idx} of {len(uploaded_files)}")
-        
-        # Transcription
-        try:
-            with st.spinner("Transcribing..."):
-                transcript = transcribe_audio(client, audio_file.read(), audio_file.name)
-
-            st.success("Transcription complete")
-            with st.expander("Transcript", expanded=False):
-                st.text(transcript)
-        except Exception as e:
-            st.error(str(e))
-            continue
-        
-        # Analysis
-        try:
-            with st.spinner("Analyzing..."):
-                analysis = analyze_call(client, transcript)
-
-            st.success("Analysis complete")
-            st.markdown(analysis)
-        except Exception as e:
-            st.error(str(e))
-            continue
-        
-        # Save
-        success, error = save_record(audio_file.name, transcript, analysis)
-        if success:
-            st.success("Saved to database", icon="✅")
-            saved_this_run += 1
-            if total_calls_metric is not None:
-                total_calls_metric.metric("Total Calls", base_record_count + saved_this_run)
-        else:
-            st.warning(error)
-        
-        if idx < len(uploaded_files):
-            st.divider()
-    
-    progress_bar.empty()
-    st.success(f"Processed {len(uploaded_files)} file(s)")
-
-else:
-    with st.container():
-        st.markdown("""
-        <div style="
-            background-color: white;
-            padding: 1rem;
-            border-radius: 10px;
-            border: 1px solid #e0e0e0;
-            color: black;
-        ">
-            Upload call recordings to begin analysis
-        </div>
-        """, unsafe_allow_html=True)
+if INGEST_MODE == "queue":
+    job_status_panel()
 
 # Footer
 st.divider()
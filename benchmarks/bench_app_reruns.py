@@ -0,0 +1,190 @@
+"""Rerun latency per UI interaction, measured with Streamlit's AppTest
+
+Usage:
+    python -m benchmarks.bench_app_reruns [--records 5000] [--repeats 5]
+
+Runs app.py headlessly against a temporary SQLite store of synthetic records
+and the offline FakeGroq client, then times each interaction: the first
+load, a plain rerun, switching the trend scope, changing N, analyzing
+trends and picking a transcript in the database view.
+
+AppTest always reruns the whole script, so "page s" is what an interaction
+would cost without fragments. Every st.fragment body is timed as it runs;
+for an interaction whose widget lives in a fragment, "fragment s" is the
+time of that fragment alone, which is all a browser session reruns. Store
+reads count record-store queries in that scope (cached reads are free).
+"""
+import argparse
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+STORE_READS = ("get_record_count", "get_recent_records", "get_trend_summary", "get_all_records")
+# Fragment that reruns for each interaction in a browser (None: the whole page)
+INTERACTION_SCOPES = {
+    "first load": None,
+    "plain rerun": None,
+    "trend scope -> last N": "analytics_sidebar",
+    "change N": "analytics_sidebar",
+    "analyze trends": None,
+    "pick transcript": "trend_panel",
+}
+
+
+def _app():
+    # AppTest runs this function's source on its own, so it imports what it uses.
+    # Page runs are counted here; fragment reruns skip it.
+    import functools
+    import os
+    import time
+
+    import streamlit as st
+
+    import services.groq_client as groq_client
+    from services.fake_groq_client import FakeGroq
+
+    if "page_runs" not in st.session_state:
+        # Each AppTest session starts with cold store caches
+        st.cache_data.clear()
+    st.session_state.page_runs = st.session_state.get("page_runs", 0) + 1
+    st.session_state.store_reads = st.session_state.get("store_reads", 0)
+    st.session_state.fragment_runs = {}
+    fragment = getattr(st.fragment, "__wrapped__", st.fragment)
+
+    def timed_fragment(func=None, **kwargs):
+        if func is None:
+            return functools.partial(timed_fragment, **kwargs)
+
+        @functools.wraps(func)
+        def timed(*args, **inner_kwargs):
+            start, reads = time.perf_counter(), st.session_state.store_reads
+            try:
+                return func(*args, **inner_kwargs)
+            finally:
+                st.session_state.fragment_runs[func.__name__] = (
+                    time.perf_counter() - start, st.session_state.store_reads - reads
+                )
+
+        return fragment(timed, **kwargs)
+
+    timed_fragment.__wrapped__ = fragment
+    st.fragment = timed_fragment
+    if "fake_client" not in st.session_state:
+        st.session_state.fake_client = FakeGroq(
+            transcribe_latency=0, completion_latency=0.05, first_token_latency=0.02
+        )
+    groq_client.get_groq_client = lambda: st.session_state.fake_client
+    groq_client.get_api_key = lambda: "offline"
+    with open(os.environ["BENCH_APP_PATH"], encoding="utf-8") as f:
+        exec(compile(f.read(), "app.py", "exec"), {"__name__": "__main__"})
+
+
+def _seed_store(workdir, n):
+    os.environ["RECORD_DB_FILE"] = os.path.join(workdir, "records.db")
+    os.environ["TRANSCRIPT_BLOB_DIR"] = os.path.join(workdir, "transcripts")
+    os.environ["RESULT_CACHE_DIR"] = os.path.join(workdir, "cache")
+    from data import excel_store, repository
+
+    # No legacy workbook to import into the temporary store
+    excel_store.EXCEL_FILE = os.path.join(workdir, "none.xlsx")
+    from services.fake_groq_client import FAKE_ANALYSIS
+    from data.models import CallAnalysis
+
+    analysis = CallAnalysis.from_json(FAKE_ANALYSIS)
+    records = [(f"call_{i}.mp3", "Customer called about a billing issue.", analysis) for i in range(n)]
+    for start in range(0, n, 1000):
+        ok, error = repository.save_records(records[start:start + 1000])
+        if not ok:
+            raise RuntimeError(error)
+    return repository
+
+
+def _count_store_reads(repository):
+    """Count record-store queries made by the app in session state"""
+    import streamlit as st
+
+    for name in STORE_READS:
+        original = getattr(repository, name)
+
+        def counted(*args, _original=original, **kwargs):
+            st.session_state.store_reads += 1
+            return _original(*args, **kwargs)
+
+        setattr(repository, name, counted)
+
+
+def _measure(interactions, repeats):
+    from streamlit.testing.v1 import AppTest
+
+    context_logger = logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context")
+
+    page_seconds = {name: [] for name, _ in interactions}
+    scope_seconds = {name: [] for name, _ in interactions}
+    scope_reads = {}
+    for _ in range(repeats):
+        # AppTest sets up session state outside a script run, which Streamlit
+        # warns about; each run resets the level, so set it every time
+        context_logger.setLevel(logging.ERROR)
+        at = AppTest.from_function(_app, default_timeout=120)
+        for name, interact in interactions:
+            reads_before = at.session_state["store_reads"] if "store_reads" in at.session_state else 0
+            start = time.perf_counter()
+            interact(at)
+            page_seconds[name].append(time.perf_counter() - start)
+            if at.exception:
+                raise RuntimeError(f"{name}: {at.exception[0].message}")
+            scope = INTERACTION_SCOPES[name]
+            if scope is None:
+                scope_seconds[name].append(page_seconds[name][-1])
+                scope_reads[name] = at.session_state["store_reads"] - reads_before
+            else:
+                seconds, reads = at.session_state["fragment_runs"][scope]
+                scope_seconds[name].append(seconds)
+                scope_reads[name] = reads
+    return [
+        (
+            name,
+            statistics.median(page_seconds[name]),
+            INTERACTION_SCOPES[name] or "page",
+            statistics.median(scope_seconds[name]),
+            scope_reads[name],
+        )
+        for name, _ in interactions
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rerun latency per UI interaction")
+    parser.add_argument("--records", type=int, default=5000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="bench_app_reruns_")
+    repository = _seed_store(workdir, args.records)
+    _count_store_reads(repository)
+    os.environ["BENCH_APP_PATH"] = APP_PATH
+
+    def pick_transcript(at):
+        box = next(s for s in at.selectbox if s.label == "Show transcript")
+        box.select(box.options[1]).run()
+
+    interactions = [
+        ("first load", lambda at: at.run()),
+        ("plain rerun", lambda at: at.run()),
+        ("trend scope -> last N", lambda at: at.radio[0].set_value("Last N calls").run()),
+        ("change N", lambda at: at.number_input(key="last_n_input").set_value(50).run()),
+        ("analyze trends", lambda at: next(b for b in at.button if b.label == "Analyze Trends").click().run()),
+        ("pick transcript", pick_transcript),
+    ]
+    print(f"{args.records:,} records, median of {args.repeats} runs")
+    print(f"{'interaction':<24} {'page s':>8}  {'reruns':<18} {'fragment s':>10} {'store reads':>11}")
+    for name, page, scope, seconds, reads in _measure(interactions, args.repeats):
+        fragment = "-" if scope == "page" else f"{seconds:.3f}"
+        print(f"{name:<24} {page:>8.3f}  {scope:<18} {fragment:>10} {reads:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Upload size and preprocessing time of audio preprocessing, per codec
+
+Usage:
+    python -m benchmarks.bench_audio_preprocess [--minutes 10] [--rate 44100] [--channels 2]
+
+Builds a synthetic call recording as a 16-bit WAV (voiced segments made of
+harmonics of a wandering pitch, with pauses and a little line noise) and
+runs preprocess_audio on it for each codec. Prints bytes before and after,
+the preprocessing time, whether the result fits in a single Whisper upload,
+and the upload time saved at --mbps (net of preprocessing time).
+"""
+import argparse
+import os
+
+import numpy as np
+
+from services.audio_processing import encode_wav
+
+
+def _synthetic_call(minutes, rate, channels, seed=7):
+    rng = np.random.default_rng(seed)
+    frames = int(minutes * 60 * rate)
+    t = np.arange(frames) / rate
+    # Pitch drifts between speakers' ranges; syllables every ~0.2 s
+    pitch = 150 + 60 * np.sin(2 * np.pi * 0.05 * t) + 20 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / rate
+    voice = sum(np.sin(k * phase) / k for k in range(1, 12))
+    syllables = np.clip(np.sin(2 * np.pi * 2.5 * t), 0, None)
+    # Pauses between turns: about a third of the call is silent
+    turns = (np.sin(2 * np.pi * t / 9) > -0.5).astype(np.float64)
+    mono = 0.25 * voice * syllables * turns + 0.003 * rng.standard_normal(frames)
+    stereo = np.stack([mono * (1.0 - 0.3 * c) for c in range(channels)], axis=1)
+    return encode_wav(np.clip(stereo * 32767, -32768, 32767).astype(np.int16), rate)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Audio preprocessing size/time benchmark")
+    parser.add_argument("--minutes", type=float, default=10)
+    parser.add_argument("--rate", type=int, default=44100)
+    parser.add_argument("--channels", type=int, default=2)
+    parser.add_argument("--codecs", nargs="+", default=["wav", "flac", "opus"])
+    parser.add_argument("--mbps", type=float, default=20, help="Upload bandwidth for the time-saved estimate")
+    args = parser.parse_args(argv)
+
+    os.environ["AUDIO_UPLOAD_MBPS"] = str(args.mbps)
+    from services.transcription_service import MAX_UPLOAD_BYTES, preprocess_audio
+
+    audio = _synthetic_call(args.minutes, args.rate, args.channels)
+    print(
+        f"{args.minutes:g} min, {args.rate} Hz, {args.channels} channel(s): {len(audio) / 1e6:.1f} MB WAV "
+        f"({'fits' if len(audio) <= MAX_UPLOAD_BYTES else 'over'} the 25 MB limit), {args.mbps:g} Mbit/s upload"
+    )
+    print(f"{'codec':<6} {'MB out':>8} {'ratio':>7} {'prep s':>7} {'one upload':>10} {'upload s saved':>15}")
+    for codec in args.codecs:
+        try:
+            data, _, report = preprocess_audio(audio, "call.wav", codec=codec)
+        except ImportError as e:
+            print(f"{codec:<6} skipped: {e}")
+            continue
+        print(
+            f"{codec:<6} {report.bytes_out / 1e6:>8.2f} {report.bytes_in / report.bytes_out:>6.1f}x "
+            f"{report.seconds:>7.2f} {'yes' if len(data) <= MAX_UPLOAD_BYTES else 'no':>10} "
+            f"{report.upload_seconds_saved:>15.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Tokens per call and calls per second: one analysis per request vs. packed requests
+
+Usage:
+    python -m benchmarks.bench_batch_analysis [--batch-sizes 4 8] [--drop-every 0]
+
+Analyzes the short-call fixture set (benchmarks/fixtures/short_calls.json)
+with analyze_call, then with analyze_calls_batch at each batch size, using
+the offline FakeGroq client. Latency is modeled as a fixed per-request cost
+plus a per-generated-token cost. Token counts are estimated at about 4
+characters per token from the prompts sent and replies returned. Packing
+saves repeating the system prompt and field list for every call, and saves
+the fixed cost of each request. --drop-every N leaves every Nth call out of
+packed replies to exercise the single-call fallback.
+"""
+import argparse
+import json
+import os
+import re
+import tempfile
+import time
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "short_calls.json")
+CALL_HEADER = re.compile(r"^### Call (\d+)$", re.MULTILINE)
+
+
+def _responder(drop_every):
+    from services.fake_groq_client import FAKE_ANALYSIS
+
+    analysis = json.loads(FAKE_ANALYSIS)
+    dropped = {"count": 0}
+
+    def reply(messages):
+        numbers = [int(n) for n in CALL_HEADER.findall(messages[-1]["content"])]
+        if not numbers:
+            return FAKE_ANALYSIS
+        entries = []
+        for number in numbers:
+            if drop_every and number % drop_every == 0:
+                dropped["count"] += 1
+                continue
+            entries.append({"id": number, **analysis})
+        return json.dumps({"analyses": entries}, ensure_ascii=False)
+
+    return reply, dropped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Single vs packed call analysis")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[4, 8])
+    parser.add_argument("--request-latency", type=float, default=0.3, help="Fixed seconds per request")
+    parser.add_argument("--token-latency", type=float, default=0.002, help="Seconds per generated token")
+    parser.add_argument("--drop-every", type=int, default=0, help="Omit every Nth call from packed replies")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("RESULT_CACHE_DIR", tempfile.mkdtemp(prefix="bench_batch_"))
+    from services.analysis_service import analyze_call, analyze_calls_batch
+    from services.fake_groq_client import FakeGroq
+
+    with open(FIXTURES, encoding="utf-8") as f:
+        transcripts = [item["transcript"] for item in json.load(f)]
+
+    print(f"{len(transcripts)} fixture calls, {sum(map(len, transcripts)) // len(transcripts)} chars on average")
+    print(f"{'mode':<10} {'requests':>8} {'prompt/call':>11} {'reply/call':>10} {'tokens/call':>11} {'calls/s':>8}")
+
+    def run(label, analyze):
+        reply, dropped = _responder(args.drop_every)
+        client = FakeGroq(
+            completion_latency=args.request_latency, completion_text=reply, token_latency=args.token_latency
+        )
+        start = time.perf_counter()
+        results = analyze(client)
+        elapsed = time.perf_counter() - start
+        assert len(results) == len(transcripts) and all(r is not None for r in results)
+        n = len(transcripts)
+        print(
+            f"{label:<10} {client.calls['completions']:>8} {client.tokens['prompt'] / n:>11.0f} "
+            f"{client.tokens['completion'] / n:>10.0f} {(client.tokens['prompt'] + client.tokens['completion']) / n:>11.0f} "
+            f"{n / elapsed:>8.2f}" + (f"  ({dropped['count']} fell back)" if dropped["count"] else "")
+        )
+
+    run("single", lambda c: [analyze_call(c, t, use_cache=False) for t in transcripts])
+    for size in args.batch_sizes:
+        run(f"batch {size}", lambda c, size=size: analyze_calls_batch(c, transcripts, use_cache=False, max_batch=size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Prompt tokens saved by transcript compaction, per request
+
+Usage:
+    python -m benchmarks.bench_compaction [--budget 6000] [--long-minutes 90]
+
+Runs the short-call fixture set and three synthetic long calls through
+analyze_call with the offline FakeGroq client. One long call has hold-message
+loops, one is a 90-minute call that needs condensing, and one is the same
+call with no client available for condensing, so it is truncated instead.
+For each request it prints the transcript tokens before and after
+compaction and the stages applied. FakeGroq condenses a chunk by keeping
+its first sentences up to the requested length, which stands in for the
+LLM summary.
+"""
+import argparse
+import json
+import os
+import re
+import tempfile
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "short_calls.json")
+WORDS_REQUESTED = re.compile(r"at most (\d+) words")
+
+LINES = [
+    "Customer: I've been waiting for a refund on the cancelled order for three weeks now.",
+    "Agent: I understand, um, let me check the refund status for you.",
+    "Customer: Uh, every time I call I get told something different, you know, it's really frustrating.",
+    "Agent: The refund was issued on the twelfth but it, uh, bounced back from your old card.",
+    "Customer: So what happens now? I I need that money.",
+    "Agent: I can send it to your new card today, it takes two to three days.",
+]
+HOLD = "Thank you for holding. Your call is important to us. [Music] "
+
+
+def _long_call(minutes, hold_loops=0):
+    # Roughly 150 spoken words a minute
+    words_needed = minutes * 150
+    parts, words = [], 0
+    while words < words_needed:
+        line = LINES[len(parts) % len(LINES)]
+        parts.append(line)
+        words += len(line.split())
+        if hold_loops and len(parts) % 30 == 0:
+            parts.append(HOLD * hold_loops)
+    return " ".join(parts)
+
+
+def _condense(messages):
+    content = messages[-1]["content"]
+    match = WORDS_REQUESTED.search(content)
+    if not match:
+        from services.fake_groq_client import FAKE_ANALYSIS
+
+        return FAKE_ANALYSIS
+    chunk = content.split("\n\n", 1)[1]
+    return " ".join(chunk.split()[: int(match.group(1))])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tokens saved by prompt compaction")
+    parser.add_argument("--budget", type=int, default=None, help="ANALYSIS_TOKEN_BUDGET override")
+    parser.add_argument("--long-minutes", type=int, default=90)
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("RESULT_CACHE_DIR", tempfile.mkdtemp(prefix="bench_compaction_"))
+    if args.budget:
+        os.environ["ANALYSIS_TOKEN_BUDGET"] = str(args.budget)
+    from services import token_budget
+    from services.fake_groq_client import FakeGroq
+
+    client = FakeGroq(transcribe_latency=0, completion_latency=0, completion_text=_condense)
+    with open(FIXTURES, encoding="utf-8") as f:
+        cases = [(item["id"], item["transcript"], client) for item in json.load(f)]
+    cases += [
+        ("long_with_hold_loops", _long_call(20, hold_loops=12), client),
+        (f"long_{args.long_minutes}min", _long_call(args.long_minutes), client),
+        (f"long_{args.long_minutes}min_no_client", _long_call(args.long_minutes), None),
+    ]
+
+    tokenizer = "tiktoken cl100k_base" if token_budget._tiktoken_encoding() else "regex estimate"
+    print(f"budget {token_budget.ANALYSIS_TOKEN_BUDGET} tokens, counts from {tokenizer}")
+    print(f"{'request':<30} {'before':>8} {'after':>8} {'saved':>8} {'saved %':>8}  stages")
+    total_before = total_after = 0
+    for name, transcript, case_client in cases:
+        _, report = token_budget.compact_transcript(transcript, client=case_client, label="bench")
+        total_before += report.original_tokens
+        total_after += report.tokens
+        print(
+            f"{name:<30} {report.original_tokens:>8} {report.tokens:>8} {report.saved_tokens:>8} "
+            f"{100 * report.saved_tokens / max(1, report.original_tokens):>7.1f}%  {', '.join(report.steps)}"
+        )
+    print(f"{'total':<30} {total_before:>8} {total_after:>8} {total_before - total_after:>8}")
+    print(f"LLM condensing requests: {client.calls['completions']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Per-request latency of a new Groq client per rerun vs. the pooled client
+
+Usage:
+    python -m benchmarks.bench_groq_client [--requests 200] [--latency-ms 0] [--concurrency 16]
+
+Starts a local HTTP/1.1 keep-alive stub of the Groq chat-completions
+endpoint and sends --requests analyze_call requests in three ways. "per
+rerun" builds a new client for every request, which is what app.py did on
+each Streamlit rerun. "pooled" reuses one client. "async pooled" sends the
+requests through one AsyncGroq client with --concurrency in flight at a
+time. The stub counts TCP connections, so connection reuse is visible. The
+stub is plain HTTP, so TLS handshakes (the larger cost against the real
+API) are not included.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from services.fake_groq_client import FAKE_ANALYSIS
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes; without this, Nagle plus delayed ACKs adds ~40 ms
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if self.path.endswith("/audio/transcriptions"):
+            payload = {"text": "Stub transcript."}
+        else:
+            payload = {
+                "id": "stub",
+                "object": "chat.completion",
+                "created": 0,
+                "model": "stub",
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": FAKE_ANALYSIS},
+                        "finish_reason": "stop",
+                    }
+                ],
+            }
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _StubServer(ThreadingHTTPServer):
+    request_queue_size = 128
+
+
+def _start_stub(latency):
+    server = _StubServer(("127.0.0.1", 0), _StubHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.connections = 0
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _summary(label, samples, elapsed, connections):
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    print(
+        f"{label:<14} {statistics.mean(ordered) * 1000:>9.2f} {statistics.median(ordered) * 1000:>9.2f} "
+        f"{p95 * 1000:>9.2f} {len(ordered) / elapsed:>9.1f} {connections:>6}"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Groq client latency: per-rerun vs pooled")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Stub server think time per request")
+    parser.add_argument("--concurrency", type=int, default=16, help="In-flight requests for the async run")
+    args = parser.parse_args(argv)
+
+    from services.analysis_service import analyze_call, analyze_call_async
+    from services.groq_client import build_async_groq_client, build_groq_client
+
+    server = _start_stub(args.latency_ms / 1000)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    transcripts = [f"Customer {i} asks about a charge." for i in range(args.requests)]
+
+    def run_sync(label, client_for_request):
+        server.connections = 0
+        samples = []
+        start = time.perf_counter()
+        for transcript in transcripts:
+            t0 = time.perf_counter()
+            client, owned = client_for_request()
+            analyze_call(client, transcript, use_cache=False)
+            if owned:
+                client.close()
+            samples.append(time.perf_counter() - t0)
+        _summary(label, samples, time.perf_counter() - start, server.connections)
+
+    async def run_async():
+        client = build_async_groq_client(api_key="bench", base_url=base_url)
+        limit = asyncio.Semaphore(max(1, args.concurrency))
+        samples = []
+
+        async def one(transcript):
+            async with limit:
+                t0 = time.perf_counter()
+                await analyze_call_async(client, transcript, use_cache=False)
+                samples.append(time.perf_counter() - t0)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(t) for t in transcripts))
+        elapsed = time.perf_counter() - start
+        await client.close()
+        return samples, elapsed
+
+    print(f"{'client':<14} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'req/s':>9} {'conns':>6}")
+    try:
+        run_sync("per rerun", lambda: (build_groq_client(api_key="bench", base_url=base_url), True))
+        pooled = build_groq_client(api_key="bench", base_url=base_url)
+        run_sync("pooled", lambda: (pooled, False))
+        pooled.close()
+
+        server.connections = 0
+        samples, elapsed = asyncio.run(run_async())
+        _summary("async pooled", samples, elapsed, server.connections)
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Offline throughput of the ingestion pipeline with a fake Groq client
+
+Usage:
+    python -m benchmarks.bench_ingestion [--files 40] [--workers 1 4 16]
+
+Each file costs --transcribe-latency + --analysis-latency seconds of fake API
+time; results are persisted with one save_records call into a temporary
+SQLite store.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingestion pipeline throughput benchmark")
+    parser.add_argument("--files", type=int, default=40)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--transcribe-latency", type=float, default=0.05)
+    parser.add_argument("--analysis-latency", type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    os.environ["STORAGE_BACKEND"] = "sqlite"
+    workdir = tempfile.mkdtemp(prefix="bench_ingest_")
+    os.environ["RECORD_DB_FILE"] = os.path.join(workdir, "bench.db")
+    os.environ["TRANSCRIPT_BLOB_DIR"] = os.path.join(workdir, "transcripts")
+
+    from data.repository import save_records
+    from services.fake_groq_client import FakeGroq
+    from services.ingestion_pipeline import persistable_records, run_pipeline
+
+    files = [(f"call_{i}.wav", os.urandom(64 * 1024)) for i in range(args.files)]
+
+    print(f"{args.files} files, {args.transcribe_latency}s transcribe + {args.analysis_latency}s analysis each")
+    print(f"{'workers':>8} {'seconds':>9} {'files/s':>9} {'persist ms':>11}")
+    for workers in args.workers:
+        client = FakeGroq(args.transcribe_latency, args.analysis_latency)
+        start = time.perf_counter()
+        results = list(run_pipeline(client, files, workers=workers, use_cache=False))
+        persist_start = time.perf_counter()
+        ok, error = save_records(persistable_records(results))
+        elapsed = time.perf_counter() - start
+        if not ok:
+            raise RuntimeError(error)
+        persist_ms = (time.perf_counter() - persist_start) * 1000
+        print(f"{workers:>8} {elapsed:>9.2f} {len(results) / elapsed:>9.1f} {persist_ms:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
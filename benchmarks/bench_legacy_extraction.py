@@ -0,0 +1,98 @@
+"""Legacy Analysis field extraction: per-row apply vs. one vectorized pass
+
+Usage:
+    python -m benchmarks.bench_legacy_extraction [--sizes 10000 100000 1000000]
+
+"apply" is the extractor prepare_trend_summary used before typed columns:
+three Series.apply calls with re.search per row. "extract (cold)" is
+extract_legacy_fields on a fresh cache; "extract (warm)" repeats it, which
+is what a second "Analyze Trends" click costs. The synthetic frames use a
+pool of distinct texts, like real stores where many analyses repeat.
+"""
+import argparse
+import random
+import re
+import time
+
+import pandas as pd
+
+from data import schema
+
+SENTIMENTS = ["Positive", "Neutral", "Negative", "Mixed (polite but frustrated)"]
+CATEGORIES = ["Billing", "Technical", "Account Access", "Shipping", "Refund"]
+
+
+def _synthetic_analysis(n, distinct, seed=7):
+    rng = random.Random(seed)
+    pool = [
+        (
+            f"**Summary:** Call {i} about an issue.\n"
+            f"**Sentiment:** {rng.choice(SENTIMENTS)}\n"
+            f"**Escalation Risk:** {rng.randint(0, 100)}%\n"
+            f"**Why:** \"quote {i}\"\n"
+            f"**Category:** {rng.choice(CATEGORIES)}\n"
+            f"**Action:** Follow up"
+        )
+        for i in range(distinct)
+    ]
+    return pd.Series([pool[rng.randrange(distinct)] for _ in range(n)])
+
+
+def _apply_extract(analysis):
+    def _extract(pattern, text):
+        if not isinstance(text, str) or not text.strip():
+            return None
+        match = re.search(pattern, text, flags=re.IGNORECASE | re.MULTILINE)
+        if not match:
+            return None
+        value = match.group(1).strip()
+        return value if value else None
+
+    def _extract_int(pattern, text):
+        value = _extract(pattern, text)
+        if value is None:
+            return None
+        m = re.search(r"\d+", value)
+        return int(m.group(0)) if m else None
+
+    text = analysis.astype(str)
+    return pd.DataFrame(
+        {
+            "Sentiment": text.apply(lambda t: _extract(r"\*\*Sentiment:\*\*\s*([^\n\r]+)", t)),
+            "Category": text.apply(lambda t: _extract(r"\*\*Category:\*\*\s*([^\n\r]+)", t)),
+            "Escalation Risk (%)": text.apply(
+                lambda t: _extract_int(r"\*\*Escalation\s*Risk:\*\*\s*([^\n\r]+)", t)
+            ),
+        }
+    )
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Legacy field extraction benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--distinct", type=int, default=5000, help="Distinct analysis texts per frame")
+    args = parser.parse_args(argv)
+
+    print(f"{'rows':>9} {'apply s':>9} {'extract (cold) s':>17} {'extract (warm) s':>17} {'speedup':>8}")
+    for size in args.sizes:
+        analysis = _synthetic_analysis(size, min(args.distinct, size))
+        schema._legacy_field_cache = schema._legacy_field_cache.iloc[0:0]
+
+        old, old_s = _timed(_apply_extract, analysis)
+        new, cold_s = _timed(schema.extract_legacy_fields, analysis)
+        _, warm_s = _timed(schema.extract_legacy_fields, analysis)
+
+        for column in schema.TYPED_COLUMNS:
+            if not old[column].astype(object).equals(new[column].astype(object)):
+                raise AssertionError(f"Extractors disagree on {column} at {size} rows")
+        print(f"{size:>9} {old_s:>9.3f} {cold_s:>17.3f} {warm_s:>17.3f} {old_s / cold_s:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
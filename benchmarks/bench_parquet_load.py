@@ -0,0 +1,93 @@
+"""Load time of the trend path: openpyxl workbook vs. the Parquet store
+
+Usage:
+    python -m benchmarks.bench_parquet_load [--sizes 10000 100000] [--transcript-chars 1000]
+
+For each size, writes the same synthetic records (dates spread over a year)
+to an .xlsx workbook and to a Parquet store built from 1,000-row appends.
+Then it times full loads, loads of just the trend columns
+(trend_summary.TREND_COLUMNS), a 30-day Date window, and the last 1,000
+calls. openpyxl parses every cell whichever columns are kept; Parquet reads
+only the requested columns and skips row groups outside the Date window.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+APPEND_ROWS = 1000
+RECENT_ROWS = 1000
+
+
+def _synthetic_records(n, transcript_chars, seed=11):
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    step = timedelta(days=365) / n
+    filler = "Customer explains the billing issue and the agent checks the account. "
+    transcript = (filler * (transcript_chars // len(filler) + 1))[:transcript_chars]
+    return pd.DataFrame(
+        {
+            "Date": [start + step * i for i in range(n)],
+            "File Name": [f"call_{i}.mp3" for i in range(n)],
+            "Transcript": [transcript] * n,
+            "Analysis": [f"**Summary:** Call {i}\n**Sentiment:** Neutral" for i in range(n)],
+            "Sentiment": [rng.choice(["Positive", "Neutral", "Negative"]) for _ in range(n)],
+            "Category": [rng.choice(["Billing", "Technical", "Refund"]) for _ in range(n)],
+            "Escalation Risk (%)": [rng.randint(0, 100) for _ in range(n)],
+        }
+    )
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Trend-path load time: openpyxl vs Parquet")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--transcript-chars", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="bench_parquet_")
+    os.environ["RECORD_PARQUET_DIR"] = os.path.join(workdir, "store")
+    from data import parquet_store
+    from data.trend_summary import TREND_COLUMNS
+
+    print(f"{'rows':>7} {'reader':<28} {'seconds':>9} {'rows read':>10}")
+    for size in args.sizes:
+        df = _synthetic_records(size, args.transcript_chars)
+
+        xlsx_path = os.path.join(workdir, f"records_{size}.xlsx")
+        df.to_excel(xlsx_path, index=False)
+        parquet_store.PARQUET_DIR = os.path.join(workdir, f"store_{size}")
+        for start in range(0, size, APPEND_ROWS):
+            parquet_store.append_records(df.iloc[start:start + APPEND_ROWS])
+
+        window_start = df["Date"].max() - timedelta(days=30)
+        cases = [
+            ("openpyxl all columns", lambda: pd.read_excel(xlsx_path)),
+            ("openpyxl trend columns", lambda: pd.read_excel(xlsx_path, usecols=TREND_COLUMNS)),
+            ("parquet all columns", lambda: parquet_store.read_records()),
+            ("parquet trend columns", lambda: parquet_store.read_records(columns=TREND_COLUMNS)),
+            (
+                "parquet trend, last 30 days",
+                lambda: parquet_store.read_records(columns=TREND_COLUMNS, start=window_start),
+            ),
+            (
+                f"parquet trend, last {RECENT_ROWS}",
+                lambda: parquet_store.read_recent_records(RECENT_ROWS, columns=TREND_COLUMNS),
+            ),
+        ]
+        for label, read in cases:
+            result, seconds = _timed(read)
+            print(f"{size:>7} {label:<28} {seconds:>9.3f} {len(result):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Regression benchmark for the sidebar path (database_exists + get_record_count)
+
+Usage:
+    python -m benchmarks.bench_record_count [--small 1000] [--large 50000]
+
+Builds a small and a large store for each local backend and times the
+calls app.py makes on every rerun. Exits non-zero if the large store is
+more than --max-ratio times slower than the small one, i.e. if the
+sidebar starts scaling with record count again.
+"""
+import argparse
+import importlib
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import pandas as pd
+
+
+def _synthetic_records(n):
+    return pd.DataFrame(
+        {
+            "Date": [datetime.now()] * n,
+            "File Name": [f"call_{i}.mp3" for i in range(n)],
+            "Transcript": ["Customer called about a billing issue."] * n,
+            "Analysis": ["**Sentiment:** Neutral"] * n,
+        }
+    )
+
+
+def _time_sidebar_path(repository, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        if repository.database_exists():
+            repository.get_record_count()
+        timings.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(timings)
+
+
+def _load_repository(backend, workdir, size):
+    os.environ["STORAGE_BACKEND"] = backend
+    os.environ["RECORD_DB_FILE"] = os.path.join(workdir, f"{backend}_{size}.db")
+
+    from data import excel_store, sqlite_store, repository
+
+    importlib.reload(sqlite_store)
+    excel_store.EXCEL_FILE = os.path.join(workdir, f"{backend}_{size}.xlsx")
+    repository = importlib.reload(repository)
+    repository._store.append_records(_synthetic_records(size))
+    return repository
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sidebar record-count regression benchmark")
+    parser.add_argument("--small", type=int, default=1000)
+    parser.add_argument("--large", type=int, default=50000)
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--max-ratio", type=float, default=3.0)
+    parser.add_argument("--backends", nargs="+", default=["sqlite", "excel"])
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="bench_count_")
+    failed = False
+
+    print(f"{'backend':>8} {'small us':>10} {'large us':>10} {'ratio':>7}")
+    for backend in args.backends:
+        small = _time_sidebar_path(_load_repository(backend, workdir, args.small), args.repeats)
+        large = _time_sidebar_path(_load_repository(backend, workdir, args.large), args.repeats)
+        ratio = large / small if small else float("inf")
+        status = "" if ratio <= args.max_ratio else "  REGRESSION"
+        failed = failed or bool(status)
+        print(f"{backend:>8} {small:>10.1f} {large:>10.1f} {ratio:>7.2f}{status}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""Stress test for concurrent S3 writers (several app replicas saving at once)
+
+Usage:
+    python -m benchmarks.bench_s3_concurrent_writes [--writers 8] [--saves 25]
+
+Starts a local S3 stub (moto's server mode, `pip install "moto[server]"`),
+then runs --writers processes that each call save_records --saves times
+against the same bucket. Exits non-zero if any record is missing from
+get_all_records, or if the maintained count or trend aggregates disagree
+with the number of records written.
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import sys
+import time
+
+BUCKET = "bench-concurrent-writes"
+
+
+def _configure(endpoint):
+    os.environ.update(
+        USE_S3="true",
+        S3_BUCKET_NAME=BUCKET,
+        AWS_ACCESS_KEY_ID="bench",
+        AWS_SECRET_ACCESS_KEY="bench",
+        AWS_REGION="us-east-1",
+        AWS_ENDPOINT_URL_S3=endpoint,
+        S3_READ_CACHE_SECONDS="0",
+    )
+
+
+def _writer(endpoint, writer_id, saves, results):
+    _configure(endpoint)
+    from data import repository_s3
+    from data.models import CallAnalysis
+
+    analysis = CallAnalysis(summary="Stress test", sentiment="Neutral", escalation_risk=50, category="Billing")
+    written, errors = 0, []
+    for i in range(saves):
+        batch = [
+            (f"writer{writer_id}_save{i}_{j}.mp3", "Customer called about a bill.", analysis)
+            for j in range(1 + i % 3)
+        ]
+        ok, error = repository_s3.save_records(batch)
+        if ok:
+            written += len(batch)
+        else:
+            errors.append(error)
+    results.put((writer_id, written, errors, repository_s3.get_read_cache_stats()["write_conflicts"]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent S3 writer stress test")
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--saves", type=int, default=25, help="save_records calls per writer")
+    parser.add_argument("--port", type=int, default=5123)
+    args = parser.parse_args(argv)
+
+    try:
+        from moto.server import ThreadedMotoServer
+    except ImportError:
+        print('moto is required: pip install "moto[server]"', file=sys.stderr)
+        return 2
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = ThreadedMotoServer(port=args.port, verbose=False)
+    server.start()
+    endpoint = f"http://127.0.0.1:{args.port}"
+    _configure(endpoint)
+    try:
+        import boto3
+
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket=BUCKET)
+
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        workers = [
+            context.Process(target=_writer, args=(endpoint, w, args.saves, results))
+            for w in range(args.writers)
+        ]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        reports = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+
+        from data import repository_s3
+
+        expected = sum(written for _, written, _, _ in reports)
+        errors = [error for _, _, errs, _ in reports for error in errs]
+        conflicts = sum(c for _, _, _, c in reports)
+        records = repository_s3.get_all_records()
+        names = set(records["File Name"])
+        count = repository_s3.get_record_count()
+        aggregated = repository_s3.get_trend_aggregates().total_calls
+
+        print(f"writers={args.writers} saves/writer={args.saves} elapsed={elapsed:.2f}s")
+        print(f"records written={expected} stored={len(records)} distinct files={len(names)}")
+        print(f"maintained count={count} aggregated calls={aggregated} metadata conflicts retried={conflicts}")
+        for error in errors:
+            print(f"save failed: {error}")
+
+        if errors or not (expected == len(records) == len(names) == count == aggregated):
+            print("FAIL: records lost or miscounted under concurrent writes")
+            return 1
+        print("OK: no records lost")
+        return 0
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""Per-save latency of save_record as the store grows
+
+Usage:
+    python -m benchmarks.bench_save_record [--sizes 1000 10000 100000] [--saves 200]
+
+Each size gets a fresh store pre-filled with that many synthetic records,
+then times individual save_record calls. With an append path the median
+latency should stay flat across sizes.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+
+def _synthetic_records(n):
+    import pandas as pd
+
+    return pd.DataFrame(
+        {
+            "Date": [datetime.now()] * n,
+            "File Name": [f"call_{i}.mp3" for i in range(n)],
+            "Transcript": ["Customer called about a billing issue. " * 20] * n,
+            "Analysis": ["**Sentiment:** Neutral\n**Escalation Risk:** 20%\n**Category:** Billing"] * n,
+        }
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="save_record latency benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--saves", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="bench_store_")
+    os.environ["RECORD_DB_FILE"] = os.path.join(workdir, "bench.db")
+    os.environ["STORAGE_BACKEND"] = "sqlite"
+    os.environ["TRANSCRIPT_BLOB_DIR"] = os.path.join(workdir, "transcripts")
+
+    from data import repository
+
+    print(f"backend={repository.STORAGE_BACKEND} saves/size={args.saves}")
+    print(f"{'records':>10} {'median ms':>10} {'p95 ms':>10}")
+    for size in args.sizes:
+        path = os.path.join(workdir, f"bench_{size}.db")
+        repository._store.DB_FILE = path
+        repository._store.append_records(_synthetic_records(size))
+
+        timings = []
+        for i in range(args.saves):
+            start = time.perf_counter()
+            ok, error = repository.save_record(f"bench_{i}.mp3", "Transcript text", "Analysis text")
+            timings.append((time.perf_counter() - start) * 1000)
+            if not ok:
+                raise RuntimeError(error)
+
+        timings.sort()
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        print(f"{size:>10} {statistics.median(timings):>10.2f} {p95:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
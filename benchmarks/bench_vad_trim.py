@@ -0,0 +1,137 @@
+"""Audio seconds removed by silence/hold-music trimming, and end-to-end latency
+
+Usage:
+    python -m benchmarks.bench_vad_trim [--mbps 20] [--asr-speed 150]
+
+Builds synthetic 44.1 kHz stereo call recordings from speech-like segments,
+pauses and hold music, with the true speech spans known. Each one is
+transcribed three ways: the original WAV as uploaded today, preprocessed
+(16 kHz mono FLAC) and preprocessed with trimming. The client records what
+would be uploaded instead of calling Whisper; upload time is modeled at
+--mbps and Whisper time at --asr-speed times real time, billed per request
+with Groq's 10-second minimum. Local preprocessing time is measured.
+"speech kept" is the share of the true speech inside the kept spans.
+"""
+import argparse
+import os
+import tempfile
+from types import SimpleNamespace
+
+import numpy as np
+
+RATE = 44100
+# (label, [(kind, seconds), ...])
+RECORDINGS = [
+    ("short call, few pauses", [("speech", 90), ("silence", 3), ("speech", 120), ("silence", 2), ("speech", 60)]),
+    ("call with hold", [("speech", 120), ("silence", 10), ("music", 300), ("speech", 240), ("silence", 20),
+                        ("speech", 60)]),
+    ("mostly hold", [("speech", 30), ("music", 900), ("silence", 30), ("speech", 45)]),
+]
+
+
+def _speech(seconds, rng):
+    t = np.arange(int(seconds * RATE)) / RATE
+    pitch = 150 + 60 * np.sin(2 * np.pi * 0.3 * t + rng.uniform(0, 6))
+    phase = 2 * np.pi * np.cumsum(pitch) / RATE
+    voice = sum(np.sin(k * phase) / k for k in range(1, 12))
+    # Syllables at ~2.5 Hz with a gap between each
+    syllables = np.clip(np.sin(2 * np.pi * 2.5 * t + rng.uniform(0, 6)), 0, None) ** 0.7
+    return 0.25 * voice * syllables
+
+
+def _music(seconds):
+    t = np.arange(int(seconds * RATE)) / RATE
+    notes = [261.6, 329.6, 392.0, 440.0, 349.2]
+    # A chord change every two seconds
+    note = np.asarray(notes)[(t // 2).astype(int) % len(notes)]
+    return 0.15 * (np.sin(2 * np.pi * note * t) + 0.5 * np.sin(2 * np.pi * note * 1.5 * t))
+
+
+def _recording(segments, seed=3):
+    rng = np.random.default_rng(seed)
+    parts, speech_spans, at = [], [], 0.0
+    for kind, seconds in segments:
+        if kind == "speech":
+            parts.append(_speech(seconds, rng))
+            speech_spans.append((at, at + seconds))
+        elif kind == "music":
+            parts.append(_music(seconds))
+        else:
+            parts.append(np.zeros(int(seconds * RATE)))
+        at += seconds
+    mono = np.concatenate(parts)
+    mono += 0.002 * rng.standard_normal(len(mono))
+    stereo = np.stack([mono, 0.8 * mono], axis=1)
+    return np.clip(stereo * 32767, -32768, 32767).astype(np.int16), speech_spans
+
+
+class _ModeledWhisper:
+    """Records uploads instead of sending them; each call costs modeled network and Whisper time"""
+
+    def __init__(self, mbps, asr_speed):
+        self.mbps = mbps
+        self.asr_speed = asr_speed
+        self.calls = []
+        self.audio = SimpleNamespace(transcriptions=self)
+
+    def create(self, file, model, **kwargs):
+        from services.audio_processing import decode_audio
+
+        filename, audio = file
+        samples, rate = decode_audio(audio, filename)
+        self.calls.append((len(audio), samples.shape[0] / rate))
+        return SimpleNamespace(text="")
+
+    def modeled(self):
+        upload = sum(size for size, _ in self.calls) * 8 / (self.mbps * 1e6)
+        whisper = sum(seconds for _, seconds in self.calls) / self.asr_speed
+        billed = sum(max(10.0, seconds) for _, seconds in self.calls)
+        return upload, whisper, billed
+
+
+def _overlap(spans, truth):
+    return sum(max(0.0, min(e, te) - max(s, ts)) for s, e in spans for ts, te in truth)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Silence trimming benchmark")
+    parser.add_argument("--mbps", type=float, default=20, help="Modeled upload bandwidth")
+    parser.add_argument("--asr-speed", type=float, default=150, help="Modeled Whisper speed (x real time)")
+    args = parser.parse_args(argv)
+
+    os.environ["RESULT_CACHE_DIR"] = tempfile.mkdtemp(prefix="bench_vad_")
+    from services import transcription_service
+    from services.audio_processing import encode_wav
+
+    print(f"{args.mbps:g} Mbit/s upload, Whisper at {args.asr_speed:g}x real time")
+    print(
+        f"{'recording':<24} {'mode':<12} {'audio s':>8} {'removed s':>9} {'speech kept':>11} "
+        f"{'MB up':>7} {'prep s':>7} {'end-to-end s':>12} {'billed s':>9}"
+    )
+    for label, segments in RECORDINGS:
+        samples, truth = _recording(segments)
+        audio = encode_wav(samples, RATE)
+        total = samples.shape[0] / RATE
+        speech_seconds = sum(e - s for s, e in truth)
+        for mode, preprocess, trim in (("original", False, False), ("preprocess", True, False),
+                                       ("trim", True, True)):
+            transcription_service.AUDIO_PREPROCESS = preprocess
+            client = _ModeledWhisper(args.mbps, args.asr_speed)
+            reports_before = len(transcription_service.get_preprocess_stats()["recent"])
+            transcription_service.transcribe_audio(client, audio, "call.wav", use_cache=False, trim_silence=trim)
+            recent = transcription_service.get_preprocess_stats()["recent"]
+            report = recent[-1] if len(recent) > reports_before else None
+            prep = report.seconds if report else 0.0
+            timeline = report.timeline if report else None
+            removed = timeline.removed_seconds if timeline else 0.0
+            kept = _overlap(timeline.spans, truth) / speech_seconds if timeline else 1.0
+            upload, whisper, billed = client.modeled()
+            uploaded = sum(size for size, _ in client.calls)
+            print(
+                f"{label:<24} {mode:<12} {total:>8.0f} {removed:>9.0f} {kept:>10.1%} "
+                f"{uploaded / 1e6:>7.1f} {prep:>7.2f} {prep + upload + whisper:>12.1f} {billed:>9.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
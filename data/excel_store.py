@@ -0,0 +1,192 @@
+"""Excel storage backend for call records.
+
+The workbook is rewritten on every append, so this backend is kept for
+compatibility with existing deployments and as an export format. Use the
+SQLite backend as the live store.
+"""
+import json
+import os
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from data.schema import normalize_schema
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+EXCEL_FILE = os.path.join(PROJECT_ROOT, "call_records.xlsx")
+
+
+def _meta_path() -> str:
+    return os.path.splitext(EXCEL_FILE)[0] + ".meta.json"
+
+
+def _workbook_signature() -> dict:
+    stat = os.stat(EXCEL_FILE)
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+def _load_sidecar() -> dict | None:
+    """Return the sidecar if it still describes the current workbook"""
+    try:
+        with open(_meta_path(), encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    signature = _workbook_signature()
+    if meta.get("mtime_ns") != signature["mtime_ns"] or meta.get("size") != signature["size"]:
+        return None
+    return meta
+
+
+def _write_meta(record_count: int, values: dict | None = None) -> None:
+    meta = {"record_count": int(record_count), "values": values or {}, **_workbook_signature()}
+    tmp_path = _meta_path() + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, _meta_path())
+
+
+def _read_meta_count() -> int | None:
+    meta = _load_sidecar()
+    return None if meta is None else int(meta.get("record_count", 0))
+
+
+def _count_from_header() -> int:
+    """Count rows from the sheet dimension without loading cell data"""
+    wb = load_workbook(EXCEL_FILE, read_only=True)
+    try:
+        ws = wb.worksheets[0]
+        max_row = ws.max_row
+        if max_row is None:
+            # Dimension tag missing; fall back to streaming the rows
+            ws.reset_dimensions()
+            max_row = sum(1 for _ in ws.iter_rows(values_only=True))
+    finally:
+        wb.close()
+    return max(0, int(max_row) - 1)
+
+
+def exists() -> bool:
+    """Check if the workbook exists"""
+    return os.path.exists(EXCEL_FILE)
+
+
+def version() -> str | None:
+    """Token that changes whenever the workbook is rewritten"""
+    if not exists():
+        return None
+    signature = _workbook_signature()
+    return f"{signature['mtime_ns']}:{signature['size']}"
+
+
+def read_records(columns=None, start=None, end=None) -> pd.DataFrame:
+    """Load records from the workbook
+
+    Args:
+        columns: Only keep these columns (missing ones are skipped)
+        start: Only rows with Date >= start
+        end: Only rows with Date < end
+
+    openpyxl still parses every cell; the arguments only trim the result.
+    """
+    if not exists():
+        return pd.DataFrame()
+    wanted = None if columns is None else set(columns)
+    if wanted is not None and (start is not None or end is not None):
+        wanted.add("Date")
+    df = pd.read_excel(EXCEL_FILE, usecols=None if wanted is None else lambda c: c in wanted)
+    if (start is not None or end is not None) and "Date" in df.columns:
+        dates = pd.to_datetime(df["Date"], errors="coerce")
+        keep = pd.Series(True, index=df.index)
+        if start is not None:
+            keep &= dates >= pd.Timestamp(start)
+        if end is not None:
+            keep &= dates < pd.Timestamp(end)
+        df = df[keep]
+    if columns is not None:
+        df = df[[c for c in columns if c in df.columns]]
+    return df
+
+
+def read_matching(column: str, values, columns=None, start=None) -> pd.DataFrame:
+    """Load the records whose column holds one of values (the workbook is still read in full)"""
+    wanted = None if columns is None else list(dict.fromkeys([*columns, column]))
+    df = read_records(wanted, start=start)
+    df = df[df[column].isin(set(values))] if column in df.columns else df.iloc[0:0]
+    if columns is not None:
+        df = df[[c for c in columns if c in df.columns]]
+    return df
+
+
+def read_recent_records(n: int, columns=None) -> pd.DataFrame:
+    """Load the last n records (the workbook is still read in full)"""
+    return read_records(columns).tail(int(n))
+
+
+def read_meta(key: str) -> str | None:
+    """Read a sidecar metadata value; None if missing or the workbook changed"""
+    if not exists():
+        return None
+    meta = _load_sidecar()
+    return None if meta is None else meta.get("values", {}).get(key)
+
+
+def rebuild_meta(build) -> dict:
+    """Recompute metadata values from all records and store them in the sidecar"""
+    df = read_records()
+    values = build(df)
+    meta = _load_sidecar() or {}
+    _write_meta(len(df), {**meta.get("values", {}), **values})
+    return values
+
+
+def count_records() -> int:
+    """Get total number of stored records.
+
+    Served from a sidecar file kept in sync by append_records. If the
+    workbook was edited elsewhere the count is rebuilt from the sheet header.
+    """
+    if not exists():
+        return 0
+    count = _read_meta_count()
+    if count is None:
+        count = _count_from_header()
+        try:
+            # Other metadata can't be trusted once the workbook changed
+            _write_meta(count)
+        except OSError:
+            pass
+    return count
+
+
+def append_records(df: pd.DataFrame, update_meta=None) -> int:
+    """Append rows by rewriting the whole workbook
+
+    Args:
+        df: Rows to append
+        update_meta: Optional callable(read_meta) -> dict of sidecar metadata
+            values to store with the new workbook
+    """
+    if df is None or df.empty:
+        return 0
+    values = {}
+    if exists():
+        sidecar = _load_sidecar()
+        if sidecar is not None:
+            values = dict(sidecar.get("values", {}))
+    if update_meta is not None:
+        values.update(update_meta(values.get))
+    if exists():
+        updated = pd.concat([normalize_schema(read_records()), df], ignore_index=True)
+    else:
+        updated = df
+    updated = normalize_schema(updated)
+    updated["File Name"] = updated["File Name"].fillna("Unknown")
+    write_workbook(updated, EXCEL_FILE)
+    _write_meta(len(updated), values)
+    return len(df)
+
+
+def write_workbook(df: pd.DataFrame, path: str) -> None:
+    """Write records to an .xlsx file"""
+    df.to_excel(path, index=False)
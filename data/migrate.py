@@ -0,0 +1,62 @@
+"""Command-line tools for moving records between Excel and the live store
+
+Usage:
+    python -m data.migrate import-excel [--path call_records.xlsx] [--force]
+    python -m data.migrate export-excel --path export.xlsx
+    python -m data.migrate compact-s3 [--import-legacy]
+"""
+import argparse
+import sys
+
+from data import repository
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m data.migrate", description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    import_cmd = sub.add_parser("import-excel", help="One-shot import of a legacy workbook")
+    # repository_s3 (installed as data/repository.py by deploy/switch-to-s3.sh) names it LOCAL_EXCEL_FILE
+    default_workbook = getattr(repository, "EXCEL_FILE", getattr(repository, "LOCAL_EXCEL_FILE", "call_records.xlsx"))
+    import_cmd.add_argument("--path", default=default_workbook, help="Workbook to import")
+    import_cmd.add_argument("--force", action="store_true", help="Import even if the store is not empty")
+
+    export_cmd = sub.add_parser("export-excel", help="Export all records to a workbook")
+    export_cmd.add_argument("--path", required=True, help="Destination .xlsx file")
+
+    compact_cmd = sub.add_parser("compact-s3", help="Merge small S3 record objects per date partition")
+    compact_cmd.add_argument(
+        "--import-legacy", action="store_true",
+        help="First move the legacy S3 workbook into date partitions"
+    )
+
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "import-excel":
+            imported = repository.migrate_from_excel(args.path, force=args.force)
+            print(f"Imported {imported} record(s) from {args.path} into {repository.STORAGE_BACKEND} store")
+        elif args.command == "export-excel":
+            exported = repository.export_to_excel(args.path)
+            print(f"Exported {exported} record(s) to {args.path}")
+        else:
+            from data import repository_s3
+
+            if not (repository_s3.USE_S3 and repository_s3.s3_client):
+                print("Error: S3 is not enabled (set USE_S3=true and S3_BUCKET_NAME)", file=sys.stderr)
+                return 1
+            if args.import_legacy:
+                imported = repository_s3.import_legacy_workbook()
+                print(f"Imported {imported} record(s) from s3://{repository_s3.S3_BUCKET_NAME}/{repository_s3.S3_FILE_KEY}")
+            compacted = repository_s3.compact_partitions()
+            for partition, merged in compacted.items():
+                print(f"Compacted {merged} object(s) in partition {partition}")
+            print(f"Compacted {len(compacted)} partition(s)")
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""Typed call analysis record"""
+import json
+import re
+from dataclasses import asdict, dataclass
+
+SENTIMENTS = ("Positive", "Neutral", "Negative")
+
+# Typed columns stored alongside the Analysis text
+TYPED_COLUMNS = ["Sentiment", "Category", "Escalation Risk (%)"]
+
+_MARKDOWN_FIELDS = {
+    "summary": re.compile(r"\*\*Summary:\*\*\s*([^\n\r]+)", re.IGNORECASE | re.MULTILINE),
+    "sentiment": re.compile(r"\*\*Sentiment:\*\*\s*([^\n\r]+)", re.IGNORECASE | re.MULTILINE),
+    "escalation_risk": re.compile(r"\*\*Escalation\s*Risk:\*\*\s*([^\n\r]+)", re.IGNORECASE | re.MULTILINE),
+    "why": re.compile(r"\*\*Why:\*\*\s*([^\n\r]+)", re.IGNORECASE | re.MULTILINE),
+    "emotional_journey": re.compile(r"\*\*Emotional\s*Journey:\*\*\s*([^\n\r]+)", re.IGNORECASE | re.MULTILINE),
+    "category": re.compile(r"\*\*Category:\*\*\s*([^\n\r]+)", re.IGNORECASE | re.MULTILINE),
+    "action": re.compile(r"\*\*Action:\*\*\s*([^\n\r]+)", re.IGNORECASE | re.MULTILINE),
+}
+_FIRST_INT = re.compile(r"\d+")
+
+
+def _parse_risk(value):
+    """Accept 45, "45", "45%" or "Risk: 45%"; clamp to 0-100"""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return max(0, min(100, int(round(value))))
+    match = _FIRST_INT.search(str(value))
+    return max(0, min(100, int(match.group(0)))) if match else None
+
+
+def _clean(value):
+    if value is None:
+        return None
+    text = str(value).strip()
+    return text or None
+
+
+@dataclass(slots=True)
+class CallAnalysis:
+    """Structured result of analyzing one call"""
+
+    summary: str | None = None
+    sentiment: str | None = None
+    escalation_risk: int | None = None
+    why: str | None = None
+    emotional_journey: str | None = None
+    category: str | None = None
+    action: str | None = None
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Validate a JSON object returned by the model
+
+        Raises:
+            ValueError: If data is not an object or has no usable fields
+        """
+        if not isinstance(data, dict):
+            raise ValueError("Analysis must be a JSON object")
+        lookup = {str(k).strip().lower().replace(" ", "_"): v for k, v in data.items()}
+
+        sentiment = _clean(lookup.get("sentiment"))
+        if sentiment:
+            for canonical in SENTIMENTS:
+                if sentiment.lower().startswith(canonical.lower()):
+                    sentiment = canonical
+                    break
+
+        analysis = cls(
+            summary=_clean(lookup.get("summary")),
+            sentiment=sentiment,
+            escalation_risk=_parse_risk(lookup.get("escalation_risk")),
+            why=_clean(lookup.get("why")),
+            emotional_journey=_clean(lookup.get("emotional_journey")),
+            category=_clean(lookup.get("category")),
+            action=_clean(lookup.get("action")),
+        )
+        if analysis.summary is None and analysis.sentiment is None and analysis.category is None:
+            raise ValueError("Analysis JSON is missing summary, sentiment and category")
+        return analysis
+
+    @classmethod
+    def from_json(cls, text):
+        """Parse and validate a JSON analysis string"""
+        try:
+            data = json.loads(text)
+        except (TypeError, json.JSONDecodeError) as e:
+            raise ValueError(f"Analysis is not valid JSON: {e}") from e
+        return cls.from_dict(data)
+
+    @classmethod
+    def from_markdown(cls, text):
+        """Best-effort parse of legacy "**Field:** value" markdown analyses"""
+        if not isinstance(text, str) or not text.strip():
+            return cls()
+        fields = {}
+        for name, pattern in _MARKDOWN_FIELDS.items():
+            match = pattern.search(text)
+            fields[name] = _clean(match.group(1)) if match else None
+        fields["escalation_risk"] = _parse_risk(fields["escalation_risk"])
+        return cls(**fields)
+
+    def to_dict(self):
+        return asdict(self)
+
+    def to_markdown(self):
+        """Render in the same layout the app has always displayed and stored"""
+        risk = "Unknown" if self.escalation_risk is None else f"{self.escalation_risk}%"
+        return "\n".join(
+            [
+                f"**Summary:** {self.summary or 'Unknown'}",
+                f"**Sentiment:** {self.sentiment or 'Unknown'}",
+                f"**Escalation Risk:** {risk}",
+                f"**Why:** {self.why or 'Unknown'}",
+                f"**Emotional Journey:** {self.emotional_journey or 'Unknown'}",
+                f"**Category:** {self.category or 'Unknown'}",
+                f"**Action:** {self.action or 'Unknown'}",
+            ]
+        )
+
+    def record_fields(self):
+        """Values for the typed record columns"""
+        return {
+            "Sentiment": self.sentiment,
+            "Category": self.category,
+            "Escalation Risk (%)": self.escalation_risk,
+        }
+
+    def __str__(self):
+        return self.to_markdown()
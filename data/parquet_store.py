@@ -0,0 +1,280 @@
+"""Parquet storage backend for call records (columnar, append-only)
+
+Records live in a directory of Parquet files. Each append writes one new
+part file, and part files sort by name in insertion order. Reads fetch only
+the requested columns, and a Date window is pushed down to Parquet
+row-group statistics, so the trend path never decodes the Transcript column.
+Once there are more than PARQUET_COMPACT_FILES part files, the next append
+merges them into one file.
+
+Needs pyarrow (`pip install pyarrow`), imported only when the backend is used.
+"""
+import json
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from data.models import TYPED_COLUMNS
+from data.schema import TRANSCRIPT_LENGTH_COLUMN
+
+try:
+    import fcntl
+except ImportError:  # Windows: the in-process lock still serializes this app's writers
+    fcntl = None
+
+load_dotenv()
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+PARQUET_DIR = os.getenv("RECORD_PARQUET_DIR", os.path.join(PROJECT_ROOT, "call_records.parquet"))
+
+BASE_COLUMNS = ["Date", "File Name", "Transcript", "Analysis"]
+INT_COLUMNS = (TYPED_COLUMNS[2], TRANSCRIPT_LENGTH_COLUMN)
+PART_PREFIX = "part-"
+META_FILE = "_meta.json"
+LOCK_FILE = "_lock"
+
+# Part files merged into one once there are more than this many
+PARQUET_COMPACT_FILES = int(os.getenv("PARQUET_COMPACT_FILES", "64"))
+# Rows per row group in merged files; smaller groups let Date filters skip more
+PARQUET_ROW_GROUP_SIZE = int(os.getenv("PARQUET_ROW_GROUP_SIZE", "10000"))
+
+_thread_lock = threading.RLock()
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("STORAGE_BACKEND=parquet requires pyarrow: pip install pyarrow") from e
+    return pa, pq
+
+
+@contextmanager
+def _locked(exclusive: bool):
+    """Serialize writers (and compaction against readers) across threads and processes"""
+    os.makedirs(PARQUET_DIR, exist_ok=True)
+    with _thread_lock:
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(PARQUET_DIR, LOCK_FILE), "a+") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _part_files() -> list[str]:
+    """Part file paths in insertion order"""
+    try:
+        names = os.listdir(PARQUET_DIR)
+    except FileNotFoundError:
+        return []
+    return [
+        os.path.join(PARQUET_DIR, name)
+        for name in sorted(names)
+        if name.startswith(PART_PREFIX) and name.endswith(".parquet")
+    ]
+
+
+def _load_meta() -> dict:
+    try:
+        with open(os.path.join(PARQUET_DIR, META_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_meta(meta: dict) -> None:
+    path = os.path.join(PARQUET_DIR, META_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, path)
+
+
+def _to_table(df: pd.DataFrame):
+    """Arrow table with stable column types, so part files share one schema"""
+    pa, _ = _pyarrow()
+    working = df.copy()
+    working.columns = [str(c) for c in working.columns]
+    for column in working.columns:
+        if column == "Date":
+            working[column] = pd.to_datetime(working[column], errors="coerce").astype("datetime64[us]")
+        elif column in INT_COLUMNS:
+            working[column] = pd.to_numeric(working[column], errors="coerce").round().astype("Int64")
+        else:
+            working[column] = working[column].astype("string")
+    return pa.Table.from_pandas(working, preserve_index=False)
+
+
+def _date_filters(start, end):
+    filters = []
+    if start is not None:
+        filters.append(("Date", ">=", pd.Timestamp(start).to_pydatetime()))
+    if end is not None:
+        filters.append(("Date", "<", pd.Timestamp(end).to_pydatetime()))
+    return filters or None
+
+
+def _read_files(paths: list[str], columns=None, start=None, end=None, match=None) -> pd.DataFrame:
+    pa, pq = _pyarrow()
+    filters = _date_filters(start, end)
+    if match is not None:
+        filters = (filters or []) + [(match[0], "in", list(match[1]))]
+    tables = []
+    for path in paths:
+        available = pq.read_schema(path).names
+        wanted = None if columns is None else [c for c in columns if c in available]
+        if filters is not None and any(f[0] not in available for f in filters):
+            continue
+        tables.append(pq.read_table(path, columns=wanted, filters=filters))
+    if not tables:
+        return pd.DataFrame(columns=list(columns) if columns is not None else BASE_COLUMNS)
+    table = pa.concat_tables(tables, promote_options="permissive")
+    df = table.to_pandas()
+    if columns is not None:
+        df = df[[c for c in columns if c in df.columns]]
+    return df
+
+
+def exists() -> bool:
+    """Check if the Parquet store has been created"""
+    return os.path.exists(os.path.join(PARQUET_DIR, META_FILE)) or bool(_part_files())
+
+
+def version() -> str | None:
+    """Token that changes whenever a part or meta file is added or replaced"""
+    try:
+        stat = os.stat(PARQUET_DIR)
+    except FileNotFoundError:
+        return None
+    return str(stat.st_mtime_ns)
+
+
+def read_records(columns=None, start=None, end=None) -> pd.DataFrame:
+    """Load records in insertion order
+
+    Args:
+        columns: Only read these columns (missing ones are skipped)
+        start: Only rows with Date >= start
+        end: Only rows with Date < end
+    """
+    with _locked(exclusive=False):
+        return _read_files(_part_files(), columns, start, end)
+
+
+def read_matching(column: str, values, columns=None, start=None) -> pd.DataFrame:
+    """Load the records whose column holds one of values (the match is pushed down to each part file)
+
+    Args:
+        column: Column to match
+        values: Values to look up
+        columns: Only read these columns (missing ones are skipped)
+        start: Only rows with Date >= start
+    """
+    values = list(dict.fromkeys(values))
+    if not values:
+        return pd.DataFrame(columns=list(columns) if columns is not None else BASE_COLUMNS)
+    with _locked(exclusive=False):
+        return _read_files(_part_files(), columns, start, match=(column, values))
+
+
+def read_recent_records(n: int, columns=None) -> pd.DataFrame:
+    """Load the last n records, reading only the newest part files"""
+    _, pq = _pyarrow()
+    n = int(n)
+    with _locked(exclusive=False):
+        selected, rows = [], 0
+        for path in reversed(_part_files()):
+            if rows >= n:
+                break
+            selected.insert(0, path)
+            rows += pq.ParquetFile(path).metadata.num_rows
+        return _read_files(selected, columns).tail(n).reset_index(drop=True)
+
+
+def read_meta(key: str) -> str | None:
+    """Read a metadata value maintained alongside the records"""
+    return _load_meta().get("values", {}).get(key)
+
+
+def rebuild_meta(build) -> dict:
+    """Recompute metadata values from all records under the write lock"""
+    with _locked(exclusive=True):
+        df = _read_files(_part_files())
+        values = build(df)
+        meta = _load_meta()
+        _write_meta({"record_count": len(df), "values": {**meta.get("values", {}), **values}})
+    return values
+
+
+def count_records() -> int:
+    """Get total number of stored records from the metadata file"""
+    meta = _load_meta()
+    if "record_count" in meta:
+        return int(meta["record_count"])
+    if not exists():
+        return 0
+    _, pq = _pyarrow()
+    # Row counts live in each file's footer, so no data pages are read
+    with _locked(exclusive=False):
+        return sum(pq.ParquetFile(path).metadata.num_rows for path in _part_files())
+
+
+def _compact() -> None:
+    """Merge all part files into one (caller holds the exclusive lock)"""
+    _, pq = _pyarrow()
+    paths = _part_files()
+    if len(paths) <= 1:
+        return
+    table = _to_table(_read_files(paths))
+    last_name = os.path.basename(paths[-1])[: -len(".parquet")]
+    # Sorts right after the files it replaces and before any later part
+    merged = os.path.join(PARQUET_DIR, f"{last_name}-merged.parquet")
+    pq.write_table(table, merged + ".tmp", row_group_size=PARQUET_ROW_GROUP_SIZE)
+    os.replace(merged + ".tmp", merged)
+    for path in paths:
+        if path != merged:
+            os.remove(path)
+
+
+def append_records(df: pd.DataFrame, update_meta=None) -> int:
+    """Append rows as one new part file
+
+    Args:
+        df: Rows to append
+        update_meta: Optional callable(read_meta) -> dict of metadata values
+            to store with the new rows
+
+    Returns:
+        int: Number of rows written
+    """
+    if df is None or df.empty:
+        return 0
+    _, pq = _pyarrow()
+    table = _to_table(df)
+    with _locked(exclusive=True):
+        meta = _load_meta()
+        if "record_count" not in meta:
+            meta["record_count"] = sum(pq.ParquetFile(p).metadata.num_rows for p in _part_files())
+        values = dict(meta.get("values", {}))
+        if update_meta is not None:
+            values.update(update_meta(values.get))
+
+        name = f"{PART_PREFIX}{datetime.now().strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:8]}.parquet"
+        path = os.path.join(PARQUET_DIR, name)
+        pq.write_table(table, path + ".tmp")
+        os.replace(path + ".tmp", path)
+        _write_meta({"record_count": int(meta["record_count"]) + len(df), "values": values})
+
+        if len(_part_files()) > PARQUET_COMPACT_FILES:
+            _compact()
+    return len(df)
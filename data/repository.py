@@ -1,212 +1,268 @@
-"""Database repository for call records (Excel storage)"""
+"""Database repository for call records (SQLite, Parquet or Excel storage)"""
 import os
-import re
 from datetime import datetime
 
 import pandas as pd
+from dotenv import load_dotenv
+
+from data import excel_store, parquet_store, sqlite_store
+from data.transcript_store import attach_transcripts, get_transcript, offload_transcripts
+from data.schema import AUDIO_HASH_COLUMN, CANONICAL_COLUMNS, RECORD_ID_COLUMN, build_records_frame, fill_typed_fields
+from data.schema import normalize_schema as _normalize_schema
+from data.trend_aggregates import AGGREGATES_META_KEY, RECENT_CAPACITY, TrendAggregates
+from data.trend_summary import TREND_COLUMNS, prepare_trend_summary, summarize_aggregates
+
+load_dotenv()
 
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
-EXCEL_FILE = os.path.join(PROJECT_ROOT, "call_records.xlsx")
+EXCEL_FILE = excel_store.EXCEL_FILE
+
+# Live storage backend: "sqlite" (append-only, default), "parquet" (columnar,
+# needs pyarrow) or "excel" (legacy)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "sqlite").strip().lower()
+
+_BACKENDS = {
+    "sqlite": sqlite_store,
+    "parquet": parquet_store,
+    "excel": excel_store,
+}
+
+if STORAGE_BACKEND not in _BACKENDS:
+    raise ValueError(
+        f"Unknown STORAGE_BACKEND '{STORAGE_BACKEND}'. "
+        f"Expected one of: {', '.join(sorted(_BACKENDS))}"
+    )
 
-CANONICAL_COLUMNS = ["Date", "File Name", "Transcript", "Analysis"]
+_store = _BACKENDS[STORAGE_BACKEND]
+_migration_checked = False
 
 
-def _normalize_schema(df: pd.DataFrame) -> pd.DataFrame:
-    """Normalize column names and ensure canonical columns exist.
+def _ensure_migrated():
+    """Import the legacy workbook once when the live store is first created"""
+    global _migration_checked
+    if _migration_checked:
+        return
+    _migration_checked = True
+    if _store is not excel_store and not _store.exists() and excel_store.exists():
+        migrate_from_excel(EXCEL_FILE)
 
-    This prevents schema drift (e.g., 'Filename' vs 'File Name') from causing
-    blanks/NaNs in key fields.
+
+def migrate_from_excel(excel_path=EXCEL_FILE, force=False):
     """
-    if df is None or df.empty:
-        return pd.DataFrame(columns=CANONICAL_COLUMNS)
+    One-shot import of an existing Excel workbook into the live store
 
-    working = df.copy()
-    col_lookup = {str(c).strip().lower(): c for c in working.columns}
-
-    def _coalesce(target: str, candidates: list[str]) -> None:
-        existing_target = target if target in working.columns else None
-        candidate_cols = [col_lookup.get(c) for c in candidates if col_lookup.get(c) in working.columns]
-
-        if existing_target is None:
-            if candidate_cols:
-                working[target] = working[candidate_cols[0]]
-            else:
-                working[target] = pd.NA
-        else:
-            for c in candidate_cols:
-                if c == target:
-                    continue
-                working[target] = working[target].fillna(working[c])
-
-    _coalesce("Date", ["date", "datetime", "timestamp", "time", "created at", "created_at"])
-    _coalesce("File Name", ["file name", "filename", "file_name", "file", "audio", "audio file", "audio_file"])
-    _coalesce("Transcript", ["transcript", "transcription", "text"])
-    _coalesce("Analysis", ["analysis", "ai analysis", "llm analysis", "insights"])
-
-    # Preserve any extra columns, but always keep canonical columns first.
-    ordered = CANONICAL_COLUMNS + [c for c in working.columns if c not in CANONICAL_COLUMNS]
-    working = working[ordered]
-    return working
+    Args:
+        excel_path: Path to the legacy .xlsx file
+        force: Import even if the store already contains records
+
+    Returns:
+        int: Number of records imported
+    """
+    if _store is excel_store:
+        raise ValueError("The live store is already Excel; nothing to migrate")
+    if not force and _store.exists() and _store.count_records() > 0:
+        return 0
+    if not os.path.exists(excel_path):
+        return 0
+
+    legacy = _normalize_schema(pd.read_excel(excel_path))
+    if legacy.empty:
+        return 0
+    legacy["File Name"] = legacy["File Name"].fillna("Unknown")
+    legacy = fill_typed_fields(legacy)
+    return _append(legacy)
+
+
+def export_to_excel(path):
+    """
+    Export all records, with their transcripts, to an Excel workbook
+
+    Args:
+        path: Destination .xlsx path
+
+    Returns:
+        int: Number of records exported
+    """
+    df = attach_transcripts(get_all_records())
+    excel_store.write_workbook(df, path)
+    return len(df)
 
 def database_exists():
-    """Check if database file exists"""
-    return os.path.exists(EXCEL_FILE)
+    """Check if the record store exists"""
+    _ensure_migrated()
+    return _store.exists()
+
+def _project(df, columns):
+    """Normalized records, limited to the requested columns when given"""
+    if columns is None:
+        return _normalize_schema(df)
+    working = df.copy()
+    for column in columns:
+        if column not in working.columns:
+            working[column] = pd.NA
+    return working[list(columns)]
 
-def get_all_records():
-    """Load all call records from Excel"""
+def get_all_records(columns=None, start=None, end=None):
+    """
+    Load call records from the record store
+
+    Args:
+        columns: Only load these columns (default: all)
+        start: Only records with Date >= start
+        end: Only records with Date < end
+
+    Returns:
+        pd.DataFrame: Records in insertion order
+    """
     if not database_exists():
         return pd.DataFrame()
-    df = pd.read_excel(EXCEL_FILE)
-    return _normalize_schema(df)
+    df = _store.read_records(columns=columns, start=start, end=end)
+    return _project(df, columns)
+
+def get_store_version():
+    """
+    Token that changes whenever records are written
+
+    Cheap to compute (file stats), so UI caches of store reads can be keyed
+    by it instead of re-reading the store on every rerun.
+
+    Returns:
+        str: Version token, or None if there is no store yet
+    """
+    return _store.version()
 
 def get_record_count():
     """Get total number of records"""
-    df = get_all_records()
-    return len(df)
+    if not database_exists():
+        return 0
+    return _store.count_records()
+
+def get_recent_records(n, columns=None):
+    """Load the last n records, optionally only the given columns"""
+    if not database_exists():
+        return pd.DataFrame()
+    return _project(_store.read_recent_records(int(n), columns=columns), columns)
+
+def _append(df):
+    """Append rows and fold them into the stored trend aggregates in the same write"""
+    def _update_aggregates(read_meta):
+        aggregates = TrendAggregates.from_json(read_meta(AGGREGATES_META_KEY))
+        if aggregates is None:
+            # Not built yet; get_trend_aggregates builds from all records
+            return {}
+        aggregates.add_records(df)
+        return {AGGREGATES_META_KEY: aggregates.to_json()}
 
-def prepare_trend_summary(df):
-    """Prepare data summary for trend analysis"""
+    return _store.append_records(df, update_meta=_update_aggregates)
+
+_AUDIO_LOOKUP_COLUMNS = [AUDIO_HASH_COLUMN, "Date", "File Name", "Transcript", "Analysis", RECORD_ID_COLUMN]
+
+def get_records_by_audio_hash(hashes, start=None):
+    """
+    Find stored records for already-processed audio
+
+    Looked up through the store's Audio Hash index (SQLite) or a pushed-down
+    filter (Parquet), so only matching rows are read.
+
+    Args:
+        hashes: audio_digest values to look up
+        start: Only records with Date >= start
+
+    Returns:
+        pd.DataFrame: The latest matching record per hash, with Audio Hash,
+            Date, File Name, Transcript (blob text attached), Analysis and Record ID
+    """
+    hashes = sorted({h for h in hashes if h})
+    if not hashes or not database_exists():
+        return pd.DataFrame(columns=_AUDIO_LOOKUP_COLUMNS)
+    df = _store.read_matching(AUDIO_HASH_COLUMN, hashes, columns=_AUDIO_LOOKUP_COLUMNS, start=start)
     if df.empty:
-        return "No data available"
-
-    expected_cols = {"Date", "File Name", "Analysis"}
-    missing_cols = expected_cols - set(df.columns)
-    if missing_cols:
-        return (
-            "The Excel database is missing required columns: "
-            f"{', '.join(sorted(missing_cols))}. "
-            "Expected columns: Date, File Name, Analysis."
-        )
+        return pd.DataFrame(columns=_AUDIO_LOOKUP_COLUMNS)
+    df = _project(df, _AUDIO_LOOKUP_COLUMNS).drop_duplicates(AUDIO_HASH_COLUMN, keep="last")
+    return attach_transcripts(df).reset_index(drop=True)
 
-    working = df.copy()
-    working["Date"] = pd.to_datetime(working["Date"], errors="coerce")
-    working = working.dropna(subset=["Date"])
-    if working.empty:
-        return "No valid dates found in the Excel database."
-
-    working = working.sort_values("Date")
-
-    def _extract(pattern: str, text: str) -> str | None:
-        if not isinstance(text, str) or not text.strip():
-            return None
-        match = re.search(pattern, text, flags=re.IGNORECASE | re.MULTILINE)
-        if not match:
-            return None
-        value = match.group(1).strip()
-        return value if value else None
-
-    def _extract_int(pattern: str, text: str) -> int | None:
-        value = _extract(pattern, text)
-        if value is None:
-            return None
-        m = re.search(r"\d+", value)
-        if not m:
-            return None
-        try:
-            return int(m.group(0))
-        except ValueError:
-            return None
-
-    analysis_text = working["Analysis"].astype(str)
-    working["Sentiment"] = analysis_text.apply(
-        lambda t: _extract(r"\*\*Sentiment:\*\*\s*([^\n\r]+)", t)
-    )
-    working["Category"] = analysis_text.apply(
-        lambda t: _extract(r"\*\*Category:\*\*\s*([^\n\r]+)", t)
-    )
-    working["Escalation Risk (%)"] = analysis_text.apply(
-        lambda t: _extract_int(r"\*\*Escalation\s*Risk:\*\*\s*([^\n\r]+)", t)
-    )
+def get_records_by_id(record_ids, columns=None, start=None):
+    """
+    Load the records with the given Record IDs
 
-    total_calls = len(working)
-    date_min = working["Date"].min().date()
-    date_max = working["Date"].max().date()
+    Looked up through the store's Record ID index (SQLite) or a pushed-down
+    filter (Parquet), so only matching rows are read.
 
-    sentiment_counts = (
-        working["Sentiment"].fillna("Unknown").str.strip().value_counts(dropna=False)
-    )
-    category_counts = (
-        working["Category"].fillna("Unknown").str.strip().value_counts(dropna=False)
-    )
+    Args:
+        record_ids: Record ID values to look up
+        columns: Only load these columns (default: all)
+        start: Only records with Date >= start
+
+    Returns:
+        pd.DataFrame: Matching records in insertion order
+    """
+    record_ids = [i for i in record_ids if i]
+    if not record_ids or not database_exists():
+        return _project(pd.DataFrame(columns=CANONICAL_COLUMNS), columns)
+    return _project(_store.read_matching(RECORD_ID_COLUMN, record_ids, columns=columns, start=start), columns)
 
-    risk_series = pd.to_numeric(working["Escalation Risk (%)"], errors="coerce")
-    avg_risk = float(risk_series.dropna().mean()) if risk_series.notna().any() else None
-    median_risk = float(risk_series.dropna().median()) if risk_series.notna().any() else None
-    high_risk = int((risk_series >= 70).sum()) if risk_series.notna().any() else 0
-
-    recent = working.tail(10).copy()
-    recent["Date"] = recent["Date"].dt.strftime("%Y-%m-%d %H:%M")
-    recent_cols = ["Date", "File Name", "Sentiment", "Escalation Risk (%)", "Category"]
-    recent_table = recent[recent_cols].to_string(index=False)
-
-    lines: list[str] = []
-    lines.append(f"Total Calls: {total_calls}")
-    lines.append(f"Date Range: {date_min} to {date_max}")
-    lines.append("")
-    lines.append("Sentiment (all calls):")
-    for k, v in sentiment_counts.items():
-        lines.append(f"- {k}: {int(v)}")
-    lines.append("")
-    lines.append("Top Categories (all calls):")
-    for k, v in category_counts.head(8).items():
-        lines.append(f"- {k}: {int(v)}")
-    lines.append("")
-    if avg_risk is not None:
-        lines.append(
-            f"Escalation Risk (%): avg={avg_risk:.1f}, median={median_risk:.1f}, high(>=70)={high_risk}"
+def get_trend_aggregates():
+    """Load the maintained trend aggregates, building them once if missing"""
+    if not database_exists():
+        return TrendAggregates()
+    aggregates = TrendAggregates.from_json(_store.read_meta(AGGREGATES_META_KEY))
+    if aggregates is None:
+        values = _store.rebuild_meta(
+            lambda df: {
+                AGGREGATES_META_KEY: TrendAggregates.from_records(_normalize_schema(df)).to_json()
+            }
         )
-    else:
-        lines.append("Escalation Risk (%): Not available (could not parse from Analysis)")
-    lines.append("")
-    lines.append("Most Recent 10 Calls:")
-    lines.append(recent_table)
-    lines.append("")
-    lines.append(
-        "Instruction: Base insights strictly on the counts/table above. Do not invent totals." 
-        "If a field is Unknown, treat it as missing data."
-    )
+        aggregates = TrendAggregates.from_json(values[AGGREGATES_META_KEY])
+    return aggregates
+
+def get_trend_summary(last_n=None):
+    """
+    Prepare the trend summary without loading every record
+
+    Args:
+        last_n: Only summarize the last N calls (None for all calls)
 
-    return "\n".join(lines)
+    Returns:
+        str: Summary text for analyze_trends
+    """
+    if last_n is not None and int(last_n) > RECENT_CAPACITY:
+        # Beyond the ring buffer: read just those rows
+        return prepare_trend_summary(get_recent_records(int(last_n), columns=TREND_COLUMNS))
+    return summarize_aggregates(get_trend_aggregates(), last_n)
 
 def save_record(filename, transcript, analysis):
     """
-    Save a new call record to Excel
+    Save a new call record to the record store
     
     Args:
         filename: Name of the audio file
         transcript: Transcribed text
-        analysis: AI analysis result
+        analysis: CallAnalysis (or legacy markdown text)
         
     Returns:
         tuple: (success: bool, error_message: str)
     """
-    safe_filename = "" if filename is None else str(filename)
-    safe_filename = os.path.basename(safe_filename).strip()
-    if not safe_filename:
-        safe_filename = "Unknown"
-
-    new_record = pd.DataFrame(
-        {
-            "Date": [datetime.now()],
-            "File Name": [safe_filename],
-            "Transcript": [transcript],
-            "Analysis": [analysis],
-        }
-    )
+    return save_records([(filename, transcript, analysis)])
+
+def save_records(records):
+    """
+    Save several call records with one write to the record store
     
-    try:
-        # Load existing records or create new
-        if database_exists():
-            existing = _normalize_schema(pd.read_excel(EXCEL_FILE))
-            updated = pd.concat([existing, new_record], ignore_index=True)
-        else:
-            updated = new_record
-
-        updated = _normalize_schema(updated)
-        updated["File Name"] = updated["File Name"].fillna("Unknown")
+    Args:
+        records: Iterable of (filename, transcript, analysis) tuples
         
-        # Save to Excel
-        updated.to_excel(EXCEL_FILE, index=False)
+    Returns:
+        tuple: (success: bool, error_message: str)
+    """
+    records = list(records)
+    if not records:
+        return True, None
+
+    new_records = build_records_frame(records, datetime.now())
+    
+    try:
+        _ensure_migrated()
+        _append(_normalize_schema(offload_transcripts(new_records)))
         return True, None
         
     except PermissionError:
@@ -1,311 +1,903 @@
-"""Database repository for call records (AWS S3 storage)"""
+"""Database repository for call records (AWS S3 storage)
+
+Records are stored as small immutable JSON Lines objects, one per saved
+batch, under a date-partitioned prefix:
+
+    <S3_RECORDS_PREFIX>date=YYYY-MM-DD/<timestamp>-<id>.jsonl
+
+Saving a batch is one PUT of that batch, independent of how many records
+exist. Reads list the prefix and fetch objects concurrently. Older
+partitions are periodically merged into one object each by
+compact_partitions(). A legacy S3_FILE_KEY workbook, if present, is read as
+a base layer until import_legacy_workbook() moves it into partitions.
+
+Several app replicas can save concurrently: record objects never collide,
+and the shared count/aggregates object is updated with conditional puts
+(If-Match) that are retried on conflict.
+"""
+import json
 import os
-import re
-import tempfile
-from datetime import datetime
-from io import BytesIO
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from io import BytesIO, StringIO
 
 import pandas as pd
-import boto3
 from botocore.exceptions import ClientError
 from dotenv import load_dotenv
 
+from data import excel_store
+from data.models import TYPED_COLUMNS
+from data.s3_client import create_s3_client, use_s3
+from data.schema import (
+    AUDIO_HASH_COLUMN,
+    CANONICAL_COLUMNS,
+    RECORD_ID_COLUMN,
+    TRANSCRIPT_LENGTH_COLUMN,
+    build_records_frame,
+    fill_typed_fields,
+)
+from data.schema import normalize_schema as _normalize_schema
+from data.transcript_store import attach_transcripts, get_transcript, offload_transcripts
+from data.trend_aggregates import RECENT_CAPACITY, TrendAggregates
+from data.trend_summary import TREND_COLUMNS, prepare_trend_summary, summarize_aggregates
+
 load_dotenv()
 
-# AWS Configuration from environment variables
-AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
-AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
-AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
+# AWS Configuration from environment variables (credentials: data/s3_client.py)
 S3_BUCKET_NAME = os.getenv("S3_BUCKET_NAME")
 S3_FILE_KEY = os.getenv("S3_FILE_KEY", "call_records.xlsx")
 
+# Partitioned record objects
+S3_RECORDS_PREFIX = os.getenv("S3_RECORDS_PREFIX", "records/").rstrip("/") + "/"
+S3_READ_WORKERS = int(os.getenv("S3_READ_WORKERS", "16"))
+META_KEY = f"{S3_RECORDS_PREFIX}_meta.json"
+PARTITION_MARKER = "date="
+
+# Parsed objects are kept in memory; mutable ones (metadata, legacy workbook,
+# the object listing) are revalidated once this many seconds have passed
+S3_READ_CACHE_SECONDS = float(os.getenv("S3_READ_CACHE_SECONDS", "5"))
+
+# The metadata object is updated with If-Match; writers that lose the race
+# re-read it and retry with jittered exponential backoff
+S3_META_WRITE_ATTEMPTS = int(os.getenv("S3_META_WRITE_ATTEMPTS", "20"))
+# Recently counted record objects, so a batch is never counted twice
+APPLIED_KEYS_LIMIT = 1000
+
 # Optional: Use local storage if S3 not configured (for local development)
-USE_S3 = os.getenv("USE_S3", "true").lower() == "true"
+USE_S3 = use_s3()
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
 LOCAL_EXCEL_FILE = os.path.join(PROJECT_ROOT, "call_records.xlsx")
 
-CANONICAL_COLUMNS = ["Date", "File Name", "Transcript", "Analysis"]
-
 # Initialize S3 client
 s3_client = None
 if USE_S3:
     try:
-        s3_client = boto3.client(
-            's3',
-            aws_access_key_id=AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-            region_name=AWS_REGION
-        )
+        s3_client = create_s3_client()
     except Exception as e:
         print(f"Warning: Could not initialize S3 client: {e}")
         print("Falling back to local storage")
         USE_S3 = False
 
+# Name of the live store, as reported by the migration CLI
+STORAGE_BACKEND = "s3" if USE_S3 and s3_client else "excel"
+
+_read_cache_lock = threading.Lock()
+_read_cache_stats = {
+    "hits": 0, "misses": 0, "bytes_saved": 0, "bytes_downloaded": 0, "write_conflicts": 0
+}
+_document_cache = {}  # key -> {etag, value, size, checked}
+_object_cache = {}  # record object key -> (etag, frame)
+_records_cache = None
+
+
+def _is_missing(error):
+    return error.response['Error']['Code'] in ('NoSuchKey', '404', 'NotFound')
 
-def _normalize_schema(df: pd.DataFrame) -> pd.DataFrame:
-    """Normalize column names and ensure canonical columns exist.
 
-    This prevents schema drift (e.g., 'Filename' vs 'File Name') from causing
-    blanks/NaNs in key fields.
+def _count(name, amount=1):
+    with _read_cache_lock:
+        _read_cache_stats[name] += amount
+
+
+def get_read_cache_stats():
+    """Hit/miss counters and bytes not downloaded thanks to the read cache"""
+    with _read_cache_lock:
+        counts = dict(_read_cache_stats)
+    lookups = counts["hits"] + counts["misses"]
+    counts["hit_rate"] = counts["hits"] / lookups if lookups else 0.0
+    return counts
+
+
+def _conditional_get(key, etag=None):
     """
-    if df is None or df.empty:
-        return pd.DataFrame(columns=CANONICAL_COLUMNS)
+    GET key unless it still has the given ETag
 
-    working = df.copy()
-    col_lookup = {str(c).strip().lower(): c for c in working.columns}
+    Returns:
+        tuple: (etag, body); body is None if unchanged, both are None if missing
+    """
+    kwargs = {'IfNoneMatch': etag} if etag else {}
+    try:
+        response = s3_client.get_object(Bucket=S3_BUCKET_NAME, Key=key, **kwargs)
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('304', 'NotModified'):
+            return etag, None
+        if _is_missing(e):
+            return None, None
+        raise
+    return response['ETag'], response['Body'].read()
 
-    def _coalesce(target: str, candidates: list[str]) -> None:
-        existing_target = target if target in working.columns else None
-        candidate_cols = [col_lookup.get(c) for c in candidates if col_lookup.get(c) in working.columns]
 
-        if existing_target is None:
-            if candidate_cols:
-                working[target] = working[candidate_cols[0]]
-            else:
-                working[target] = pd.NA
-        else:
-            for c in candidate_cols:
-                if c == target:
-                    continue
-                working[target] = working[target].fillna(working[c])
+def _read_document(key, parse, max_age=None):
+    """
+    Parsed content of a mutable object, revalidated with a conditional GET
+
+    Within max_age seconds (default S3_READ_CACHE_SECONDS) of the last check
+    the cached value is returned without any request. A missing object is
+    cached as None.
+    """
+    return _read_document_entry(key, parse, max_age)["value"]
+
+
+def _read_document_entry(key, parse, max_age=None):
+    """Like _read_document, but returns the cache entry with the value and its ETag"""
+    if max_age is None:
+        max_age = S3_READ_CACHE_SECONDS
+    with _read_cache_lock:
+        entry = _document_cache.get(key)
+    if entry is not None and time.monotonic() - entry["checked"] < max_age:
+        _count("hits")
+        _count("bytes_saved", entry["size"])
+        return entry
+
+    etag, body = _conditional_get(key, entry["etag"] if entry else None)
+    if etag is not None and body is None:
+        entry = dict(entry, checked=time.monotonic())
+        _count("hits")
+        _count("bytes_saved", entry["size"])
+    else:
+        size = 0 if body is None else len(body)
+        entry = {
+            "etag": etag,
+            "value": None if body is None else parse(body),
+            "size": size,
+            "checked": time.monotonic(),
+        }
+        _count("misses")
+        _count("bytes_downloaded", size)
+    with _read_cache_lock:
+        _document_cache[key] = entry
+    return entry
+
+
+def _remember_document(key, etag, value, size):
+    """Cache a value this process just wrote, so the next read needs no GET"""
+    with _read_cache_lock:
+        _document_cache[key] = {"etag": etag, "value": value, "size": size, "checked": time.monotonic()}
+
+
+def _invalidate_records():
+    """Make the next get_all_records() revalidate against S3"""
+    global _records_cache
+    with _read_cache_lock:
+        _records_cache = None
+        if S3_FILE_KEY in _document_cache:
+            _document_cache[S3_FILE_KEY]["checked"] = float("-inf")
+
+
+def _parse_legacy_workbook(body):
+    df = _normalize_schema(pd.read_excel(BytesIO(body)))
+    if RECORD_ID_COLUMN not in df.columns:
+        df[RECORD_ID_COLUMN] = pd.NA
+    legacy_ids = pd.Series([f"legacy-{i}" for i in range(len(df))], index=df.index)
+    df[RECORD_ID_COLUMN] = df[RECORD_ID_COLUMN].fillna(legacy_ids)
+    return df
+
+
+def _read_legacy_workbook():
+    """Records from the legacy single-workbook layout, or None if there is none
+
+    Rows get stable ids from their position so they de-duplicate against
+    the copies written by import_legacy_workbook(). The frame is shared with
+    the read cache; copy it before modifying.
+    """
+    return _read_document(S3_FILE_KEY, _parse_legacy_workbook)
 
-    _coalesce("Date", ["date", "datetime", "timestamp", "time", "created at", "created_at"])
-    _coalesce("File Name", ["file name", "filename", "file_name", "file", "audio", "audio file", "audio_file"])
-    _coalesce("Transcript", ["transcript", "transcription", "text"])
-    _coalesce("Analysis", ["analysis", "ai analysis", "llm analysis", "insights"])
 
-    # Preserve any extra columns, but always keep canonical columns first.
-    ordered = CANONICAL_COLUMNS + [c for c in working.columns if c not in CANONICAL_COLUMNS]
-    working = working[ordered]
-    return working
+def _partition_of(key):
+    """'YYYY-MM-DD' for a record object key, None for other keys"""
+    relative = key[len(S3_RECORDS_PREFIX):]
+    if not relative.startswith(PARTITION_MARKER) or "/" not in relative:
+        return None
+    return relative[len(PARTITION_MARKER):relative.index("/")]
 
 
-def _download_from_s3():
-    """Download Excel file from S3 to memory"""
+def _list_record_objects(first=None):
+    """
+    All record objects as {partition: [{Key, ETag, Size}]}, oldest first
+
+    With first ('YYYY-MM-DD'), keys sort by date, so listing starts at that
+    partition and older ones are never listed.
+    """
+    partitions = {}
+    paginator = s3_client.get_paginator('list_objects_v2')
+    kwargs = {} if first is None else {'StartAfter': f"{S3_RECORDS_PREFIX}{PARTITION_MARKER}{first}"}
+    for page in paginator.paginate(Bucket=S3_BUCKET_NAME, Prefix=S3_RECORDS_PREFIX, **kwargs):
+        for obj in page.get('Contents', []):
+            partition = _partition_of(obj['Key'])
+            if partition is not None and obj['Key'].endswith(".jsonl"):
+                partitions.setdefault(partition, []).append(
+                    {'Key': obj['Key'], 'ETag': obj['ETag'], 'Size': obj['Size']}
+                )
+    return {
+        p: sorted(objects, key=lambda obj: obj['Key'])
+        for p, objects in sorted(partitions.items())
+    }
+
+
+def _frame_to_jsonl(df):
+    return df.to_json(orient="records", lines=True, date_format="iso").encode("utf-8")
+
+
+def _frame_from_jsonl(body):
+    text = body.decode("utf-8")
+    if not text.strip():
+        return pd.DataFrame(columns=CANONICAL_COLUMNS)
+    df = pd.read_json(StringIO(text), lines=True, dtype=False, convert_dates=False)
+    df["Date"] = pd.to_datetime(df["Date"], errors="coerce", format="ISO8601")
+    for column in (TYPED_COLUMNS[2], TRANSCRIPT_LENGTH_COLUMN):
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors="coerce").astype("Int64")
+    return df
+
+
+def _read_object(obj):
+    """Records in one object; None if it was removed by a concurrent compaction
+
+    Record objects are immutable, so a cached frame with the listed ETag is
+    reused without any request.
+    """
+    with _read_cache_lock:
+        cached = _object_cache.get(obj['Key'])
+    if cached is not None and cached[0] == obj['ETag']:
+        _count("hits")
+        _count("bytes_saved", obj['Size'])
+        return cached[1]
     try:
-        response = s3_client.get_object(Bucket=S3_BUCKET_NAME, Key=S3_FILE_KEY)
-        return BytesIO(response['Body'].read())
+        response = s3_client.get_object(Bucket=S3_BUCKET_NAME, Key=obj['Key'])
     except ClientError as e:
-        if e.response['Error']['Code'] == 'NoSuchKey':
-            # File doesn't exist yet, return None
+        if _is_missing(e):
             return None
-        else:
-            raise
+        raise
+    body = response['Body'].read()
+    frame = _frame_from_jsonl(body)
+    _count("misses")
+    _count("bytes_downloaded", len(body))
+    with _read_cache_lock:
+        _object_cache[obj['Key']] = (obj['ETag'], frame)
+    return frame
+
+
+def _read_objects(objects):
+    """Fetch objects concurrently; returns (frames, keys that have disappeared)"""
+    if not objects:
+        return [], []
+    with ThreadPoolExecutor(max_workers=max(1, min(S3_READ_WORKERS, len(objects)))) as pool:
+        frames = list(pool.map(_read_object, objects))
+    missing = [obj['Key'] for obj, frame in zip(objects, frames) if frame is None]
+    return [frame for frame in frames if frame is not None], missing
+
+
+def _combine(frames):
+    """Concatenate record frames, drop duplicate ids and order by Date"""
+    frames = [frame for frame in frames if frame is not None and not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=CANONICAL_COLUMNS)
+    df = _normalize_schema(pd.concat(frames, ignore_index=True))
+    if RECORD_ID_COLUMN in df.columns:
+        has_id = df[RECORD_ID_COLUMN].notna()
+        df = df[~(has_id & df[RECORD_ID_COLUMN].duplicated())]
+    df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
+    return df.sort_values("Date", kind="stable").reset_index(drop=True)
 
 
-def _upload_to_s3(excel_buffer):
-    """Upload Excel file from memory to S3"""
+def _read_partitions(partitions, listing):
+    """
+    Records for the given partition dates, re-listing once if a compaction raced us
+
+    Returns:
+        tuple: (frames, keys of the objects that were read)
+    """
+    objects = [obj for p in partitions for obj in listing.get(p, [])]
+    frames, missing = _read_objects(objects)
+    keys = [obj['Key'] for obj in objects if obj['Key'] not in missing]
+    if missing:
+        seen = {obj['Key'] for obj in objects}
+        listing = _list_record_objects()
+        retry = [obj for p in partitions for obj in listing.get(p, []) if obj['Key'] not in seen]
+        more, gone = _read_objects(retry)
+        frames.extend(more)
+        keys.extend(obj['Key'] for obj in retry if obj['Key'] not in gone)
+    return frames, keys
+
+
+def _write_records_object(df, partition=None, name=None):
+    """PUT one immutable object holding df; returns its key"""
+    if partition is None:
+        partition = pd.Timestamp(df["Date"].min()).strftime("%Y-%m-%d")
+    if name is None:
+        name = f"{datetime.now().strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:12]}"
+    key = f"{S3_RECORDS_PREFIX}{PARTITION_MARKER}{partition}/{name}.jsonl"
+    s3_client.put_object(
+        Bucket=S3_BUCKET_NAME,
+        Key=key,
+        Body=_frame_to_jsonl(df),
+        ContentType='application/x-ndjson'
+    )
+    _invalidate_records()
+    return key
+
+
+def _parse_meta(body):
+    try:
+        return json.loads(body.decode("utf-8"))
+    except ValueError:
+        return None
+
+
+def _read_meta(max_age=None):
+    """Stored {record_count, trend_aggregates}, or None if not written yet"""
+    return _read_document(META_KEY, _parse_meta, max_age)
+
+
+def _write_meta(meta, etag):
+    """
+    Conditionally PUT the metadata object
+
+    Args:
+        meta: New metadata
+        etag: ETag of the version meta was computed from (None if there was none)
+
+    Returns:
+        bool: False if another writer changed the object first
+    """
+    body = json.dumps(meta).encode("utf-8")
+    condition = {'IfMatch': etag} if etag else {'IfNoneMatch': '*'}
     try:
-        s3_client.put_object(
+        response = s3_client.put_object(
             Bucket=S3_BUCKET_NAME,
-            Key=S3_FILE_KEY,
-            Body=excel_buffer.getvalue(),
-            ContentType='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            Key=META_KEY,
+            Body=body,
+            ContentType='application/json',
+            **condition
         )
-        return True
+    except ClientError as e:
+        # NoSuchKey: the object we meant to replace was deleted meanwhile
+        if e.response['Error']['Code'] in (
+            'PreconditionFailed', 'ConditionalRequestConflict', 'NoSuchKey', '412', '409', '404'
+        ):
+            return False
+        raise
+    _remember_document(META_KEY, response.get('ETag'), meta, len(body))
+    return True
+
+
+def _meta_is_valid(meta):
+    return meta is not None and TrendAggregates.from_json(meta.get("trend_aggregates")) is not None
+
+
+def _build_meta():
+    """Recompute the count and aggregates from every record"""
+    listing = _list_record_objects()
+    frames, keys = _read_partitions(list(listing), listing)
+    frames.insert(0, _read_legacy_workbook())
+    records = _combine(frames)
+    # Exactly the batches counted here, so their writers don't add them again
+    applied = sorted(
+        key for key in keys
+        if not key.rsplit("/", 1)[-1].startswith(("compacted-", "legacy-"))
+    )
+    return {
+        "record_count": len(records),
+        "trend_aggregates": TrendAggregates.from_records(records).to_json(),
+        "applied_keys": applied[-APPLIED_KEYS_LIMIT:],
+    }
+
+
+def _update_meta(update):
+    """
+    Read-modify-write the metadata object with If-Match, retrying on conflicts
+
+    Args:
+        update: Function of the current metadata (None if missing or
+            unreadable) returning the new metadata; called again after
+            every conflict
+
+    Returns:
+        dict: The metadata written, or None if every attempt conflicted (the
+        object is then deleted so the next reader rebuilds it)
+    """
+    for attempt in range(S3_META_WRITE_ATTEMPTS):
+        entry = _read_document_entry(META_KEY, _parse_meta, max_age=0)
+        meta = update(entry["value"])
+        if _write_meta(meta, entry["etag"]):
+            return meta
+        _count("write_conflicts")
+        time.sleep(random.uniform(0, min(1.0, 0.05 * 2 ** attempt)))
+
+    print("Warning: could not update S3 record metadata; it will be rebuilt on next read")
+    _discard_meta()
+    return None
+
+
+def _discard_meta():
+    """Delete the metadata object so the next reader rebuilds it from the records"""
+    try:
+        s3_client.delete_object(Bucket=S3_BUCKET_NAME, Key=META_KEY)
     except Exception as e:
-        print(f"Error uploading to S3: {e}")
-        return False
+        print(f"Warning: could not delete S3 record metadata: {e}")
+    with _read_cache_lock:
+        _document_cache.pop(META_KEY, None)
+
+
+def _load_meta():
+    meta = _read_meta()
+    if not _meta_is_valid(meta):
+        meta = _update_meta(lambda current: current if _meta_is_valid(current) else _build_meta())
+    if meta is None:
+        # Still contended after every retry; serve an unsaved rebuild
+        meta = _build_meta()
+    return meta
 
 
 def database_exists():
     """Check if database file exists (S3 or local)"""
     if USE_S3 and s3_client:
-        try:
-            s3_client.head_object(Bucket=S3_BUCKET_NAME, Key=S3_FILE_KEY)
-            return True
-        except ClientError:
-            return False
+        for key in (META_KEY, S3_FILE_KEY):
+            try:
+                s3_client.head_object(Bucket=S3_BUCKET_NAME, Key=key)
+                return True
+            except ClientError:
+                pass
+        response = s3_client.list_objects_v2(
+            Bucket=S3_BUCKET_NAME, Prefix=f"{S3_RECORDS_PREFIX}{PARTITION_MARKER}", MaxKeys=1
+        )
+        return response.get('KeyCount', 0) > 0
     else:
         return os.path.exists(LOCAL_EXCEL_FILE)
 
 
-def get_all_records():
-    """Load all call records from S3 or local storage"""
+def _cached_records():
+    """All records, served from memory when no object changed since the last read"""
+    global _records_cache
+    with _read_cache_lock:
+        cached = _records_cache
+    if cached is not None and time.monotonic() - cached["checked"] < S3_READ_CACHE_SECONDS:
+        _count("hits", cached["objects"])
+        _count("bytes_saved", cached["size"])
+        return cached["frame"]
+
+    listing = _list_record_objects()
+    legacy = _read_legacy_workbook()
+    with _read_cache_lock:
+        legacy_entry = _document_cache.get(S3_FILE_KEY) or {}
+    signature = (
+        tuple((obj['Key'], obj['ETag']) for objects in listing.values() for obj in objects),
+        legacy_entry.get("etag"),
+    )
+    objects = sum(len(objects) for objects in listing.values())
+    size = sum(obj['Size'] for objects in listing.values() for obj in objects)
+
+    if cached is not None and cached["signature"] == signature:
+        frame = cached["frame"]
+        _count("hits", objects)
+        _count("bytes_saved", size)
+    else:
+        frames, _ = _read_partitions(list(listing), listing)
+        frames.insert(0, legacy)
+        frame = _combine(frames)
+        listed = {obj['Key'] for objects in listing.values() for obj in objects}
+        with _read_cache_lock:
+            # Compacted-away objects will never be read again
+            for key in [k for k in _object_cache if k not in listed]:
+                del _object_cache[key]
+    with _read_cache_lock:
+        _records_cache = {
+            "signature": signature,
+            "frame": frame,
+            "objects": objects,
+            "size": size,
+            "checked": time.monotonic(),
+        }
+    return frame
+
+
+def _select(df, columns=None, start=None, end=None):
+    """Filter records to a Date window and project them onto the given columns"""
+    if start is not None or end is not None:
+        dates = pd.to_datetime(df["Date"], errors="coerce")
+        keep = pd.Series(True, index=df.index)
+        if start is not None:
+            keep &= dates >= pd.Timestamp(start)
+        if end is not None:
+            keep &= dates < pd.Timestamp(end)
+        df = df[keep]
+    if columns is None:
+        return df.copy()
+    df = df.copy()
+    for column in columns:
+        if column not in df.columns:
+            df[column] = pd.NA
+    return df[list(columns)]
+
+
+def _records_between(start, end):
+    """Records from only the date partitions overlapping [start, end)"""
+    first = None if start is None else pd.Timestamp(start).strftime("%Y-%m-%d")
+    last = None if end is None else pd.Timestamp(end).strftime("%Y-%m-%d")
+    listing = _list_record_objects(first)
+    partitions = [
+        p for p in listing
+        if (first is None or p >= first) and (last is None or p <= last)
+    ]
+    frames, _ = _read_partitions(partitions, listing)
+    frames.insert(0, _read_legacy_workbook())
+    return _combine(frames)
+
+
+def get_all_records(columns=None, start=None, end=None):
+    """
+    Load call records from S3 or local storage
+
+    Args:
+        columns: Only return these columns (default: all)
+        start: Only records with Date >= start
+        end: Only records with Date < end
+
+    On S3 a Date window only fetches the matching date partitions.
+    """
     if USE_S3 and s3_client:
         try:
-            excel_data = _download_from_s3()
-            if excel_data is None:
-                return pd.DataFrame(columns=CANONICAL_COLUMNS)
-            df = pd.read_excel(excel_data)
-            return _normalize_schema(df)
+            if start is None and end is None:
+                df = _cached_records()
+            else:
+                df = _records_between(start, end)
+            return _select(df, columns, start, end)
         except Exception as e:
             print(f"Error reading from S3: {e}")
-            return pd.DataFrame(columns=CANONICAL_COLUMNS)
+            return pd.DataFrame(columns=CANONICAL_COLUMNS if columns is None else list(columns))
     else:
         # Fallback to local storage
         if not os.path.exists(LOCAL_EXCEL_FILE):
-            return pd.DataFrame(columns=CANONICAL_COLUMNS)
+            return pd.DataFrame(columns=CANONICAL_COLUMNS if columns is None else list(columns))
         df = pd.read_excel(LOCAL_EXCEL_FILE)
-        return _normalize_schema(df)
+        return _select(_normalize_schema(df), columns, start, end)
+
+
+def get_store_version():
+    """
+    Token that changes whenever records are written
+
+    On S3 this is the metadata object's ETag, revalidated at most every
+    S3_READ_CACHE_SECONDS, so UI caches of store reads can be keyed by it.
+
+    Returns:
+        str: Version token, or None if there is no store yet
+    """
+    if USE_S3 and s3_client:
+        try:
+            return _read_document_entry(META_KEY, _parse_meta)["etag"]
+        except Exception as e:
+            print(f"Error reading record metadata version from S3: {e}")
+            return None
+    return excel_store.version()
 
 
 def get_record_count():
-    """Get total number of records"""
-    df = get_all_records()
-    return len(df)
+    """Get total number of records from the metadata object"""
+    if USE_S3 and s3_client:
+        try:
+            return int(_load_meta()["record_count"])
+        except Exception as e:
+            print(f"Error reading record count from S3: {e}")
+            return 0
+    return excel_store.count_records()
+
+
+def get_recent_records(n, columns=None):
+    """Load the last n records, fetching newest partitions first"""
+    n = int(n)
+    if not (USE_S3 and s3_client):
+        return get_all_records(columns).tail(n)
+    try:
+        listing = _list_record_objects()
+        partitions = list(listing)
+        frames = []
+        # Fetch a few partitions per round so short partitions don't cost a round trip each
+        while partitions and sum(len(f) for f in frames) < n:
+            batch, partitions = partitions[-S3_READ_WORKERS:], partitions[:-S3_READ_WORKERS]
+            frames = _read_partitions(batch, listing)[0] + frames
+        if sum(len(f) for f in frames) < n:
+            frames.insert(0, _read_legacy_workbook())
+        return _select(_combine(frames).tail(n), columns)
+    except Exception as e:
+        print(f"Error reading from S3: {e}")
+        return pd.DataFrame(columns=CANONICAL_COLUMNS if columns is None else list(columns))
+
+
+_AUDIO_LOOKUP_COLUMNS = [AUDIO_HASH_COLUMN, "Date", "File Name", "Transcript", "Analysis", RECORD_ID_COLUMN]
+
+
+def get_records_by_audio_hash(hashes, start=None):
+    """
+    Find stored records for already-processed audio
+
+    Only the Audio Hash column is read unless one of the hashes matches.
+    With start, only the date partitions from that day on are listed and
+    fetched.
+
+    Args:
+        hashes: audio_digest values to look up
+        start: Only records with Date >= start
+
+    Returns:
+        pd.DataFrame: The latest matching record per hash, with Audio Hash,
+            Date, File Name, Transcript (blob text attached), Analysis and Record ID
+    """
+    hashes = {h for h in hashes if h}
+    if not hashes:
+        return pd.DataFrame(columns=_AUDIO_LOOKUP_COLUMNS)
+    known = get_all_records(columns=[AUDIO_HASH_COLUMN], start=start)
+    if known.empty or not known[AUDIO_HASH_COLUMN].isin(hashes).any():
+        return pd.DataFrame(columns=_AUDIO_LOOKUP_COLUMNS)
+    df = get_all_records(columns=_AUDIO_LOOKUP_COLUMNS, start=start)
+    df = df[df[AUDIO_HASH_COLUMN].isin(hashes)].drop_duplicates(AUDIO_HASH_COLUMN, keep="last")
+    return attach_transcripts(df).reset_index(drop=True)
+
+
+def get_records_by_id(record_ids, columns=None, start=None):
+    """
+    Load the records with the given Record IDs
+
+    Record objects have no per-id index. Pass start to bound the search: only
+    the date partitions from that day on are listed and fetched.
+
+    Args:
+        record_ids: Record ID values to look up
+        columns: Only return these columns (default: all)
+        start: Only records with Date >= start
+
+    Returns:
+        pd.DataFrame: Matching records in insertion order
+    """
+    record_ids = {i for i in record_ids if i}
+    if not record_ids:
+        return pd.DataFrame(columns=CANONICAL_COLUMNS if columns is None else list(columns))
+    df = get_all_records(start=start)
+    if RECORD_ID_COLUMN not in df.columns:
+        return _select(df.iloc[0:0], columns)
+    return _select(df[df[RECORD_ID_COLUMN].isin(record_ids)], columns)
+
+
+def get_trend_aggregates():
+    """Load trend aggregates from the metadata object, building it once if missing"""
+    if not (USE_S3 and s3_client):
+        return TrendAggregates.from_records(get_all_records())
+    return TrendAggregates.from_json(_load_meta()["trend_aggregates"])
+
+
+def get_trend_summary(last_n=None):
+    """
+    Prepare the trend summary from stored aggregates
+
+    Args:
+        last_n: Only summarize the last N calls (None for all calls)
+
+    Returns:
+        str: Summary text for analyze_trends
+    """
+    if last_n is not None and int(last_n) > RECENT_CAPACITY:
+        return prepare_trend_summary(get_recent_records(int(last_n), columns=TREND_COLUMNS))
+    return summarize_aggregates(get_trend_aggregates(), last_n)
 
 
 def save_record(filename, transcript, analysis):
     """
     Save a new call record to S3 or local storage
-    
+
     Args:
         filename: Name of the audio file
         transcript: Transcribed text
-        analysis: AI analysis result
-        
+        analysis: CallAnalysis (or legacy markdown text)
+
     Returns:
         tuple: (success: bool, error_message: str)
     """
-    safe_filename = "" if filename is None else str(filename)
-    safe_filename = os.path.basename(safe_filename).strip()
-    if not safe_filename:
-        safe_filename = "Unknown"
-
-    new_record = pd.DataFrame(
-        {
-            "Date": [datetime.now()],
-            "File Name": [safe_filename],
-            "Transcript": [transcript],
-            "Analysis": [analysis],
-        }
-    )
-    
+    return save_records([(filename, transcript, analysis)])
+
+
+def save_records(records):
+    """
+    Save several call records as one new S3 object (or to local storage)
+
+    Args:
+        records: Iterable of (filename, transcript, analysis) tuples
+
+    Returns:
+        tuple: (success: bool, error_message: str)
+    """
+    records = list(records)
+    if not records:
+        return True, None
+
+    new_record = build_records_frame(records, datetime.now())
+    new_record["File Name"] = new_record["File Name"].fillna("Unknown")
+
     try:
-        # Load existing records or create new
-        if database_exists():
-            existing = get_all_records()
+        new_record = offload_transcripts(new_record)
+        if USE_S3 and s3_client:
+            # The records are durable once their object is written; the
+            # metadata update below only has to be applied exactly once
+            key = _write_records_object(new_record)
+
+            def _add_batch(meta):
+                if not _meta_is_valid(meta):
+                    # First save (or stale metadata): the rebuild includes the new object
+                    return _build_meta()
+                applied = meta.get("applied_keys", [])
+                if key in applied:
+                    # A concurrent rebuild already counted this batch
+                    return meta
+                aggregates = TrendAggregates.from_json(meta["trend_aggregates"])
+                aggregates.add_records(new_record)
+                return {
+                    "record_count": int(meta["record_count"]) + len(new_record),
+                    "trend_aggregates": aggregates.to_json(),
+                    "applied_keys": (applied + [key])[-APPLIED_KEYS_LIMIT:],
+                }
+
+            try:
+                _update_meta(_add_batch)
+            except Exception as e:
+                print(f"Warning: records saved but S3 metadata update failed: {e}")
+                _discard_meta()
+            return True, None
+
+        # Save to local file
+        if os.path.exists(LOCAL_EXCEL_FILE):
+            existing = pd.read_excel(LOCAL_EXCEL_FILE)
             updated = pd.concat([existing, new_record], ignore_index=True)
         else:
             updated = new_record
-
         updated = _normalize_schema(updated)
-        updated["File Name"] = updated["File Name"].fillna("Unknown")
-        
-        # Save to S3 or local
-        if USE_S3 and s3_client:
-            # Save to memory buffer
-            excel_buffer = BytesIO()
-            updated.to_excel(excel_buffer, index=False, engine='openpyxl')
-            excel_buffer.seek(0)
-            
-            # Upload to S3
-            if _upload_to_s3(excel_buffer):
-                return True, None
-            else:
-                return False, "Failed to upload to S3"
-        else:
-            # Save to local file
-            updated.to_excel(LOCAL_EXCEL_FILE, index=False)
-            return True, None
-        
+        updated.to_excel(LOCAL_EXCEL_FILE, index=False)
+        return True, None
+
     except PermissionError:
         return False, "Excel file is open! Close 'call_records.xlsx' and try again."
     except Exception as e:
         return False, f"Error saving record: {str(e)}"
 
 
-def prepare_trend_summary(df):
-    """Prepare data summary for trend analysis"""
-    if df.empty:
-        return "No data available"
+def compact_partitions(before=None):
+    """
+    Merge each partition's small objects into a single object
 
-    expected_cols = {"Date", "File Name", "Analysis"}
-    missing_cols = expected_cols - set(df.columns)
-    if missing_cols:
-        return (
-            "The database is missing required columns: "
-            f"{', '.join(sorted(missing_cols))}. "
-            "Expected columns: Date, File Name, Analysis."
-        )
+    The merged object is written before the originals are deleted, so a
+    concurrent reader sees every record at least once (duplicates are
+    dropped by Record ID).
 
-    working = df.copy()
-    working["Date"] = pd.to_datetime(working["Date"], errors="coerce")
-    working = working.dropna(subset=["Date"])
-    if working.empty:
-        return "No valid dates found in the database."
+    Args:
+        before: Only compact partitions dated before this date (default:
+            today, so partitions still receiving writes are left alone)
 
-    working = working.sort_values("Date")
+    Returns:
+        dict: {partition: number of objects merged} for compacted partitions
+    """
+    if not (USE_S3 and s3_client):
+        return {}
+    cutoff = (before or date.today()).isoformat()
+    compacted = {}
+    for partition, objects in _list_record_objects().items():
+        if partition >= cutoff or len(objects) < 2:
+            continue
+        frames, _ = _read_objects(objects)
+        merged = _combine(frames)
+        if not merged.empty:
+            _write_records_object(merged, partition, name=f"compacted-{uuid.uuid4().hex}")
+        for start in range(0, len(objects), 1000):
+            s3_client.delete_objects(
+                Bucket=S3_BUCKET_NAME,
+                Delete={
+                    'Objects': [{'Key': obj['Key']} for obj in objects[start:start + 1000]],
+                    'Quiet': True
+                }
+            )
+        compacted[partition] = len(objects)
+    _invalidate_records()
+    return compacted
+
+
+def _write_imported(legacy):
+    """Write imported rows as legacy-* objects in the partitions of their Date"""
+    legacy = legacy.copy()
+    legacy["Date"] = pd.to_datetime(legacy["Date"], errors="coerce")
+    legacy["File Name"] = legacy["File Name"].fillna("Unknown")
+    dated = legacy.dropna(subset=["Date"])
+    for partition, rows in dated.groupby(dated["Date"].dt.strftime("%Y-%m-%d")):
+        _write_records_object(rows, partition, name=f"legacy-{uuid.uuid4().hex}")
+    undated = legacy[legacy["Date"].isna()]
+    if not undated.empty:
+        _write_records_object(undated, "1970-01-01", name=f"legacy-{uuid.uuid4().hex}")
+
+
+def migrate_from_excel(excel_path=LOCAL_EXCEL_FILE, force=False):
+    """
+    One-shot import of a local Excel workbook into the S3 record store
 
-    def _extract(pattern: str, text: str) -> str | None:
-        if not isinstance(text, str) or not text.strip():
-            return None
-        match = re.search(pattern, text, flags=re.IGNORECASE | re.MULTILINE)
-        if not match:
-            return None
-        value = match.group(1).strip()
-        return value if value else None
+    Args:
+        excel_path: Path to the legacy .xlsx file
+        force: Import even if the store already contains records
 
-    def _extract_int(pattern: str, text: str) -> int | None:
-        value = _extract(pattern, text)
-        if value is None:
-            return None
-        m = re.search(r"\d+", value)
-        if not m:
-            return None
-        try:
-            return int(m.group(0))
-        except ValueError:
-            return None
+    Returns:
+        int: Number of records imported
+    """
+    if not (USE_S3 and s3_client):
+        raise ValueError("The live store is already Excel; nothing to migrate")
+    if not force and get_record_count() > 0:
+        return 0
+    if not os.path.exists(excel_path):
+        return 0
+
+    legacy = _normalize_schema(pd.read_excel(excel_path))
+    if legacy.empty:
+        return 0
+    _write_imported(fill_typed_fields(legacy))
+    _invalidate_records()
+    # The count and aggregates are rebuilt from the records on next read
+    _discard_meta()
+    return len(legacy)
+
+
+def export_to_excel(path):
+    """
+    Export all records, with their transcripts, to an Excel workbook
 
-    analysis_text = working["Analysis"].astype(str)
-    working["Sentiment"] = analysis_text.apply(
-        lambda t: _extract(r"\*\*Sentiment:\*\*\s*([^\n\r]+)", t)
-    )
-    working["Category"] = analysis_text.apply(
-        lambda t: _extract(r"\*\*Category:\*\*\s*([^\n\r]+)", t)
-    )
-    working["Escalation Risk (%)"] = analysis_text.apply(
-        lambda t: _extract_int(r"\*\*Escalation\s*Risk:\*\*\s*([^\n\r]+)", t)
-    )
+    Args:
+        path: Destination .xlsx path
 
-    total_calls = len(working)
-    date_min = working["Date"].min().date()
-    date_max = working["Date"].max().date()
+    Returns:
+        int: Number of records exported
+    """
+    df = attach_transcripts(get_all_records())
+    excel_store.write_workbook(df, path)
+    return len(df)
 
-    sentiment_counts = (
-        working["Sentiment"].fillna("Unknown").str.strip().value_counts(dropna=False)
-    )
-    category_counts = (
-        working["Category"].fillna("Unknown").str.strip().value_counts(dropna=False)
-    )
 
-    risk_series = pd.to_numeric(working["Escalation Risk (%)"], errors="coerce")
-    avg_risk = float(risk_series.dropna().mean()) if risk_series.notna().any() else None
-    median_risk = float(risk_series.dropna().median()) if risk_series.notna().any() else None
-    high_risk = int((risk_series >= 70).sum()) if risk_series.notna().any() else 0
-
-    recent = working.tail(10).copy()
-    recent["Date"] = recent["Date"].dt.strftime("%Y-%m-%d %H:%M")
-    recent_cols = ["Date", "File Name", "Sentiment", "Escalation Risk (%)", "Category"]
-    recent_table = recent[recent_cols].to_string(index=False)
-
-    lines: list[str] = []
-    lines.append(f"Total Calls: {total_calls}")
-    lines.append(f"Date Range: {date_min} to {date_max}")
-    lines.append("")
-    lines.append("Sentiment (all calls):")
-    for k, v in sentiment_counts.items():
-        lines.append(f"- {k}: {int(v)}")
-    lines.append("")
-    lines.append("Top Categories (all calls):")
-    for k, v in category_counts.head(8).items():
-        lines.append(f"- {k}: {int(v)}")
-    lines.append("")
-    if avg_risk is not None:
-        lines.append(
-            f"Escalation Risk (%): avg={avg_risk:.1f}, median={median_risk:.1f}, high(>=70)={high_risk}"
-        )
-    else:
-        lines.append("Escalation Risk (%): Not available (could not parse from Analysis)")
-    lines.append("")
-    lines.append("Most Recent 10 Calls:")
-    lines.append(recent_table)
-    lines.append("")
-    lines.append(
-        "Instruction: Base insights strictly on the counts/table above. Do not invent totals." 
-        "If a field is Unknown, treat it as missing data."
-    )
+def import_legacy_workbook():
+    """
+    Move records from the legacy S3_FILE_KEY workbook into date partitions
+
+    The workbook is kept as <S3_FILE_KEY>.migrated after its rows are copied.
 
-    return "\n".join(lines)
+    Returns:
+        int: Number of records imported (0 if there is no legacy workbook)
+    """
+    if not (USE_S3 and s3_client):
+        return 0
+    legacy = _read_legacy_workbook()
+    if legacy is None:
+        return 0
+    _write_imported(legacy)
+
+    s3_client.copy_object(
+        Bucket=S3_BUCKET_NAME,
+        Key=f"{S3_FILE_KEY}.migrated",
+        CopySource={'Bucket': S3_BUCKET_NAME, 'Key': S3_FILE_KEY}
+    )
+    s3_client.delete_object(Bucket=S3_BUCKET_NAME, Key=S3_FILE_KEY)
+    _invalidate_records()
+    return len(legacy)
@@ -0,0 +1,34 @@
+"""Shared S3 settings for the record store, transcript blobs and result caches
+
+All three read USE_S3 through use_s3(), so they agree on where data lives:
+records on S3 never point at transcript blobs on one replica's local disk.
+USE_S3 defaults to true; without S3_BUCKET_NAME, the blob store and caches
+stay on local disk.
+"""
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def use_s3():
+    """True unless USE_S3 is set to something other than "true" """
+    return os.getenv("USE_S3", "true").lower() == "true"
+
+
+def create_s3_client():
+    """
+    Create a boto3 S3 client from AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY and AWS_REGION
+
+    Returns:
+        botocore S3 client
+    """
+    import boto3
+
+    return boto3.client(
+        "s3",
+        aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+        region_name=os.getenv("AWS_REGION", "us-east-1"),
+    )
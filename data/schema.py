@@ -0,0 +1,169 @@
+"""Shared record schema for call record storage backends"""
+import hashlib
+import os
+import re
+import uuid
+from datetime import datetime
+
+import pandas as pd
+
+from data.models import TYPED_COLUMNS, CallAnalysis
+
+CANONICAL_COLUMNS = ["Date", "File Name", "Transcript", "Analysis"]
+
+# Unique per record; lets partitioned stores de-duplicate overlapping reads
+RECORD_ID_COLUMN = "Record ID"
+# Set when the transcript text lives in a blob instead of the Transcript column
+TRANSCRIPT_LENGTH_COLUMN = "Transcript Length"
+# SHA-256 of the source audio; recognizes a file that was already processed
+AUDIO_HASH_COLUMN = "Audio Hash"
+
+# Each optional lookahead captures the first occurrence of one field, so one
+# match per text yields all three. The risk group keeps only the first
+# number on the field's line ("High (80%)" -> 80).
+_LEGACY_FIELDS_PATTERN = re.compile(
+    r"\A"
+    r"(?=(?:[\s\S]*?\*\*Sentiment:\*\*\s*(?P<sentiment>[^\n\r]+))?)"
+    r"(?=(?:[\s\S]*?\*\*Category:\*\*\s*(?P<category>[^\n\r]+))?)"
+    r"(?=(?:[\s\S]*?\*\*Escalation\s*Risk:\*\*\s*[^\n\r\d]*(?P<risk>\d+))?)",
+    re.IGNORECASE,
+)
+
+# Analysis text -> extracted typed fields, shared across trend runs
+LEGACY_FIELD_CACHE_MAX_ROWS = 500_000
+_legacy_field_cache = pd.DataFrame(columns=TYPED_COLUMNS, dtype=object)
+
+
+def normalize_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """Normalize column names and ensure canonical columns exist.
+
+    This prevents schema drift (e.g., 'Filename' vs 'File Name') from causing
+    blanks/NaNs in key fields.
+    """
+    if df is None or df.empty:
+        return pd.DataFrame(columns=CANONICAL_COLUMNS)
+
+    working = df.copy()
+    col_lookup = {str(c).strip().lower(): c for c in working.columns}
+
+    def _coalesce(target: str, candidates: list[str]) -> None:
+        existing_target = target if target in working.columns else None
+        candidate_cols = [col_lookup.get(c) for c in candidates if col_lookup.get(c) in working.columns]
+
+        if existing_target is None:
+            if candidate_cols:
+                working[target] = working[candidate_cols[0]]
+            else:
+                working[target] = pd.NA
+        else:
+            for c in candidate_cols:
+                if c == target:
+                    continue
+                working[target] = working[target].fillna(working[c])
+
+    _coalesce("Date", ["date", "datetime", "timestamp", "time", "created at", "created_at"])
+    _coalesce("File Name", ["file name", "filename", "file_name", "file", "audio", "audio file", "audio_file"])
+    _coalesce("Transcript", ["transcript", "transcription", "text"])
+    _coalesce("Analysis", ["analysis", "ai analysis", "llm analysis", "insights"])
+
+    # Preserve any extra columns, but always keep canonical columns first.
+    ordered = CANONICAL_COLUMNS + [c for c in working.columns if c not in CANONICAL_COLUMNS]
+    working = working[ordered]
+    return working
+
+
+def safe_filename(filename) -> str:
+    """Strip directories and whitespace from an uploaded file name"""
+    name = "" if filename is None else str(filename)
+    name = os.path.basename(name).strip()
+    return name or "Unknown"
+
+
+def audio_digest(audio_bytes) -> str:
+    """SHA-256 hex digest of an audio file's bytes (the Audio Hash column)"""
+    return hashlib.sha256(audio_bytes).hexdigest()
+
+
+def build_records_frame(records, now: datetime) -> pd.DataFrame:
+    """Build new rows from (filename, transcript, analysis) tuples.
+
+    A tuple may carry a fourth item, the audio_digest of the source file,
+    stored in the Audio Hash column, and a fifth, the Record ID to use
+    instead of a fresh one (the ingestion worker passes its job id).
+
+    The analysis may be a CallAnalysis or legacy markdown text. Either way the
+    Analysis column stores readable markdown and the typed columns are filled
+    at write time, so readers never have to parse the text again.
+    """
+    analyses = [
+        r[2] if isinstance(r[2], CallAnalysis) else CallAnalysis.from_markdown(r[2])
+        for r in records
+    ]
+    frame = pd.DataFrame(
+        {
+            "Date": [now] * len(records),
+            "File Name": [safe_filename(r[0]) for r in records],
+            "Transcript": [r[1] for r in records],
+            "Analysis": [
+                r[2].to_markdown() if isinstance(r[2], CallAnalysis) else r[2]
+                for r in records
+            ],
+        }
+    )
+    for column in TYPED_COLUMNS:
+        frame[column] = [a.record_fields()[column] for a in analyses]
+    frame[RECORD_ID_COLUMN] = [r[4] if len(r) > 4 and r[4] else uuid.uuid4().hex for r in records]
+    frame[AUDIO_HASH_COLUMN] = [r[3] if len(r) > 3 else None for r in records]
+    return frame
+
+
+def extract_legacy_fields(analysis: pd.Series) -> pd.DataFrame:
+    """Extract Sentiment/Category/Escalation Risk from markdown Analysis text.
+
+    One precompiled pattern pulls all three fields in a single vectorized
+    str.extract pass. Results are memoized per distinct text, so repeated
+    trend runs only parse rows they have not seen before.
+
+    Returns:
+        DataFrame: TYPED_COLUMNS aligned to analysis.index
+    """
+    global _legacy_field_cache
+
+    text = analysis.where(analysis.notna(), "").astype(str)
+    unique_texts = pd.Index(text.unique())
+    unseen = unique_texts.difference(_legacy_field_cache.index)
+
+    if len(unseen):
+        extracted = pd.Series(unseen, index=unseen).str.extract(_LEGACY_FIELDS_PATTERN)
+        parsed = pd.DataFrame(index=unseen)
+        parsed["Sentiment"] = extracted["sentiment"].str.strip()
+        parsed["Category"] = extracted["category"].str.strip()
+        parsed["Escalation Risk (%)"] = (
+            pd.to_numeric(extracted["risk"], errors="coerce").clip(0, 100).astype("Int64")
+        )
+        if len(_legacy_field_cache) + len(parsed) > LEGACY_FIELD_CACHE_MAX_ROWS:
+            _legacy_field_cache = _legacy_field_cache.iloc[0:0]
+        _legacy_field_cache = pd.concat([_legacy_field_cache, parsed.astype(object)])
+
+    fields = _legacy_field_cache.reindex(text.to_numpy())
+    fields.index = analysis.index
+    return fields.astype(object).where(fields.notna(), None)
+
+
+def fill_typed_fields(working: pd.DataFrame) -> pd.DataFrame:
+    """Ensure Sentiment/Category/Escalation Risk columns are populated.
+
+    Rows saved since structured analysis already carry these columns; only
+    legacy rows with none of them are parsed from the Analysis markdown.
+    """
+    for column in TYPED_COLUMNS:
+        if column not in working.columns:
+            working[column] = pd.NA
+        working[column] = working[column].astype(object)
+
+    legacy = working[TYPED_COLUMNS].isna().all(axis=1)
+    if legacy.any():
+        parsed = extract_legacy_fields(working.loc[legacy, "Analysis"])
+        for column in TYPED_COLUMNS:
+            working.loc[legacy, column] = parsed[column]
+    return working
@@ -0,0 +1,316 @@
+"""SQLite storage backend for call records (append-only, WAL mode)"""
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+DB_FILE = os.getenv("RECORD_DB_FILE", os.path.join(PROJECT_ROOT, "call_records.db"))
+
+TABLE_NAME = "call_records"
+META_TABLE = "store_meta"
+BASE_COLUMNS = ["Date", "File Name", "Transcript", "Analysis"]
+# Lookup columns, indexed once they exist (read_matching)
+INDEXED_COLUMNS = ["Record ID", "Audio Hash"]
+# Values per IN (...) query, well under SQLite's bound-parameter limit
+MATCH_BATCH = 500
+
+_schema_lock = threading.Lock()
+_schema_ready_for = None
+
+
+def _quote(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _connect() -> sqlite3.Connection:
+    """Open a connection in autocommit mode; writers use explicit transactions."""
+    global _schema_ready_for
+
+    conn = sqlite3.connect(DB_FILE, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA synchronous=NORMAL")
+
+    with _schema_lock:
+        if _schema_ready_for != DB_FILE:
+            conn.execute("PRAGMA journal_mode=WAL")
+            columns = ", ".join(f"{_quote(c)} TEXT" for c in BASE_COLUMNS)
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {TABLE_NAME} "
+                f"(id INTEGER PRIMARY KEY AUTOINCREMENT, {columns})"
+            )
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {META_TABLE} (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            # Seed the maintained count once for stores created before it existed
+            conn.execute(
+                f"INSERT OR IGNORE INTO {META_TABLE} (key, value) "
+                f"SELECT 'record_count', COUNT(*) FROM {TABLE_NAME}"
+            )
+            _ensure_indexes(conn, _table_columns(conn))
+            _schema_ready_for = DB_FILE
+    return conn
+
+
+def _ensure_indexes(conn: sqlite3.Connection, columns) -> None:
+    for column in INDEXED_COLUMNS:
+        if column in columns:
+            name = "idx_" + column.lower().replace(" ", "_")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {TABLE_NAME} ({_quote(column)})")
+
+
+def _table_columns(conn: sqlite3.Connection) -> list[str]:
+    rows = conn.execute(f"PRAGMA table_info({TABLE_NAME})").fetchall()
+    return [r[1] for r in rows if r[1] != "id"]
+
+
+def _to_sql_value(value):
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat(sep=" ")
+    if hasattr(value, "isoformat"):
+        return value.isoformat(sep=" ") if hasattr(value, "hour") else value.isoformat()
+    if isinstance(value, (int, float, str)):
+        return value
+    if hasattr(value, "item"):
+        # numpy scalars
+        return value.item()
+    return str(value)
+
+
+def exists() -> bool:
+    """Check if the SQLite database file exists"""
+    return os.path.exists(DB_FILE)
+
+
+def version() -> str | None:
+    """
+    Token that changes whenever the database is written (file stats only, no query)
+
+    A WAL checkpoint also changes it, which only costs callers one extra read.
+    """
+    parts = []
+    for path in (DB_FILE, DB_FILE + "-wal"):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        parts.append(f"{stat.st_mtime_ns}:{stat.st_size}")
+    return "/".join(parts) or None
+
+
+def _read_frame(
+    conn: sqlite3.Connection, limit: int | None = None, columns=None, start=None, end=None, match=None
+) -> pd.DataFrame:
+    available = _table_columns(conn)
+    if columns is not None:
+        available = [c for c in columns if c in available]
+    select = ", ".join(_quote(c) for c in available) or "NULL"
+
+    # Dates are stored as ISO text, so string comparison orders them correctly
+    where, params = [], []
+    if start is not None:
+        where.append('"Date" >= ?')
+        params.append(pd.Timestamp(start).isoformat(sep=" "))
+    if end is not None:
+        where.append('"Date" < ?')
+        params.append(pd.Timestamp(end).isoformat(sep=" "))
+    if match is not None:
+        column, values = match
+        where.append(f"{_quote(column)} IN ({', '.join('?' for _ in values)})")
+        params.extend(values)
+    where_sql = f" WHERE {' AND '.join(where)}" if where else ""
+
+    if limit is None:
+        df = pd.read_sql_query(
+            f"SELECT {select} FROM {TABLE_NAME}{where_sql} ORDER BY id", conn, params=params
+        )
+    else:
+        df = pd.read_sql_query(
+            f"SELECT * FROM (SELECT id, {select} FROM {TABLE_NAME}{where_sql} "
+            f"ORDER BY id DESC LIMIT ?) ORDER BY id",
+            conn,
+            params=(*params, int(limit)),
+        ).drop(columns=["id"])
+    df = df[available]
+    if "Date" in df.columns:
+        df["Date"] = pd.to_datetime(df["Date"], errors="coerce", format="ISO8601")
+    return df
+
+
+def read_records(columns=None, start=None, end=None) -> pd.DataFrame:
+    """Load records in insertion order
+
+    Args:
+        columns: Only read these columns (missing ones are skipped)
+        start: Only rows with Date >= start
+        end: Only rows with Date < end
+    """
+    if not exists():
+        return pd.DataFrame(columns=BASE_COLUMNS if columns is None else list(columns))
+    conn = _connect()
+    try:
+        return _read_frame(conn, columns=columns, start=start, end=end)
+    finally:
+        conn.close()
+
+
+def read_recent_records(n: int, columns=None) -> pd.DataFrame:
+    """Load the last n records in insertion order"""
+    if not exists():
+        return pd.DataFrame(columns=BASE_COLUMNS if columns is None else list(columns))
+    conn = _connect()
+    try:
+        return _read_frame(conn, limit=n, columns=columns)
+    finally:
+        conn.close()
+
+
+def read_matching(column: str, values, columns=None, start=None) -> pd.DataFrame:
+    """Load the records whose column holds one of values, through the column's index
+
+    Args:
+        column: Column to match (one of INDEXED_COLUMNS)
+        values: Values to look up
+        columns: Only read these columns (missing ones are skipped)
+        start: Only rows with Date >= start
+    """
+    values = list(dict.fromkeys(values))
+    empty = pd.DataFrame(columns=BASE_COLUMNS if columns is None else list(columns))
+    if not exists() or not values:
+        return empty
+    conn = _connect()
+    try:
+        if column not in _table_columns(conn):
+            return empty
+        frames = [
+            _read_frame(conn, columns=columns, start=start, match=(column, values[i:i + MATCH_BATCH]))
+            for i in range(0, len(values), MATCH_BATCH)
+        ]
+    finally:
+        conn.close()
+    return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+
+def read_meta(key: str) -> str | None:
+    """Read a metadata value maintained alongside the records"""
+    if not exists():
+        return None
+    conn = _connect()
+    try:
+        row = conn.execute(f"SELECT value FROM {META_TABLE} WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+    finally:
+        conn.close()
+
+
+def _write_meta(conn: sqlite3.Connection, values: dict) -> None:
+    conn.executemany(
+        f"INSERT INTO {META_TABLE} (key, value) VALUES (?, ?) "
+        f"ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        list(values.items()),
+    )
+
+
+def rebuild_meta(build) -> dict:
+    """Recompute metadata from all records under the write lock.
+
+    Args:
+        build: Callable taking the full records DataFrame and returning a
+            dict of metadata values to store
+
+    Returns:
+        dict: The values written
+    """
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            values = build(_read_frame(conn))
+            _write_meta(conn, values)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+    return values
+
+
+def count_records() -> int:
+    """Get total number of stored records from the maintained metadata row"""
+    if not exists():
+        return 0
+    conn = _connect()
+    try:
+        row = conn.execute(
+            f"SELECT value FROM {META_TABLE} WHERE key = 'record_count'"
+        ).fetchone()
+        return int(row[0]) if row else 0
+    finally:
+        conn.close()
+
+
+def append_records(df: pd.DataFrame, update_meta=None) -> int:
+    """Append rows in a single transaction.
+
+    Columns not yet present in the table are added on the fly, so extra
+    columns carried over from legacy workbooks are preserved.
+
+    Args:
+        df: Rows to append
+        update_meta: Optional callable(read_meta) -> dict of metadata values
+            to write in the same transaction as the rows
+
+    Returns:
+        int: Number of rows written
+    """
+    if df is None or df.empty:
+        return 0
+
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            known = set(_table_columns(conn))
+            for column in df.columns:
+                if str(column) not in known:
+                    conn.execute(f"ALTER TABLE {TABLE_NAME} ADD COLUMN {_quote(column)}")
+                    known.add(str(column))
+            _ensure_indexes(conn, known)
+
+            names = [str(c) for c in df.columns]
+            placeholders = ", ".join("?" for _ in names)
+            sql = (
+                f"INSERT INTO {TABLE_NAME} ({', '.join(_quote(c) for c in names)}) "
+                f"VALUES ({placeholders})"
+            )
+            rows = [
+                tuple(_to_sql_value(v) for v in row)
+                for row in df.itertuples(index=False, name=None)
+            ]
+            conn.executemany(sql, rows)
+            conn.execute(
+                f"UPDATE {META_TABLE} SET value = CAST(value AS INTEGER) + ? "
+                f"WHERE key = 'record_count'",
+                (len(rows),),
+            )
+            if update_meta is not None:
+                def _read_in_txn(key):
+                    row = conn.execute(
+                        f"SELECT value FROM {META_TABLE} WHERE key = ?", (key,)
+                    ).fetchone()
+                    return row[0] if row else None
+
+                _write_meta(conn, update_meta(_read_in_txn))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+    return len(df)
@@ -0,0 +1,219 @@
+"""Compressed transcript blobs kept outside the record table
+
+With TRANSCRIPT_STORAGE=blob (the default), new records keep only their
+Record ID and a Transcript Length column. The text is written as one
+compressed blob per record, on local disk or under an S3 prefix when
+USE_S3 is on. Transcripts are fetched only when something displays or
+exports them. Records saved inline before this, or with
+TRANSCRIPT_STORAGE=inline, keep their Transcript column as is.
+"""
+import gzip
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from data.s3_client import create_s3_client, use_s3
+from data.schema import RECORD_ID_COLUMN, TRANSCRIPT_LENGTH_COLUMN
+
+load_dotenv()
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+TRANSCRIPT_STORAGE = os.getenv("TRANSCRIPT_STORAGE", "blob").strip().lower()
+TRANSCRIPT_BLOB_DIR = os.getenv("TRANSCRIPT_BLOB_DIR", os.path.join(PROJECT_ROOT, "transcripts"))
+TRANSCRIPT_COMPRESSION = os.getenv("TRANSCRIPT_COMPRESSION", "gzip").strip().lower()
+TRANSCRIPT_IO_WORKERS = int(os.getenv("TRANSCRIPT_IO_WORKERS", "8"))
+
+if TRANSCRIPT_STORAGE not in ("blob", "inline"):
+    raise ValueError(
+        f"Unknown TRANSCRIPT_STORAGE '{TRANSCRIPT_STORAGE}'. Expected one of: blob, inline"
+    )
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError("TRANSCRIPT_COMPRESSION=zstd requires zstandard: pip install zstandard") from e
+    return zstandard
+
+
+def _compress_gzip(data):
+    return gzip.compress(data, mtime=0)
+
+
+def _compress_zstd(data):
+    return _zstd().ZstdCompressor(level=10).compress(data)
+
+
+def _decompress_zstd(data):
+    return _zstd().ZstdDecompressor().decompress(data)
+
+
+# extension -> (compress, decompress)
+_CODECS = {
+    "gz": (_compress_gzip, gzip.decompress),
+    "zst": (_compress_zstd, _decompress_zstd),
+}
+_EXTENSIONS = {"gzip": "gz", "zstd": "zst"}
+
+if TRANSCRIPT_COMPRESSION not in _EXTENSIONS:
+    raise ValueError(
+        f"Unknown TRANSCRIPT_COMPRESSION '{TRANSCRIPT_COMPRESSION}'. Expected one of: gzip, zstd"
+    )
+
+
+class LocalBlobStore:
+    """One file per blob, sharded by the first two characters of the id"""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, name):
+        return os.path.join(self.directory, name[:2], name)
+
+    def put(self, name, data):
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, name):
+        try:
+            with open(self._path(name), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+
+class S3BlobStore:
+    """One object per blob under a prefix"""
+
+    def __init__(self, client, bucket, prefix):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.rstrip("/") + "/"
+
+    def put(self, name, data):
+        self.client.put_object(
+            Bucket=self.bucket, Key=f"{self.prefix}{name}", Body=data, ContentType="application/octet-stream"
+        )
+
+    def get(self, name):
+        from botocore.exceptions import ClientError
+
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=f"{self.prefix}{name}")
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+                return None
+            raise
+        return response["Body"].read()
+
+
+def build_blob_store():
+    """
+    Create the transcript blob store: S3 when USE_S3 is on and a bucket is configured, else local disk
+
+    USE_S3 defaults to true, matching the S3 record store, so records on S3
+    never reference blobs on one replica's disk.
+
+    Returns:
+        LocalBlobStore or S3BlobStore
+    """
+    bucket = os.getenv("S3_BUCKET_NAME")
+    if use_s3() and bucket:
+        try:
+            client = create_s3_client()
+            return S3BlobStore(client, bucket, os.getenv("S3_TRANSCRIPT_PREFIX", "transcripts"))
+        except Exception as e:
+            print(f"Warning: Could not initialize S3 transcript store: {e}")
+            print("Falling back to local transcript store")
+    return LocalBlobStore(TRANSCRIPT_BLOB_DIR)
+
+
+_blob_store = None
+
+
+def _get_blob_store():
+    global _blob_store
+    if _blob_store is None:
+        _blob_store = build_blob_store()
+    return _blob_store
+
+
+def _put_transcript(record_id, text):
+    extension = _EXTENSIONS[TRANSCRIPT_COMPRESSION]
+    compress, _ = _CODECS[extension]
+    _get_blob_store().put(f"{record_id}.txt.{extension}", compress(text.encode("utf-8")))
+
+
+def offload_transcripts(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Write new rows' transcripts to blobs and drop the text from the rows
+
+    Blobs are written before the rows are saved, so a stored row never
+    points at a missing blob.
+
+    Args:
+        df: New rows with Record ID and Transcript columns
+
+    Returns:
+        pd.DataFrame: Copy with Transcript emptied and Transcript Length set
+            (unchanged when TRANSCRIPT_STORAGE=inline)
+    """
+    if TRANSCRIPT_STORAGE != "blob" or df.empty or RECORD_ID_COLUMN not in df.columns:
+        return df
+    working = df.copy()
+    offload = working[RECORD_ID_COLUMN].notna() & working["Transcript"].notna()
+    items = [
+        (record_id, str(text))
+        for record_id, text in working.loc[offload, [RECORD_ID_COLUMN, "Transcript"]].itertuples(
+            index=False, name=None
+        )
+    ]
+    if len(items) == 1:
+        _put_transcript(*items[0])
+    elif items:
+        with ThreadPoolExecutor(max_workers=min(TRANSCRIPT_IO_WORKERS, len(items))) as pool:
+            list(pool.map(lambda item: _put_transcript(*item), items))
+
+    lengths = working["Transcript"].map(lambda t: len(str(t)), na_action="ignore")
+    working[TRANSCRIPT_LENGTH_COLUMN] = pd.array(lengths, dtype="Int64")
+    working["Transcript"] = working["Transcript"].astype(object).where(~offload, None)
+    return working
+
+
+def get_transcript(record_id) -> str | None:
+    """Fetch one transcript blob by record id; None if there is none"""
+    if record_id is None or (not isinstance(record_id, str) and pd.isna(record_id)):
+        return None
+    preferred = _EXTENSIONS[TRANSCRIPT_COMPRESSION]
+    for extension in [preferred] + [e for e in _CODECS if e != preferred]:
+        data = _get_blob_store().get(f"{record_id}.txt.{extension}")
+        if data is not None:
+            _, decompress = _CODECS[extension]
+            return decompress(data).decode("utf-8")
+    return None
+
+
+def attach_transcripts(df: pd.DataFrame) -> pd.DataFrame:
+    """Fill the Transcript column from blobs for rows that were offloaded"""
+    if df.empty or RECORD_ID_COLUMN not in df.columns:
+        return df
+    working = df.copy()
+    if "Transcript" not in working.columns:
+        working["Transcript"] = None
+    missing = working["Transcript"].isna() & working[RECORD_ID_COLUMN].notna()
+    if not missing.any():
+        return working
+    ids = list(working.loc[missing, RECORD_ID_COLUMN])
+    with ThreadPoolExecutor(max_workers=min(TRANSCRIPT_IO_WORKERS, len(ids))) as pool:
+        texts = list(pool.map(get_transcript, ids))
+    working["Transcript"] = working["Transcript"].astype(object)
+    working.loc[missing, "Transcript"] = texts
+    return working
@@ -0,0 +1,166 @@
+"""Running trend aggregates, updated on every write instead of recomputed per request"""
+import json
+import os
+from collections import deque
+
+import pandas as pd
+
+from data.schema import fill_typed_fields
+
+AGGREGATES_META_KEY = "trend_aggregates"
+AGGREGATES_VERSION = 1
+
+# How many recent calls are kept for the "Most Recent" table and "Last N calls"
+RECENT_CAPACITY = int(os.getenv("TREND_RECENT_CAPACITY", "1000"))
+HIGH_RISK_THRESHOLD = 70
+
+RECENT_COLUMNS = ["Date", "File Name", "Sentiment", "Escalation Risk (%)", "Category"]
+
+
+def _label(value) -> str:
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return "Unknown"
+    return str(value).strip()
+
+
+class TrendAggregates:
+    """Counts, a 0-100 risk histogram, date bounds and a ring buffer of recent calls.
+
+    Escalation risk is an integer percentage, so the 101-bin histogram gives
+    exact median and percentiles without keeping every value.
+    """
+
+    def __init__(self, capacity=RECENT_CAPACITY):
+        self.total_calls = 0
+        self.sentiment_counts = {}
+        self.category_counts = {}
+        self.risk_histogram = [0] * 101
+        self.risk_sum = 0
+        self.date_min = None
+        self.date_max = None
+        self.recent = deque(maxlen=capacity)
+
+    @classmethod
+    def from_records(cls, df, capacity=RECENT_CAPACITY):
+        """Build aggregates from a full set of records (used for the initial build)"""
+        aggregates = cls(capacity)
+        if df is not None and not df.empty:
+            working = df.copy()
+            working["Date"] = pd.to_datetime(working["Date"], errors="coerce")
+            aggregates.add_records(working.sort_values("Date", kind="stable"))
+        return aggregates
+
+    def add_records(self, df):
+        """Fold new rows (Date, File Name and typed columns or Analysis) into the aggregates"""
+        if df is None or df.empty:
+            return
+        working = df.copy()
+        if "Analysis" not in working.columns:
+            working["Analysis"] = None
+        working = fill_typed_fields(working)
+        working["Date"] = pd.to_datetime(working["Date"], errors="coerce")
+        working = working.dropna(subset=["Date"])
+        if working.empty:
+            return
+
+        self.total_calls += len(working)
+        for label in working["Sentiment"].map(_label):
+            self.sentiment_counts[label] = self.sentiment_counts.get(label, 0) + 1
+        for label in working["Category"].map(_label):
+            self.category_counts[label] = self.category_counts.get(label, 0) + 1
+
+        risks = pd.to_numeric(working["Escalation Risk (%)"], errors="coerce").dropna()
+        for risk in risks.round().clip(0, 100).astype(int):
+            self.risk_histogram[risk] += 1
+            self.risk_sum += int(risk)
+
+        batch_min, batch_max = working["Date"].min(), working["Date"].max()
+        self.date_min = batch_min if self.date_min is None else min(self.date_min, batch_min)
+        self.date_max = batch_max if self.date_max is None else max(self.date_max, batch_max)
+
+        tail = working[RECENT_COLUMNS].tail(self.recent.maxlen)
+        for row in tail.itertuples(index=False, name=None):
+            date, filename, sentiment, risk, category = row
+            risk = None if risk is None or pd.isna(risk) else int(risk)
+            self.recent.append(
+                [date.isoformat(), filename, None if pd.isna(sentiment) else sentiment,
+                 risk, None if pd.isna(category) else category]
+            )
+
+    @property
+    def risk_count(self) -> int:
+        return sum(self.risk_histogram)
+
+    def _kth_risk(self, k):
+        seen = 0
+        for value, count in enumerate(self.risk_histogram):
+            seen += count
+            if seen > k:
+                return value
+        return None
+
+    def risk_quantile(self, q):
+        """Quantile with linear interpolation, matching pandas Series.quantile"""
+        n = self.risk_count
+        if n == 0:
+            return None
+        position = q * (n - 1)
+        lower = int(position)
+        low_value = self._kth_risk(lower)
+        high_value = self._kth_risk(min(lower + 1, n - 1))
+        return low_value + (high_value - low_value) * (position - lower)
+
+    def risk_stats(self):
+        """(avg, median, p90, high-risk count), or None if no risk values"""
+        n = self.risk_count
+        if n == 0:
+            return None
+        high = sum(self.risk_histogram[HIGH_RISK_THRESHOLD:])
+        return self.risk_sum / n, self.risk_quantile(0.5), self.risk_quantile(0.9), high
+
+    def recent_frame(self, n=None):
+        """The last n calls (default: all buffered) as a DataFrame"""
+        rows = list(self.recent)
+        if n is not None:
+            rows = rows[-int(n):] if int(n) > 0 else []
+        frame = pd.DataFrame(rows, columns=RECENT_COLUMNS)
+        frame["Date"] = pd.to_datetime(frame["Date"], errors="coerce", format="ISO8601")
+        return frame
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "version": AGGREGATES_VERSION,
+                "total_calls": self.total_calls,
+                "sentiment_counts": self.sentiment_counts,
+                "category_counts": self.category_counts,
+                "risk_histogram": self.risk_histogram,
+                "risk_sum": self.risk_sum,
+                "date_min": None if self.date_min is None else self.date_min.isoformat(),
+                "date_max": None if self.date_max is None else self.date_max.isoformat(),
+                "capacity": self.recent.maxlen,
+                "recent": list(self.recent),
+            }
+        )
+
+    @classmethod
+    def from_json(cls, text):
+        """Load stored aggregates; None if missing or written by another version"""
+        if not text:
+            return None
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return None
+        if data.get("version") != AGGREGATES_VERSION or data.get("capacity") != RECENT_CAPACITY:
+            return None
+        aggregates = cls(data["capacity"])
+        aggregates.total_calls = data["total_calls"]
+        aggregates.sentiment_counts = data["sentiment_counts"]
+        aggregates.category_counts = data["category_counts"]
+        aggregates.risk_histogram = data["risk_histogram"]
+        aggregates.risk_sum = data["risk_sum"]
+        aggregates.date_min = pd.Timestamp(data["date_min"]) if data["date_min"] else None
+        aggregates.date_max = pd.Timestamp(data["date_max"]) if data["date_max"] else None
+        aggregates.recent.extend(data["recent"])
+        return aggregates
@@ -0,0 +1,141 @@
+"""Trend summary text built from call records, shared by all repositories"""
+import pandas as pd
+
+from data.models import TYPED_COLUMNS
+from data.schema import fill_typed_fields
+from data.trend_aggregates import HIGH_RISK_THRESHOLD, RECENT_COLUMNS
+
+# Columns prepare_trend_summary reads; stores can skip the rest (e.g. Transcript)
+TREND_COLUMNS = ["Date", "File Name", "Analysis", *TYPED_COLUMNS]
+
+
+def prepare_trend_summary(df):
+    """Prepare data summary for trend analysis"""
+    if df.empty:
+        return "No data available"
+
+    expected_cols = {"Date", "File Name", "Analysis"}
+    missing_cols = expected_cols - set(df.columns)
+    if missing_cols:
+        return (
+            "The database is missing required columns: "
+            f"{', '.join(sorted(missing_cols))}. "
+            "Expected columns: Date, File Name, Analysis."
+        )
+
+    working = df.copy()
+    working["Date"] = pd.to_datetime(working["Date"], errors="coerce")
+    working = working.dropna(subset=["Date"])
+    if working.empty:
+        return "No valid dates found in the database."
+
+    working = working.sort_values("Date")
+    return _summarize_frame(fill_typed_fields(working))
+
+
+def _summarize_frame(working):
+    """Summary for a date-sorted frame with Date, File Name and typed columns"""
+    sentiment_counts = (
+        working["Sentiment"].fillna("Unknown").astype(str).str.strip().value_counts(dropna=False)
+    )
+    category_counts = (
+        working["Category"].fillna("Unknown").astype(str).str.strip().value_counts(dropna=False)
+    )
+
+    risk_series = pd.to_numeric(working["Escalation Risk (%)"], errors="coerce").dropna()
+    risk_stats = None
+    if not risk_series.empty:
+        risk_stats = (
+            float(risk_series.mean()),
+            float(risk_series.median()),
+            float(risk_series.quantile(0.9)),
+            int((risk_series >= HIGH_RISK_THRESHOLD).sum()),
+        )
+
+    return _render_summary(
+        total_calls=len(working),
+        date_min=working["Date"].min(),
+        date_max=working["Date"].max(),
+        sentiment_counts=list(sentiment_counts.items()),
+        category_counts=list(category_counts.items()),
+        risk_stats=risk_stats,
+        recent=working.tail(10),
+    )
+
+
+def summarize_aggregates(aggregates, last_n=None):
+    """
+    Prepare the trend summary from maintained aggregates
+
+    Args:
+        aggregates: TrendAggregates for the whole store
+        last_n: Limit to the last N calls; must not exceed the ring buffer
+
+    Returns:
+        str: Same format as prepare_trend_summary
+    """
+    if last_n is not None:
+        recent = aggregates.recent_frame(last_n)
+        if recent.empty:
+            return "No data available"
+        return _summarize_frame(recent.sort_values("Date", kind="stable"))
+
+    if aggregates.total_calls == 0:
+        return "No data available"
+
+    def _by_count(counts):
+        return sorted(counts.items(), key=lambda kv: -kv[1])
+
+    return _render_summary(
+        total_calls=aggregates.total_calls,
+        date_min=aggregates.date_min,
+        date_max=aggregates.date_max,
+        sentiment_counts=_by_count(aggregates.sentiment_counts),
+        category_counts=_by_count(aggregates.category_counts),
+        risk_stats=aggregates.risk_stats(),
+        recent=aggregates.recent_frame(10),
+    )
+
+
+def _render_summary(total_calls, date_min, date_max, sentiment_counts, category_counts,
+                    risk_stats, recent):
+    recent = recent[RECENT_COLUMNS].copy()
+    recent["Date"] = recent["Date"].dt.strftime("%Y-%m-%d %H:%M")
+    risk = pd.to_numeric(recent["Escalation Risk (%)"], errors="coerce")
+    recent["Escalation Risk (%)"] = [
+        "Unknown" if pd.isna(v) else str(int(v)) for v in risk
+    ]
+    for column in ("Sentiment", "Category"):
+        recent[column] = recent[column].astype(object).where(recent[column].notna(), "Unknown")
+    recent_table = recent.to_string(index=False)
+
+    lines: list[str] = []
+    lines.append(f"Total Calls: {total_calls}")
+    lines.append(f"Date Range: {date_min.date()} to {date_max.date()}")
+    lines.append("")
+    lines.append("Sentiment (all calls):")
+    for k, v in sentiment_counts:
+        lines.append(f"- {k}: {int(v)}")
+    lines.append("")
+    lines.append("Top Categories (all calls):")
+    for k, v in category_counts[:8]:
+        lines.append(f"- {k}: {int(v)}")
+    lines.append("")
+    if risk_stats is not None:
+        avg_risk, median_risk, p90_risk, high_risk = risk_stats
+        lines.append(
+            f"Escalation Risk (%): avg={avg_risk:.1f}, median={median_risk:.1f}, "
+            f"p90={p90_risk:.1f}, high(>={HIGH_RISK_THRESHOLD})={high_risk}"
+        )
+    else:
+        lines.append("Escalation Risk (%): Not available (could not parse from Analysis)")
+    lines.append("")
+    lines.append("Most Recent 10 Calls:")
+    lines.append(recent_table)
+    lines.append("")
+    lines.append(
+        "Instruction: Base insights strictly on the counts/table above. Do not invent totals."
+        "If a field is Unknown, treat it as missing data."
+    )
+
+    return "\n".join(lines)
@@ -74,6 +74,7 @@ fi
 # Setup systemd service
 echo "⚙️  Setting up systemd service..."
 sudo cp deploy/systemd/streamlit-app.service /etc/systemd/system/
+sudo cp deploy/systemd/ingest-worker@.service /etc/systemd/system/
 sudo systemctl daemon-reload
 sudo systemctl enable streamlit-app.service
 
@@ -102,6 +103,9 @@ echo ""
 echo "3. Start the application:"
 echo "   sudo systemctl start streamlit-app"
 echo ""
+echo "   With INGEST_MODE=queue in .env, start job workers too:"
+echo "   sudo systemctl enable --now ingest-worker@1 ingest-worker@2"
+echo ""
 echo "4. Check status:"
 echo "   sudo systemctl status streamlit-app"
 echo ""
@@ -1,36 +1,440 @@
 """Call analysis service using Groq LLM"""
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
 
-def analyze_call(client, transcript):
+from data.models import CallAnalysis
+from services.result_cache import build_cache, make_key
+from services.streaming import CompletionStream, record_latency
+from services.token_budget import compact_transcript, compaction_settings, count_tokens
+
+ANALYSIS_MODEL = "llama-3.3-70b-versatile"
+ANALYSIS_TEMPERATURE = 0.3
+LATENCY_LABEL = "call_analysis"
+BATCH_LATENCY_LABEL = "batch_analysis"
+
+SYSTEM_PROMPT = (
+    "You are a customer call analyst. Provide structured insights. "
+    "Respond with a single JSON object only."
+)
+
+FIELD_SPEC = """"summary": brief overview,
+"sentiment": one of "Positive", "Neutral", "Negative",
+"escalation_risk": integer 0-100,
+"why": explain the risk score with quotes,
+"emotional_journey": "Beginning → Peak frustration → End state",
+"category": issue type,
+"action": what to do next"""
+
+PROMPT_TEMPLATE = """Analyze this call:
+
+{transcript}
+
+Return JSON with exactly these keys:
+""" + FIELD_SPEC
+
+# Several short calls per request: the system prompt and field list are sent once
+BATCH_PROMPT_TEMPLATE = """Analyze each of these {count} calls separately:
+
+{calls}
+
+Return JSON with one key, "analyses": an array with one object per call, in
+the same order, each with exactly these keys:
+"id": the call number,
+""" + FIELD_SPEC
+
+# Derived from the prompt text, so editing the prompt invalidates cached analyses
+PROMPT_VERSION = make_key(SYSTEM_PROMPT, PROMPT_TEMPLATE)[:16]
+BATCH_PROMPT_VERSION = make_key(SYSTEM_PROMPT, BATCH_PROMPT_TEMPLATE)[:16]
+
+# Transcripts up to ANALYSIS_BATCH_MAX_CHARS (about a minute of speech) are
+# packed up to ANALYSIS_BATCH_SIZE per request while the estimated prompt plus
+# reply stays within ANALYSIS_BATCH_TOKEN_BUDGET
+ANALYSIS_BATCH_SIZE = int(os.getenv("ANALYSIS_BATCH_SIZE", "8"))
+ANALYSIS_BATCH_MAX_CHARS = int(os.getenv("ANALYSIS_BATCH_MAX_CHARS", "1200"))
+ANALYSIS_BATCH_TOKEN_BUDGET = int(os.getenv("ANALYSIS_BATCH_TOKEN_BUDGET", "6000"))
+# Reply tokens reserved per packed call
+ANALYSIS_REPLY_TOKENS = 250
+
+ANALYSIS_CACHE_MAX_BYTES = int(float(os.getenv("ANALYSIS_CACHE_MAX_MB", "64")) * 1024 * 1024)
+ANALYSIS_CACHE_TTL_SECONDS = float(os.getenv("ANALYSIS_CACHE_TTL_HOURS", "168")) * 3600
+
+_analysis_cache = None
+_analysis_cache_lock = threading.Lock()
+
+
+def _get_analysis_cache():
+    global _analysis_cache
+    with _analysis_cache_lock:
+        if _analysis_cache is None:
+            _analysis_cache = build_cache(
+                "analyses", ANALYSIS_CACHE_MAX_BYTES, ttl_seconds=ANALYSIS_CACHE_TTL_SECONDS
+            )
+    return _analysis_cache
+
+
+def get_analysis_cache_stats():
+    """Hit/miss/eviction counters for the analysis cache"""
+    return _get_analysis_cache().stats.snapshot()
+
+
+def normalize_transcript(transcript):
+    """Canonical form of a transcript for cache keys (Unicode NFC, collapsed whitespace)"""
+    text = unicodedata.normalize("NFC", "" if transcript is None else str(transcript))
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _cache_key(transcript):
+    # The model sees the compacted text, so the compaction settings are part of the key
+    return make_key(
+        normalize_transcript(transcript), ANALYSIS_MODEL, ANALYSIS_TEMPERATURE, PROMPT_VERSION,
+        *compaction_settings()
+    )
+
+
+def _completion_kwargs(transcript):
+    return dict(
+        model=ANALYSIS_MODEL,
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": PROMPT_TEMPLATE.format(transcript=transcript)}
+        ],
+        temperature=ANALYSIS_TEMPERATURE,
+        response_format={"type": "json_object"}
+    )
+
+
+def _fit_transcript(client, transcript, label=LATENCY_LABEL):
+    """Transcript text for the prompt, compacted to ANALYSIS_TOKEN_BUDGET"""
+    text, _ = compact_transcript(transcript, client=client, label=label)
+    return text
+
+
+def analyze_call(client, transcript, use_cache=True):
     """
     Analyze call transcript using AI
-    
+
+    The transcript is compacted first (fillers and repeats removed; long
+    calls condensed to ANALYSIS_TOKEN_BUDGET); the cache is keyed by the
+    original transcript plus the compaction settings.
+
     Args:
         client: Groq client instance
         transcript: Call transcript text
-        
+        use_cache: Serve/store the result in the analysis cache; pass False
+            to force a fresh completion
+
     Returns:
-        str: AI analysis with structured insights
+        CallAnalysis: Validated structured insights
+
+    Raises:
+        ValueError: If the model's output is not a valid analysis object
     """
-    prompt = f"""Analyze this call:
+    cache_key = _cache_key(transcript)
+    if use_cache:
+        cached = _get_analysis_cache().get(cache_key)
+        if cached is not None:
+            return CallAnalysis.from_dict(cached)
 
-{transcript}
+    request = _completion_kwargs(_fit_transcript(client, transcript))
+    start = time.perf_counter()
+    completion = client.chat.completions.create(**request)
+    elapsed = time.perf_counter() - start
+    record_latency(LATENCY_LABEL, elapsed, elapsed)
+
+    analysis = CallAnalysis.from_json(completion.choices[0].message.content)
+    if use_cache:
+        _get_analysis_cache().set(cache_key, analysis.to_dict())
+    return analysis
+
+
+def is_batchable(transcript):
+    """Short enough to be packed with others into one analysis request"""
+    return len(transcript or "") <= ANALYSIS_BATCH_MAX_CHARS
+
+
+def _batch_cache_key(transcript):
+    return make_key(
+        normalize_transcript(transcript), ANALYSIS_MODEL, ANALYSIS_TEMPERATURE, BATCH_PROMPT_VERSION,
+        *compaction_settings()
+    )
 
-Format:
-**Summary:** [Brief overview]
-**Sentiment:** [Positive/Neutral/Negative]
-**Escalation Risk:** [0-100%]
-**Why:** [Explain the risk score with quotes]
-**Emotional Journey:** [Beginning → Peak frustration → End state]
-**Category:** [Issue type]
-**Action:** [What to do next]"""
 
+def pack_batches(transcripts, max_batch=None, token_budget=None):
+    """
+    Group transcripts into requests by count and estimated token budget
+
+    Args:
+        transcripts: Transcript texts
+        max_batch: Max transcripts per request (default: ANALYSIS_BATCH_SIZE)
+        token_budget: Max estimated prompt + reply tokens per request
+            (default: ANALYSIS_BATCH_TOKEN_BUDGET)
+
+    Returns:
+        list[list[int]]: Index groups in input order; a transcript too large
+            for the budget on its own gets a group of one
+    """
+    max_batch = max(1, int(max_batch or ANALYSIS_BATCH_SIZE))
+    token_budget = int(token_budget or ANALYSIS_BATCH_TOKEN_BUDGET)
+    overhead = count_tokens(SYSTEM_PROMPT + BATCH_PROMPT_TEMPLATE)
+    groups, current, used = [], [], overhead
+    for index, transcript in enumerate(transcripts):
+        cost = count_tokens(transcript) + ANALYSIS_REPLY_TOKENS
+        if current and (len(current) >= max_batch or used + cost > token_budget):
+            groups.append(current)
+            current, used = [], overhead
+        current.append(index)
+        used += cost
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _parse_batch_reply(text, count):
+    """{call number: CallAnalysis} for the entries that parsed and validated"""
+    try:
+        data = json.loads(_json_object(text))
+    except (TypeError, ValueError):
+        return {}
+    entries = data.get("analyses") if isinstance(data, dict) else data
+    parsed = {}
+    for position, entry in enumerate(entries if isinstance(entries, list) else [], 1):
+        if not isinstance(entry, dict):
+            continue
+        try:
+            number = int(entry.get("id", position))
+            analysis = CallAnalysis.from_dict(entry)
+        except (TypeError, ValueError):
+            continue
+        if 1 <= number <= count and number not in parsed:
+            parsed[number] = analysis
+    return parsed
+
+
+def _analyze_packed(client, transcripts):
+    """One request for several transcripts; None where the reply had no usable entry"""
+    calls = "\n\n".join(f"### Call {number}\n{text}" for number, text in enumerate(transcripts, 1))
+    start = time.perf_counter()
     completion = client.chat.completions.create(
-        model="llama-3.3-70b-versatile",
+        model=ANALYSIS_MODEL,
         messages=[
-            {"role": "system", "content": "You are a customer call analyst. Provide structured insights."},
-            {"role": "user", "content": prompt}
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": BATCH_PROMPT_TEMPLATE.format(count=len(transcripts), calls=calls)}
         ],
-        temperature=0.3
+        temperature=ANALYSIS_TEMPERATURE,
+        response_format={"type": "json_object"},
+        max_tokens=ANALYSIS_REPLY_TOKENS * len(transcripts),
+    )
+    elapsed = time.perf_counter() - start
+    record_latency(BATCH_LATENCY_LABEL, elapsed, elapsed)
+    parsed = _parse_batch_reply(completion.choices[0].message.content, len(transcripts))
+    return [parsed.get(number) for number in range(1, len(transcripts) + 1)]
+
+
+def analyze_calls_batch(client, transcripts, use_cache=True, max_batch=None, token_budget=None):
+    """
+    Analyze several short transcripts, packing them into shared requests
+
+    Short transcripts (is_batchable) are grouped by pack_batches; longer
+    ones are analyzed on their own. Any transcript whose entry is missing or
+    invalid in a packed reply falls back to analyze_call.
+
+    Args:
+        client: Groq client instance
+        transcripts: Transcript texts
+        use_cache: Serve/store results in the analysis cache
+        max_batch: Max transcripts per request (default: ANALYSIS_BATCH_SIZE)
+        token_budget: Max estimated tokens per request (default: ANALYSIS_BATCH_TOKEN_BUDGET)
+
+    Returns:
+        list[CallAnalysis]: One per transcript, in input order
+
+    Raises:
+        ValueError: If a fallback single analysis is not valid
+    """
+    results = [None] * len(transcripts)
+    if use_cache:
+        cache = _get_analysis_cache()
+        for index, transcript in enumerate(transcripts):
+            cached = cache.get(_cache_key(transcript)) or cache.get(_batch_cache_key(transcript))
+            if cached is not None:
+                results[index] = CallAnalysis.from_dict(cached)
+
+    todo = [i for i, result in enumerate(results) if result is None and is_batchable(transcripts[i])]
+    # Short transcripts never need condensing: cleaning only, no client
+    compacted = {i: _fit_transcript(None, transcripts[i], BATCH_LATENCY_LABEL) for i in todo}
+    packed_groups = pack_batches([compacted[i] for i in todo], max_batch, token_budget)
+    groups = [[todo[i] for i in group] for group in packed_groups]
+    groups += [[i] for i, result in enumerate(results) if result is None and not is_batchable(transcripts[i])]
+    for indexes in groups:
+        if len(indexes) == 1:
+            results[indexes[0]] = analyze_call(client, transcripts[indexes[0]], use_cache=use_cache)
+            continue
+        packed = _analyze_packed(client, [compacted[i] for i in indexes])
+        for index, analysis in zip(indexes, packed):
+            if analysis is None:
+                results[index] = analyze_call(client, transcripts[index], use_cache=use_cache)
+            else:
+                results[index] = analysis
+                if use_cache:
+                    _get_analysis_cache().set(_batch_cache_key(transcripts[index]), analysis.to_dict())
+    return results
+
+
+def _json_object(text):
+    """The outermost {...} in text (streamed replies have no JSON mode and may add fences)"""
+    start, end = text.find("{"), text.rfind("}")
+    return text[start:end + 1] if 0 <= start < end else text
+
+
+def stream_call_analysis(client, transcript, use_cache=True):
+    """
+    Analyze a call transcript, streaming the model's reply as it is generated
+
+    Groq does not combine JSON mode with streaming, so the reply is asked
+    for as JSON by the prompt alone and parsed once complete.
+
+    Args:
+        client: Groq client instance
+        transcript: Call transcript text
+        use_cache: Serve/store the result in the analysis cache
+
+    Returns:
+        CompletionStream: Yields raw JSON deltas (see preview_markdown);
+            .result is the CallAnalysis once the stream is consumed, and
+            consuming it raises ValueError if the reply is not a valid analysis
+    """
+    cache_key = _cache_key(transcript)
+    if use_cache:
+        cached = _get_analysis_cache().get(cache_key)
+        if cached is not None:
+            return CompletionStream.from_text(
+                json.dumps(cached, ensure_ascii=False), LATENCY_LABEL, result=CallAnalysis.from_dict(cached)
+            )
+
+    request = _completion_kwargs(_fit_transcript(client, transcript))
+    request.pop("response_format")
+
+    def finish(text):
+        analysis = CallAnalysis.from_json(_json_object(text))
+        if use_cache:
+            _get_analysis_cache().set(cache_key, analysis.to_dict())
+        return analysis
+
+    return CompletionStream(
+        lambda: client.chat.completions.create(stream=True, **request), LATENCY_LABEL, finish
     )
-    
-    return completion.choices[0].message.content
+
+
+_PREVIEW_LABELS = {
+    "summary": "Summary",
+    "sentiment": "Sentiment",
+    "escalation_risk": "Escalation Risk",
+    "why": "Why",
+    "emotional_journey": "Emotional Journey",
+    "category": "Category",
+    "action": "Action",
+}
+_JSON_KEY = re.compile(r'"(\w+)"\s*:\s*')
+_JSON_SCALAR = re.compile(r'[^,}\s]*')
+_PARTIAL_ESCAPE = re.compile(r'(?<!\\)(\\\\)*\\(u[0-9a-fA-F]{0,3})?$')
+
+
+def _decode_partial_string(raw):
+    raw = _PARTIAL_ESCAPE.sub(lambda m: m.group(1) or "", raw)
+    try:
+        return json.loads(f'"{raw}"', strict=False)
+    except ValueError:
+        return raw
+
+
+def preview_markdown(partial_json):
+    """
+    Render a partially received analysis JSON in the to_markdown layout
+
+    The preview of a longer prefix always extends the preview of a shorter
+    one, so successive previews can be streamed as deltas.
+
+    Args:
+        partial_json: Reply text received so far
+
+    Returns:
+        str: "**Field:** value" lines for the fields started so far
+    """
+    lines = []
+    pos = 0
+    while True:
+        match = _JSON_KEY.search(partial_json, pos)
+        if not match:
+            break
+        key, pos = match.group(1), match.end()
+        if pos < len(partial_json) and partial_json[pos] == '"':
+            end = pos + 1
+            while end < len(partial_json) and partial_json[end] != '"':
+                end += 2 if partial_json[end] == "\\" else 1
+            value = _decode_partial_string(partial_json[pos + 1:min(end, len(partial_json))])
+            pos = end + 1
+        else:
+            scalar = _JSON_SCALAR.match(partial_json, pos)
+            value, pos = scalar.group(0), scalar.end()
+            if key == "escalation_risk" and value and pos < len(partial_json):
+                value += "%"
+        if key in _PREVIEW_LABELS:
+            lines.append(f"**{_PREVIEW_LABELS[key]}:** {value}")
+    return "\n".join(lines)
+
+
+def stream_preview(stream):
+    """
+    Markdown deltas of an analysis stream's preview, for st.write_stream
+
+    Args:
+        stream: CompletionStream from stream_call_analysis
+
+    Yields:
+        str: Text to append to what was already shown
+    """
+    shown = ""
+    for _ in stream:
+        preview = preview_markdown(stream.text)
+        if len(preview) > len(shown) and preview.startswith(shown):
+            yield preview[len(shown):]
+            shown = preview
+
+
+async def analyze_call_async(client, transcript, use_cache=True):
+    """
+    Async variant of analyze_call for an AsyncGroq client
+
+    Args:
+        client: AsyncGroq client instance
+        transcript: Call transcript text
+        use_cache: Serve/store the result in the analysis cache
+
+    Returns:
+        CallAnalysis: Validated structured insights
+
+    Raises:
+        ValueError: If the model's output is not a valid analysis object
+    """
+    cache_key = _cache_key(transcript)
+    if use_cache:
+        cached = await asyncio.to_thread(_get_analysis_cache().get, cache_key)
+        if cached is not None:
+            return CallAnalysis.from_dict(cached)
+
+    # LLM condensing needs a sync client, so an over-budget transcript is truncated here
+    text, _ = await asyncio.to_thread(compact_transcript, transcript, None, None, LATENCY_LABEL)
+    start = time.perf_counter()
+    completion = await client.chat.completions.create(**_completion_kwargs(text))
+    elapsed = time.perf_counter() - start
+    record_latency(LATENCY_LABEL, elapsed, elapsed)
+
+    analysis = CallAnalysis.from_json(completion.choices[0].message.content)
+    if use_cache:
+        await asyncio.to_thread(_get_analysis_cache().set, cache_key, analysis.to_dict())
+    return analysis
@@ -0,0 +1,378 @@
+"""Audio decoding, encoding and splitting helpers
+
+WAV is handled with the standard library. FLAC and Ogg (Opus/Vorbis) are
+decoded and encoded with soundfile (`pip install soundfile`, which bundles
+libsndfile). Other formats (MP3, M4A, ...) are decoded with pydub, which is
+optional and needs ffmpeg on the PATH.
+Decoded audio is represented as an int16 numpy array of shape
+(frames, channels) plus a sample rate.
+"""
+import io
+import os
+import wave
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class AudioChunk:
+    """A time window cut from a longer recording"""
+
+    index: int
+    start_seconds: float
+    end_seconds: float
+    filename: str
+    data: bytes
+
+
+def _extension(filename):
+    return os.path.splitext(str(filename or ""))[1].lower().lstrip(".")
+
+
+def _pcm_to_int16(raw, sample_width):
+    if sample_width == 2:
+        return np.frombuffer(raw, dtype="<i2")
+    if sample_width == 1:
+        # 8-bit WAV is unsigned
+        return ((np.frombuffer(raw, dtype=np.uint8).astype(np.int16) - 128) << 8).astype(np.int16)
+    if sample_width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+        as_int32 = (b[:, 0].astype(np.int32) << 8) | (b[:, 1].astype(np.int32) << 16) | (b[:, 2].astype(np.int32) << 24)
+        return (as_int32 >> 16).astype(np.int16)
+    if sample_width == 4:
+        return (np.frombuffer(raw, dtype="<i4") >> 16).astype(np.int16)
+    raise ValueError(f"Unsupported sample width: {sample_width} bytes")
+
+
+def _import_soundfile():
+    try:
+        import soundfile
+    except ImportError as e:
+        raise ImportError(
+            "FLAC/Opus audio needs soundfile. Install it with: pip install soundfile"
+        ) from e
+    return soundfile
+
+
+def decode_audio(audio_bytes, filename):
+    """
+    Decode an audio file to PCM samples
+
+    Args:
+        audio_bytes: Encoded audio file contents
+        filename: Original file name (used to pick the decoder)
+
+    Returns:
+        tuple: (samples int16 array of shape (frames, channels), sample_rate)
+    """
+    if _extension(filename) == "wav" or audio_bytes[:4] == b"RIFF":
+        with wave.open(io.BytesIO(audio_bytes), "rb") as wav:
+            channels = wav.getnchannels()
+            sample_rate = wav.getframerate()
+            samples = _pcm_to_int16(wav.readframes(wav.getnframes()), wav.getsampwidth())
+        return samples.reshape(-1, channels), sample_rate
+
+    if _extension(filename) in ("flac", "ogg", "opus") or audio_bytes[:4] in (b"fLaC", b"OggS"):
+        try:
+            soundfile = _import_soundfile()
+        except ImportError:
+            soundfile = None
+        if soundfile is not None:
+            samples, sample_rate = soundfile.read(io.BytesIO(audio_bytes), dtype="int16", always_2d=True)
+            return samples, sample_rate
+
+    try:
+        from pydub import AudioSegment
+    except ImportError as e:
+        raise ValueError(
+            f"Cannot decode '{filename}': only WAV is supported without pydub/ffmpeg installed"
+        ) from e
+
+    segment = AudioSegment.from_file(io.BytesIO(audio_bytes), format=_extension(filename) or None)
+    segment = segment.set_sample_width(2)
+    samples = np.array(segment.get_array_of_samples(), dtype=np.int16)
+    return samples.reshape(-1, segment.channels), segment.frame_rate
+
+
+def encode_wav(samples, sample_rate):
+    """Encode int16 samples of shape (frames, channels) as a WAV file"""
+    samples = np.asarray(samples, dtype=np.int16)
+    if samples.ndim == 1:
+        samples = samples.reshape(-1, 1)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(samples.shape[1])
+        wav.setsampwidth(2)
+        wav.setframerate(int(sample_rate))
+        wav.writeframes(samples.astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+# Codec name -> (soundfile format, subtype, file extension)
+CODECS = {
+    "flac": ("FLAC", "PCM_16", "flac"),
+    "opus": ("OGG", "OPUS", "ogg"),
+    "wav": (None, None, "wav"),
+}
+
+
+def encode_audio(samples, sample_rate, codec="flac"):
+    """
+    Encode int16 samples of shape (frames, channels)
+
+    Args:
+        samples: PCM samples
+        sample_rate: Sample rate in Hz (Opus needs 8, 12, 16, 24 or 48 kHz)
+        codec: "flac", "opus" or "wav"
+
+    Returns:
+        tuple: (encoded bytes, file extension)
+
+    Raises:
+        ImportError: If the codec needs soundfile and it is not installed
+    """
+    if codec not in CODECS:
+        raise ValueError(f"Unknown audio codec '{codec}'; expected one of {', '.join(CODECS)}")
+    fmt, subtype, extension = CODECS[codec]
+    if fmt is None:
+        return encode_wav(samples, sample_rate), extension
+    soundfile = _import_soundfile()
+    buffer = io.BytesIO()
+    soundfile.write(buffer, np.asarray(samples, dtype=np.int16), int(sample_rate), format=fmt, subtype=subtype)
+    return buffer.getvalue(), extension
+
+
+def downmix(samples):
+    """Average the channels of (frames, channels) samples into shape (frames, 1)"""
+    samples = np.asarray(samples)
+    if samples.ndim == 1:
+        return samples.reshape(-1, 1)
+    if samples.shape[1] == 1:
+        return samples
+    return samples.mean(axis=1, dtype=np.float32).round().astype(np.int16).reshape(-1, 1)
+
+
+def _lowpass_kernel(cutoff, taps=63):
+    """Hamming-windowed sinc low-pass filter; cutoff is a fraction of the input sample rate"""
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(taps)
+    return (kernel / kernel.sum()).astype(np.float32)
+
+
+def resample(samples, sample_rate, target_rate):
+    """
+    Resample (frames, channels) int16 samples to target_rate
+
+    Downsampling first low-pass filters below the new Nyquist frequency, so
+    content above it does not alias into the speech band; the samples are
+    then linearly interpolated at the new rate.
+    """
+    samples = np.asarray(samples)
+    if samples.ndim == 1:
+        samples = samples.reshape(-1, 1)
+    if int(sample_rate) == int(target_rate) or samples.shape[0] == 0:
+        return samples.astype(np.int16, copy=False)
+    frames = samples.shape[0]
+    out_frames = max(1, int(round(frames * target_rate / sample_rate)))
+    positions = np.arange(out_frames, dtype=np.float64) * (sample_rate / target_rate)
+    source = np.arange(frames, dtype=np.float64)
+    kernel = _lowpass_kernel(0.45 * target_rate / sample_rate) if target_rate < sample_rate else None
+    channels = []
+    for channel in samples.T:
+        channel = channel.astype(np.float32)
+        if kernel is not None:
+            channel = np.convolve(channel, kernel, mode="same")
+        channels.append(np.interp(positions, source, channel))
+    resampled = np.stack(channels, axis=1)
+    return np.clip(np.round(resampled), -32768, 32767).astype(np.int16)
+
+
+@dataclass
+class SpeechTimeline:
+    """Spans of the original recording kept by trim_non_speech, in playback order"""
+
+    spans: list
+    original_seconds: float
+
+    @property
+    def kept_seconds(self) -> float:
+        return sum(end - start for start, end in self.spans)
+
+    @property
+    def removed_seconds(self) -> float:
+        return self.original_seconds - self.kept_seconds
+
+    def to_original(self, seconds):
+        """Map a time in the trimmed audio (e.g. a Whisper segment start) to the original recording"""
+        offset = 0.0
+        for start, end in self.spans:
+            if seconds <= offset + (end - start):
+                return start + max(0.0, seconds - offset)
+            offset += end - start
+        return self.spans[-1][1] if self.spans else seconds
+
+
+def _runs(mask):
+    """(start, end) index pairs of the True runs in a boolean array"""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.astype(np.int8), [0]))))
+    return list(zip(edges[::2], edges[1::2]))
+
+
+def detect_speech(samples, sample_rate, threshold_db=12.0, min_speech_ms=250, min_silence_ms=600,
+                  pad_ms=200, music_std_db=2.5, frame_ms=30):
+    """
+    Find speech in a recording with frame energies (CPU only)
+
+    Sounding 30 ms frames in a second of audio whose energy varies by less
+    than music_std_db are treated as hold music or tones: speech rises and
+    falls with every syllable, sustained music does not. Of the remaining
+    frames, those threshold_db above their 10th-percentile energy (the noise
+    floor between words) are speech. Pauses under min_silence_ms are
+    bridged, bursts under min_speech_ms dropped, and every span padded by
+    pad_ms on both sides.
+
+    Args:
+        samples: int16 samples of shape (frames, channels)
+        sample_rate: Sample rate in Hz
+
+    Returns:
+        list: (start sample, end sample) speech spans, in order
+    """
+    mono = downmix(samples)[:, 0].astype(np.float32) / 32768
+    frame = max(1, int(sample_rate * frame_ms / 1000))
+    count = len(mono) // frame
+    if count == 0:
+        return []
+    energy = 10 * np.log10(np.mean(mono[:count * frame].reshape(count, frame) ** 2, axis=1) + 1e-10)
+    # Never call anything quieter than -55 dBFS speech, even in a recording that is all pauses
+    active = energy > -55.0
+
+    if music_std_db:
+        # Spread of the sounding frames in the second before and the second
+        # after each frame; steady on either side is music, so the jump from
+        # silence into music (or music into speech) does not count as variation
+        window = max(3, int(1000 / frame_ms))
+        weight = active.astype(np.float64)
+        sums = [np.concatenate(([0.0], np.cumsum(x))) for x in (weight, energy * weight, energy ** 2 * weight)]
+        index = np.arange(count)
+        steady = np.zeros(count, dtype=bool)
+        for lo, hi in ((np.maximum(0, index - window + 1), index + 1), (index, np.minimum(count, index + window))):
+            n, total, squares = (s[hi] - s[lo] for s in sums)
+            mean = total / np.maximum(n, 1)
+            spread = np.sqrt(np.maximum(squares / np.maximum(n, 1) - mean ** 2, 0))
+            # A frame that stands out from the steady sound next to it (speech starting) is kept
+            steady |= (n >= 3) & (spread < music_std_db) & (np.abs(energy - mean) < 2 * music_std_db)
+        active &= ~steady
+
+    # The noise floor comes from what is left, so a call that is mostly hold
+    # music does not put the floor at the music's level
+    if active.any():
+        active &= energy > np.percentile(energy[active], 10) + threshold_db
+
+    def frames(ms):
+        return int(round(ms / frame_ms))
+
+    for start, end in _runs(~active):
+        if start > 0 and end < count and end - start < frames(min_silence_ms):
+            active[start:end] = True
+    for start, end in _runs(active):
+        if end - start < frames(min_speech_ms):
+            active[start:end] = False
+
+    pad = frames(pad_ms)
+    spans = []
+    for start, end in _runs(active):
+        start, end = max(0, start - pad) * frame, min(len(mono), (end + pad) * frame)
+        if spans and start <= spans[-1][1]:
+            spans[-1] = (spans[-1][0], end)
+        else:
+            spans.append((start, end))
+    return spans
+
+
+def trim_non_speech(samples, sample_rate, **vad_options):
+    """
+    Cut silence and hold music out of a recording
+
+    Args:
+        samples: int16 samples of shape (frames, channels)
+        sample_rate: Sample rate in Hz
+        **vad_options: Passed to detect_speech
+
+    Returns:
+        tuple: (trimmed samples, SpeechTimeline). A recording with no
+        speech found is returned whole rather than emptied.
+    """
+    samples = np.asarray(samples)
+    if samples.ndim == 1:
+        samples = samples.reshape(-1, 1)
+    total = samples.shape[0] / sample_rate
+    spans = detect_speech(samples, sample_rate, **vad_options)
+    if not spans:
+        return samples, SpeechTimeline([(0.0, total)], total)
+    trimmed = np.concatenate([samples[start:end] for start, end in spans])
+    return trimmed, SpeechTimeline([(int(start) / sample_rate, int(end) / sample_rate) for start, end in spans], total)
+
+
+def split_audio(audio_bytes, filename, chunk_seconds, overlap_seconds=0.0, max_chunk_bytes=None,
+                sample_rate=16000, codec="wav"):
+    """
+    Cut a recording into overlapping time windows, each encoded for upload
+
+    The recording is downmixed to mono and resampled to sample_rate first
+    (never up), the format Whisper works on, so a long MP3 does not turn
+    into full-rate stereo WAV chunks many times its size. Windows are sized
+    for max_chunk_bytes as WAV at that rate; FLAC and Opus come out smaller.
+
+    Args:
+        audio_bytes: Encoded audio file contents
+        filename: Original file name
+        chunk_seconds: Target window length
+        overlap_seconds: How much each window overlaps the previous one
+        max_chunk_bytes: Shrink windows so no encoded chunk exceeds this size
+        sample_rate: Chunk sample rate in Hz
+        codec: "flac", "opus" or "wav"; without soundfile, chunks are WAV
+
+    Returns:
+        list[AudioChunk]: Windows in playback order
+    """
+    samples, source_rate = decode_audio(audio_bytes, filename)
+    sample_rate = min(int(sample_rate), int(source_rate))
+    samples = resample(downmix(samples), source_rate, sample_rate)
+    total_frames = samples.shape[0]
+    if codec != "wav":
+        try:
+            _import_soundfile()
+        except ImportError:
+            codec = "wav"
+
+    window = float(chunk_seconds)
+    if max_chunk_bytes:
+        bytes_per_second = sample_rate * 2
+        # Leave room for the WAV header
+        window = min(window, (max_chunk_bytes - 1024) / bytes_per_second)
+    overlap = min(float(overlap_seconds), window / 2)
+
+    window_frames = max(1, int(window * sample_rate))
+    step_frames = max(1, window_frames - int(overlap * sample_rate))
+    stem = os.path.splitext(os.path.basename(str(filename)))[0] or "audio"
+
+    chunks = []
+    start = 0
+    while True:
+        end = min(start + window_frames, total_frames)
+        data, extension = encode_audio(samples[start:end], sample_rate, codec)
+        chunks.append(
+            AudioChunk(
+                index=len(chunks),
+                start_seconds=start / sample_rate,
+                end_seconds=end / sample_rate,
+                filename=f"{stem}.part{len(chunks):03d}.{extension}",
+                data=data,
+            )
+        )
+        if end >= total_frames:
+            break
+        start += step_frames
+    return chunks
@@ -0,0 +1,267 @@
+"""Headless batch ingestion: transcribe, analyze and save audio files without the UI
+
+Usage:
+    python -m services.batch_ingest RECORDINGS_DIR [--workers 8] [--batch-size 50]
+    python -m services.batch_ingest --manifest files.txt [--no-cache] [--dry-run] [--trim-silence]
+
+Uses the same pipeline and repository as the Streamlit upload path. Files
+are processed in batches of --batch-size; each batch is saved with one
+save_records call. Files whose name is already in the store are skipped,
+so an interrupted run resumes where it stopped. A manifest is a text file
+with one audio path per line (relative paths are resolved against the
+manifest's directory; blank lines and # comments are ignored).
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+from data.repository import get_all_records, save_records
+from data.schema import safe_filename
+from services.ingestion_pipeline import (
+    DEFAULT_ANALYSIS_BATCH,
+    DEFAULT_WORKERS,
+    persistable_records,
+    run_pipeline,
+)
+from services.request_scheduler import BATCH, ScheduledGroq, get_scheduler_stats
+from services.transcription_service import get_preprocess_stats
+
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".m4a", ".flac", ".mpeg", ".mpga", ".mp4")
+DEFAULT_BATCH_SIZE = int(os.getenv("BATCH_INGEST_SIZE", "50"))
+
+
+def discover_files(directory=None, manifest=None):
+    """
+    List audio files from a directory (recursively) or a manifest
+
+    Returns:
+        list: Absolute paths in a stable order
+    """
+    if manifest is not None:
+        base = os.path.dirname(os.path.abspath(manifest))
+        paths = []
+        with open(manifest, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    paths.append(os.path.normpath(os.path.join(base, line)))
+        return paths
+
+    paths = []
+    for root, dirs, names in os.walk(directory):
+        dirs.sort()
+        for name in sorted(names):
+            if name.lower().endswith(AUDIO_EXTENSIONS):
+                paths.append(os.path.abspath(os.path.join(root, name)))
+    return paths
+
+
+def stored_file_names():
+    """File names already in the record store (only that column is read)"""
+    records = get_all_records(columns=["File Name"])
+    if records.empty:
+        return set()
+    return set(records["File Name"].dropna().astype(str))
+
+
+class StageStats:
+    """Per-stage latency samples and wall-clock throughput"""
+
+    def __init__(self):
+        self.samples = {"transcription": [], "analysis": [], "persist": []}
+        self.failures = {"transcription": 0, "analysis": 0, "persist": 0}
+        self.started = time.perf_counter()
+
+    def add_result(self, result):
+        self.samples["transcription"].append(result.transcribe_seconds)
+        if result.failed_stage == "transcription":
+            self.failures["transcription"] += 1
+            return
+        self.samples["analysis"].append(result.analyze_seconds)
+        if result.failed_stage == "analysis":
+            self.failures["analysis"] += 1
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        lines = [f"{'stage':<14} {'count':>6} {'failed':>6} {'per s':>8} {'p50 s':>8} {'p95 s':>8} {'max s':>8}"]
+        for stage, samples in self.samples.items():
+            if not samples:
+                continue
+            ordered = sorted(samples)
+            p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+            lines.append(
+                f"{stage:<14} {len(samples):>6} {self.failures[stage]:>6} "
+                f"{len(samples) / elapsed:>8.2f} {statistics.median(ordered):>8.2f} "
+                f"{p95:>8.2f} {ordered[-1]:>8.2f}"
+            )
+        lines.append(f"elapsed {elapsed:.1f}s")
+        return "\n".join(lines)
+
+
+def scheduler_report():
+    """Queue and wait metrics of the request scheduler, one line per model"""
+    lines = []
+    for model, stats in get_scheduler_stats().items():
+        lines.append(
+            f"{model}: {stats['admitted']} admitted, {stats['retries']} retried "
+            f"({stats['rate_limited']} rate limited), wait p50 {stats['wait_p50']:.2f}s "
+            f"p95 {stats['wait_p95']:.2f}s max {stats['wait_max']:.2f}s"
+        )
+    return "\n".join(lines)
+
+
+def preprocess_report():
+    """Audio preprocessing sizes per file and in total (empty when it is off)"""
+    stats = get_preprocess_stats()
+    if not stats["files"]:
+        return ""
+    lines = [
+        f"{report.filename}: {report.bytes_in / 1e6:.1f} MB -> {report.bytes_out / 1e6:.1f} MB "
+        f"in {report.seconds:.2f}s, ~{report.upload_seconds_saved:.1f}s upload saved"
+        + (f", {report.timeline.removed_seconds:.0f}s non-speech cut" if report.timeline else "")
+        + (f" ({report.note})" if report.note else "")
+        for report in stats["recent"]
+    ]
+    lines.append(
+        f"Preprocessed {stats['applied']} of {stats['files']} file(s): {stats['bytes_in'] / 1e6:.1f} MB -> "
+        f"{stats['bytes_out'] / 1e6:.1f} MB, ~{stats['upload_seconds_saved']:.0f}s upload saved"
+    )
+    if stats["trimmed"]:
+        lines.append(
+            f"Trimmed {stats['removed_seconds']:.0f}s of silence/hold music from "
+            f"{stats['audio_seconds']:.0f}s of audio in {stats['trimmed']} file(s)"
+        )
+    return "\n".join(lines)
+
+
+def _read_batch(paths):
+    files = []
+    for path in paths:
+        with open(path, "rb") as f:
+            files.append((safe_filename(path), f.read()))
+    return files
+
+
+def ingest(client, paths, workers=None, batch_size=DEFAULT_BATCH_SIZE, use_cache=True, log=print,
+           analysis_batch=None, trim_silence=None):
+    """
+    Run files through the pipeline in batches, saving each batch in one write
+
+    Args:
+        client: Groq client instance
+        paths: Audio file paths to ingest
+        workers: Max in-flight requests per stage (default: INGEST_WORKERS)
+        batch_size: Files per save_records call
+        use_cache: Reuse cached transcripts/analyses
+        log: Progress output function
+        analysis_batch: Short transcripts per analysis request (default: INGEST_ANALYSIS_BATCH)
+        trim_silence: Cut silence and hold music before transcription (default: VAD_TRIM)
+
+    Returns:
+        tuple: (saved: int, failed: int, stats: StageStats)
+    """
+    stats = StageStats()
+    saved = failed = 0
+    batch_size = max(1, int(batch_size))
+
+    for start in range(0, len(paths), batch_size):
+        batch = paths[start:start + batch_size]
+        results = []
+        files = _read_batch(batch)
+        for result in run_pipeline(
+            client, files, workers=workers, use_cache=use_cache, analysis_batch=analysis_batch,
+            trim_silence=trim_silence,
+        ):
+            stats.add_result(result)
+            results.append(result)
+            if not result.ok:
+                failed += 1
+                log(f"FAILED {result.filename} ({result.failed_stage}): {result.error}")
+
+        records = persistable_records(results)
+        persist_start = time.perf_counter()
+        ok, error = save_records(records)
+        stats.samples["persist"].append(time.perf_counter() - persist_start)
+        if not ok:
+            stats.failures["persist"] += 1
+            raise RuntimeError(f"Saving batch starting at file {start + 1} failed: {error}")
+        saved += len(records)
+        log(f"Saved {len(records)} of {len(batch)} file(s) [{start + len(batch)}/{len(paths)}]")
+
+    return saved, failed, stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m services.batch_ingest", description=__doc__.splitlines()[0]
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("directory", nargs="?", help="Directory of audio files (searched recursively)")
+    source.add_argument("--manifest", help="Text file listing one audio path per line")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Max in-flight requests per stage")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Files per persisted batch")
+    parser.add_argument(
+        "--analysis-batch", type=int, default=DEFAULT_ANALYSIS_BATCH,
+        help="Pack up to this many short transcripts into one analysis request"
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Force fresh transcriptions and analyses")
+    parser.add_argument(
+        "--trim-silence", action=argparse.BooleanOptionalAction, default=None,
+        help="Cut silence and hold music before transcription (default: VAD_TRIM)"
+    )
+    parser.add_argument("--no-resume", action="store_true", help="Also process files already in the store")
+    parser.add_argument("--dry-run", action="store_true", help="List the files that would be processed")
+    parser.add_argument(
+        "--fake-client", action="store_true",
+        help="Use the offline FakeGroq client (for exercising the pipeline without API calls)"
+    )
+    args = parser.parse_args(argv)
+
+    paths = discover_files(args.directory, args.manifest)
+    missing = [p for p in paths if not os.path.isfile(p)]
+    for path in missing:
+        print(f"Not found: {path}", file=sys.stderr)
+    paths = [p for p in paths if os.path.isfile(p)]
+    if not args.no_resume:
+        done = stored_file_names()
+        skipped = [p for p in paths if safe_filename(p) in done]
+        paths = [p for p in paths if safe_filename(p) not in done]
+        if skipped:
+            print(f"Skipping {len(skipped)} file(s) already in the store")
+    print(f"{len(paths)} file(s) to ingest")
+    if args.dry_run or not paths:
+        for path in paths if args.dry_run else []:
+            print(path)
+        return 1 if missing else 0
+
+    # Backfills yield to interactive uploads sharing the same scheduler
+    if args.fake_client:
+        from services.fake_groq_client import FakeGroq
+
+        client = ScheduledGroq(FakeGroq(), priority=BATCH)
+    else:
+        from services.groq_client import get_groq_client
+
+        client = get_groq_client().with_priority(BATCH)
+
+    try:
+        saved, failed, stats = ingest(
+            client, paths, workers=args.workers, batch_size=args.batch_size, use_cache=not args.no_cache,
+            analysis_batch=args.analysis_batch, trim_silence=args.trim_silence,
+        )
+    except (RuntimeError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(stats.report())
+    print(scheduler_report())
+    preprocessing = preprocess_report()
+    if preprocessing:
+        print(preprocessing)
+    print(f"Saved {saved} record(s), {failed + len(missing)} file(s) failed")
+    return 1 if failed or missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""Offline stand-in for the Groq client, for benchmarks and local runs without an API key"""
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+FAKE_ANALYSIS = json.dumps(
+    {
+        "summary": "Customer asked about a recent charge and the agent explained it.",
+        "sentiment": "Neutral",
+        "escalation_risk": 20,
+        "why": "\"I just want to understand this charge.\"",
+        "emotional_journey": "Confused → Mildly frustrated → Satisfied",
+        "category": "Billing",
+        "action": "No follow-up needed",
+    },
+    ensure_ascii=False,
+)
+
+
+class FakeAPIError(Exception):
+    """Shaped like groq.APIStatusError: status_code plus a response with headers"""
+
+    def __init__(self, status_code=429, retry_after=None):
+        super().__init__(f"Fake API error {status_code}")
+        self.status_code = status_code
+        headers = {} if retry_after is None else {"retry-after": str(retry_after)}
+        self.response = SimpleNamespace(status_code=status_code, headers=headers)
+
+
+class _Transcriptions:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def create(self, file, model, **kwargs):
+        filename, audio = file
+        self._owner._record("transcriptions")
+        self._owner._maybe_fail()
+        time.sleep(self._owner.transcribe_latency)
+        return SimpleNamespace(text=f"Fake transcript of {filename} ({len(audio)} bytes).")
+
+
+class _Completions:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def create(self, model, messages, stream=False, **kwargs):
+        self._owner._record("completions")
+        self._owner._maybe_fail()
+        text = self._owner.reply(messages)
+        if stream:
+            return self._stream(model, text)
+        usage = self._owner.usage(messages, text)
+        time.sleep(self._owner.completion_latency + usage.completion_tokens * self._owner.token_latency)
+        message = SimpleNamespace(role="assistant", content=text)
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(index=0, message=message, finish_reason="stop")],
+            usage=usage,
+        )
+
+    def _stream(self, model, text):
+        """Chunks of the reply: the first after first_token_latency, the rest spread evenly"""
+        size = max(1, self._owner.stream_chunk_chars)
+        pieces = [text[i:i + size] for i in range(0, len(text), size)]
+        time.sleep(self._owner.first_token_latency)
+        gap = max(0.0, self._owner.completion_latency - self._owner.first_token_latency) / max(1, len(pieces))
+        for i, piece in enumerate(pieces):
+            if i:
+                time.sleep(gap)
+            delta = SimpleNamespace(role="assistant" if i == 0 else None, content=piece)
+            yield SimpleNamespace(
+                model=model,
+                choices=[SimpleNamespace(index=0, delta=delta, finish_reason=None)],
+            )
+        yield SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(index=0, delta=SimpleNamespace(role=None, content=None), finish_reason="stop")],
+        )
+
+
+class FakeGroq:
+    """Mimics the parts of groq.Groq used by the services, with fixed latencies
+
+    Args:
+        transcribe_latency: Seconds each transcription call sleeps
+        completion_latency: Seconds each chat completion call sleeps
+        completion_text: Content returned by chat completions, or a callable(messages) -> str
+        errors: Exceptions raised, in order, by the next calls (e.g. FakeAPIError(429, retry_after=2))
+        first_token_latency: Seconds before the first chunk of a streamed completion
+        stream_chunk_chars: Characters per streamed chunk
+        token_latency: Extra seconds per completion token (about 4 characters)
+    """
+
+    def __init__(self, transcribe_latency=0.5, completion_latency=1.0, completion_text=FAKE_ANALYSIS,
+                 errors=(), first_token_latency=0.2, stream_chunk_chars=16, token_latency=0.0):
+        self.transcribe_latency = transcribe_latency
+        self.completion_latency = completion_latency
+        self.token_latency = token_latency
+        self.first_token_latency = min(first_token_latency, completion_latency)
+        self.stream_chunk_chars = stream_chunk_chars
+        self.completion_text = completion_text
+        self.calls = {"transcriptions": 0, "completions": 0}
+        self.tokens = {"prompt": 0, "completion": 0}
+        self.errors = list(errors)
+        self._lock = threading.Lock()
+        self.audio = SimpleNamespace(transcriptions=_Transcriptions(self))
+        self.chat = SimpleNamespace(completions=_Completions(self))
+
+    def reply(self, messages):
+        if callable(self.completion_text):
+            return self.completion_text(messages)
+        return self.completion_text
+
+    def usage(self, messages, text):
+        """Token counts estimated at about 4 characters per token"""
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4
+        completion_tokens = len(text) // 4
+        with self._lock:
+            self.tokens["prompt"] += prompt_tokens
+            self.tokens["completion"] += completion_tokens
+        return SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=prompt_tokens + completion_tokens,
+        )
+
+    def _record(self, endpoint):
+        with self._lock:
+            self.calls[endpoint] += 1
+
+    def _maybe_fail(self):
+        with self._lock:
+            error = self.errors.pop(0) if self.errors else None
+        if error is not None:
+            raise error
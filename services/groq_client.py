@@ -1,17 +1,112 @@
-"""Groq API client initialization"""
+"""Groq API client initialization
+
+get_groq_client returns one client per process, so Streamlit reruns reuse
+its HTTP connection pool (and TLS sessions) instead of building a new
+client each time. get_async_groq_client returns an AsyncGroq client for
+the *_async service functions, one per event loop.
+"""
+import asyncio
 import os
-from groq import Groq
+import threading
+import weakref
+
+import httpx
 from dotenv import load_dotenv
+from groq import AsyncGroq, DefaultAsyncHttpxClient, DefaultHttpxClient, Groq
+
+from services.request_scheduler import ScheduledGroq
 
 # Load environment variables
 load_dotenv()
 
-def get_groq_client():
-    """Initialize and return Groq client"""
+# Connection pool limits shared by the sync and async clients
+GROQ_MAX_CONNECTIONS = int(os.getenv("GROQ_MAX_CONNECTIONS", "32"))
+GROQ_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("GROQ_MAX_KEEPALIVE_CONNECTIONS", "16"))
+GROQ_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("GROQ_KEEPALIVE_EXPIRY_SECONDS", "60"))
+GROQ_TIMEOUT_SECONDS = float(os.getenv("GROQ_TIMEOUT_SECONDS", "120"))
+
+_client = None
+_client_lock = threading.Lock()
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _require_api_key():
     api_key = os.getenv("GROQ_API_KEY")
     if not api_key:
         raise ValueError("GROQ_API_KEY not found in environment variables")
-    return Groq(api_key=api_key)
+    return api_key
+
+
+def _pool_limits():
+    return httpx.Limits(
+        max_connections=GROQ_MAX_CONNECTIONS,
+        max_keepalive_connections=GROQ_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=GROQ_KEEPALIVE_EXPIRY_SECONDS,
+    )
+
+
+def build_groq_client(api_key=None, base_url=None):
+    """
+    Create a new Groq client with the configured pool limits
+
+    Args:
+        api_key: API key (default: GROQ_API_KEY)
+        base_url: API root (default: GROQ_BASE_URL or the Groq API)
+
+    Returns:
+        Groq: A client with its own connection pool and no SDK retries
+            (wrap it in ScheduledGroq for rate limiting and retries)
+    """
+    return Groq(
+        api_key=api_key or _require_api_key(),
+        base_url=base_url,
+        timeout=GROQ_TIMEOUT_SECONDS,
+        max_retries=0,
+        http_client=DefaultHttpxClient(limits=_pool_limits(), timeout=GROQ_TIMEOUT_SECONDS),
+    )
+
+
+def build_async_groq_client(api_key=None, base_url=None):
+    """
+    Create a new AsyncGroq client with the configured pool limits
+
+    The client's connections belong to the event loop that first uses them.
+
+    Returns:
+        AsyncGroq: A client with its own connection pool
+    """
+    return AsyncGroq(
+        api_key=api_key or _require_api_key(),
+        base_url=base_url,
+        timeout=GROQ_TIMEOUT_SECONDS,
+        max_retries=0,
+        http_client=DefaultAsyncHttpxClient(limits=_pool_limits(), timeout=GROQ_TIMEOUT_SECONDS),
+    )
+
+
+def get_groq_client():
+    """Return the process-wide scheduled Groq client, creating it on first use"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = ScheduledGroq(build_groq_client())
+    return _client
+
+
+def get_async_groq_client():
+    """
+    Return the scheduled AsyncGroq client for the running event loop
+
+    Must be called from inside a coroutine. Each event loop gets its own
+    client, because pooled connections cannot move between loops.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = ScheduledGroq(build_async_groq_client())
+        _async_clients[loop] = client
+    return client
+
 
 def get_api_key():
     """Get the Groq API key"""
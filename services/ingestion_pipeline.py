@@ -0,0 +1,143 @@
+"""Concurrent ingestion pipeline: transcription -> analysis, persisted in one batch"""
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+
+from data.models import CallAnalysis
+from data.schema import audio_digest
+from services.analysis_service import analyze_call, analyze_calls_batch, is_batchable
+from services.transcription_service import transcribe_audio
+
+DEFAULT_WORKERS = int(os.getenv("INGEST_WORKERS", "4"))
+# Short transcripts analyzed per request in the pipeline (1 = one request per file)
+DEFAULT_ANALYSIS_BATCH = int(os.getenv("INGEST_ANALYSIS_BATCH", "1"))
+
+
+@dataclass
+class IngestionResult:
+    """Outcome of one file going through the pipeline"""
+
+    index: int
+    filename: str
+    transcript: str | None = None
+    analysis: CallAnalysis | None = None
+    error: str | None = None
+    failed_stage: str | None = None
+    transcribe_seconds: float = 0.0
+    analyze_seconds: float = 0.0
+    audio_hash: str | None = None
+    # When the record was saved (set by the caller, or from the store for a re-upload)
+    saved_at: object = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _transcribe_stage(client, result, audio_bytes, use_cache, trim_silence=None):
+    start = time.perf_counter()
+    if result.audio_hash is None:
+        result.audio_hash = audio_digest(audio_bytes)
+    try:
+        result.transcript = transcribe_audio(
+            client, audio_bytes, result.filename, use_cache=use_cache, trim_silence=trim_silence
+        )
+    except Exception as e:
+        result.error = str(e)
+        result.failed_stage = "transcription"
+    result.transcribe_seconds = time.perf_counter() - start
+    return result
+
+
+def _analyze_stage(client, result, use_cache):
+    start = time.perf_counter()
+    try:
+        result.analysis = analyze_call(client, result.transcript, use_cache=use_cache)
+    except Exception as e:
+        result.error = str(e)
+        result.failed_stage = "analysis"
+    result.analyze_seconds = time.perf_counter() - start
+    return result
+
+
+def _analyze_batch_stage(client, results, use_cache):
+    start = time.perf_counter()
+    try:
+        analyses = analyze_calls_batch(
+            client, [r.transcript for r in results], use_cache=use_cache, max_batch=len(results)
+        )
+    except Exception:
+        # One bad reply should not fail the others: retry each file on its own
+        return [_analyze_stage(client, r, use_cache) for r in results]
+    elapsed = time.perf_counter() - start
+    for result, analysis in zip(results, analyses):
+        result.analysis = analysis
+        result.analyze_seconds = elapsed
+    return results
+
+
+def run_pipeline(client, files, workers=None, use_cache=True, analysis_batch=None, trim_silence=None):
+    """
+    Transcribe and analyze files concurrently
+
+    Transcription and analysis run in separate bounded thread pools, so a
+    file can be analyzed while others are still uploading to Whisper. With
+    analysis_batch > 1, short transcripts are held back and analyzed up to
+    analysis_batch per request; a partial group is sent once no
+    transcriptions are left in flight.
+
+    Args:
+        client: Groq client instance
+        files: Iterable of (filename, audio_bytes) tuples
+        workers: Max in-flight requests per stage (default: INGEST_WORKERS)
+        use_cache: Reuse cached transcripts/analyses; False forces fresh API calls
+        analysis_batch: Short transcripts per analysis request (default: INGEST_ANALYSIS_BATCH)
+        trim_silence: Cut silence and hold music before transcription (default: VAD_TRIM)
+
+    Yields:
+        IngestionResult: One per file, in completion order
+    """
+    workers = max(1, int(workers or DEFAULT_WORKERS))
+    analysis_batch = max(1, int(analysis_batch or DEFAULT_ANALYSIS_BATCH))
+
+    with ThreadPoolExecutor(workers, thread_name_prefix="transcribe") as transcribe_pool, \
+            ThreadPoolExecutor(workers, thread_name_prefix="analyze") as analyze_pool:
+        pending = {
+            transcribe_pool.submit(
+                _transcribe_stage, client, IngestionResult(idx, name), audio, use_cache, trim_silence
+            )
+            for idx, (name, audio) in enumerate(files, 1)
+        }
+        transcribing = set(pending)
+        held = []
+
+        while pending or held:
+            if held and (len(held) >= analysis_batch or not transcribing):
+                pending.add(analyze_pool.submit(_analyze_batch_stage, client, held, use_cache))
+                held = []
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                outcome = future.result()
+                if isinstance(outcome, list):
+                    # A packed analysis finished
+                    yield from outcome
+                elif future not in transcribing or not outcome.ok:
+                    # Analysis finished, or transcription failed: file is done
+                    transcribing.discard(future)
+                    yield outcome
+                else:
+                    transcribing.discard(future)
+                    if analysis_batch > 1 and is_batchable(outcome.transcript):
+                        held.append(outcome)
+                    else:
+                        pending.add(analyze_pool.submit(_analyze_stage, client, outcome, use_cache))
+
+
+def persistable_records(results):
+    """Turn successful results into (filename, transcript, analysis, audio_hash) tuples for save_records"""
+    return [
+        (r.filename, r.transcript, r.analysis, r.audio_hash)
+        for r in sorted(results, key=lambda r: r.index)
+        if r.ok
+    ]
@@ -0,0 +1,391 @@
+"""Durable ingestion job queue (SQLite, WAL mode)
+
+The UI enqueues uploads here and a separate worker process
+(python -m services.job_worker) transcribes, analyzes and saves them, so
+closing the browser tab does not lose the work and a long batch does not
+tie up a Streamlit server thread.
+
+A worker claims a job by leasing it for a visibility timeout and extends
+the lease while it works. If the worker dies, the lease expires and
+another worker claims the job again. A failed attempt is retried after a
+backoff until max_attempts deliveries have been used. Uploaded audio is
+spooled to JOB_AUDIO_DIR until its job finishes.
+
+The queue lives on the local disk, so workers run on the same host as the
+web app that enqueues.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+JOB_QUEUE_DB = os.getenv("JOB_QUEUE_DB", os.path.join(PROJECT_ROOT, "job_queue.db"))
+JOB_AUDIO_DIR = os.getenv("JOB_AUDIO_DIR", os.path.join(PROJECT_ROOT, "job_audio"))
+JOB_VISIBILITY_TIMEOUT_SECONDS = float(os.getenv("JOB_VISIBILITY_TIMEOUT_SECONDS", "600"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BACKOFF_SECONDS = float(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "30"))
+# "inline": the app processes uploads itself; "queue": it enqueues them for job workers
+INGEST_MODE = os.getenv("INGEST_MODE", "inline").strip().lower()
+# Seconds between job status checks in the app
+JOB_STATUS_POLL_SECONDS = float(os.getenv("JOB_STATUS_POLL_SECONDS", "2"))
+
+if INGEST_MODE not in ("inline", "queue"):
+    raise ValueError(f"Unknown INGEST_MODE '{INGEST_MODE}'. Expected one of: inline, queue")
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+STATUSES = (QUEUED, RUNNING, DONE, FAILED)
+
+_schema_lock = threading.Lock()
+_schema_ready_for = None
+
+
+@dataclass
+class Job:
+    """One queued upload and, once done, its result"""
+
+    id: str
+    filename: str
+    audio_hash: str | None
+    status: str
+    attempts: int
+    max_attempts: int
+    use_cache: bool
+    created_at: float
+    updated_at: float
+    error: str | None = None
+    transcript: str | None = None
+    analysis: dict | None = None
+    worker: str | None = None
+    # None: the worker's VAD_TRIM setting
+    trim_silence: bool | None = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+
+_COLUMNS = (
+    "id, filename, audio_hash, status, attempts, max_attempts, use_cache, "
+    "created_at, updated_at, error, transcript, analysis, worker, trim_silence"
+)
+
+
+def _row_to_job(row):
+    (job_id, filename, audio_hash, status, attempts, max_attempts, use_cache,
+     created_at, updated_at, error, transcript, analysis, worker, trim_silence) = row
+    return Job(
+        job_id, filename, audio_hash, status, attempts, max_attempts, bool(use_cache),
+        created_at, updated_at, error, transcript, json.loads(analysis) if analysis else None, worker,
+        None if trim_silence is None else bool(trim_silence),
+    )
+
+
+def _connect() -> sqlite3.Connection:
+    """Open a connection in autocommit mode; state changes use explicit transactions."""
+    global _schema_ready_for
+
+    conn = sqlite3.connect(JOB_QUEUE_DB, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    with _schema_lock:
+        if _schema_ready_for != JOB_QUEUE_DB:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, filename TEXT NOT NULL, audio_hash TEXT, "
+                "status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+                "max_attempts INTEGER NOT NULL, use_cache INTEGER NOT NULL DEFAULT 1, "
+                "available_at REAL NOT NULL, lease_until REAL, worker TEXT, "
+                "created_at REAL NOT NULL, updated_at REAL NOT NULL, "
+                "error TEXT, transcript TEXT, analysis TEXT, trim_silence INTEGER)"
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "trim_silence" not in columns:
+                # Queues created before per-job silence trimming
+                conn.execute("ALTER TABLE jobs ADD COLUMN trim_silence INTEGER")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, available_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_audio_hash ON jobs (audio_hash)")
+            _schema_ready_for = JOB_QUEUE_DB
+    return conn
+
+
+def _audio_path(job_id):
+    return os.path.join(JOB_AUDIO_DIR, f"{job_id}.audio")
+
+
+def _remove_audio(job_id):
+    try:
+        os.remove(_audio_path(job_id))
+    except FileNotFoundError:
+        pass
+
+
+def enqueue(filename, audio_bytes, audio_hash=None, use_cache=True, max_attempts=None, trim_silence=None):
+    """
+    Add an upload to the queue
+
+    An upload whose audio is already queued or running is not added twice;
+    the existing job is returned instead.
+
+    Args:
+        filename: Uploaded file name
+        audio_bytes: Audio file content (spooled to JOB_AUDIO_DIR)
+        audio_hash: audio_digest of the content, used to skip duplicates
+        use_cache: Reuse cached transcripts/analyses; False forces fresh API calls
+        max_attempts: Deliveries before the job fails (default: JOB_MAX_ATTEMPTS)
+        trim_silence: Cut silence and hold music before transcription
+            (default: the worker's VAD_TRIM)
+
+    Returns:
+        str: Job id
+    """
+    job_id = uuid.uuid4().hex
+    os.makedirs(JOB_AUDIO_DIR, exist_ok=True)
+    tmp_path = f"{_audio_path(job_id)}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(audio_bytes)
+    os.replace(tmp_path, _audio_path(job_id))
+
+    now = time.time()
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if audio_hash is not None:
+                row = conn.execute(
+                    "SELECT id FROM jobs WHERE audio_hash = ? AND status IN (?, ?) ORDER BY created_at LIMIT 1",
+                    (audio_hash, QUEUED, RUNNING),
+                ).fetchone()
+                if row is not None:
+                    conn.execute("COMMIT")
+                    _remove_audio(job_id)
+                    return row[0]
+            conn.execute(
+                "INSERT INTO jobs (id, filename, audio_hash, status, max_attempts, use_cache, "
+                "trim_silence, available_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, filename, audio_hash, QUEUED, int(max_attempts or JOB_MAX_ATTEMPTS),
+                 int(bool(use_cache)), None if trim_silence is None else int(bool(trim_silence)), now, now, now),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            _remove_audio(job_id)
+            raise
+    finally:
+        conn.close()
+    return job_id
+
+
+def claim(worker, visibility_timeout=None):
+    """
+    Lease the next ready job
+
+    Ready jobs are queued ones past their retry backoff, and running ones
+    whose lease expired (their worker stopped). An expired job that has used
+    all its attempts is failed instead.
+
+    Args:
+        worker: Worker id recorded on the job
+        visibility_timeout: Lease length in seconds (default: JOB_VISIBILITY_TIMEOUT_SECONDS)
+
+    Returns:
+        tuple: (Job, audio bytes), or None if no job is ready
+    """
+    timeout = float(visibility_timeout or JOB_VISIBILITY_TIMEOUT_SECONDS)
+    now = time.time()
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, lease_until = NULL, updated_at = ? "
+                "WHERE status = ? AND lease_until < ? AND attempts >= max_attempts",
+                (FAILED, "Worker stopped responding on the last attempt", now, RUNNING, now),
+            )
+            row = conn.execute(
+                f"SELECT {_COLUMNS} FROM jobs "
+                "WHERE (status = ? AND available_at <= ?) OR (status = ? AND lease_until < ?) "
+                "ORDER BY available_at LIMIT 1",
+                (QUEUED, now, RUNNING, now),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            job = _row_to_job(row)
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_until = ?, worker = ?, "
+                "updated_at = ? WHERE id = ?",
+                (RUNNING, now + timeout, worker, now, job.id),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+
+    job.status, job.attempts, job.worker = RUNNING, job.attempts + 1, worker
+    try:
+        with open(_audio_path(job.id), "rb") as f:
+            audio_bytes = f.read()
+    except FileNotFoundError:
+        fail(job.id, worker, "Spooled audio is missing", retry=False)
+        return claim(worker, visibility_timeout)
+    return job, audio_bytes
+
+
+def _update_leased(job_id, worker, sql, params):
+    """Run an UPDATE on a job only while worker still holds its lease"""
+    conn = _connect()
+    try:
+        cursor = conn.execute(
+            f"{sql} WHERE id = ? AND status = ? AND worker = ?", (*params, job_id, RUNNING, worker)
+        )
+        return cursor.rowcount == 1
+    finally:
+        conn.close()
+
+
+def extend_lease(job_id, worker, visibility_timeout=None):
+    """
+    Push a running job's lease out by the visibility timeout
+
+    Returns:
+        bool: False if the lease was lost (expired and claimed by another worker)
+    """
+    timeout = float(visibility_timeout or JOB_VISIBILITY_TIMEOUT_SECONDS)
+    now = time.time()
+    return _update_leased(job_id, worker, "UPDATE jobs SET lease_until = ?, updated_at = ?", (now + timeout, now))
+
+
+def complete(job_id, worker, transcript, analysis):
+    """
+    Mark a job done and keep its result for the UI
+
+    Args:
+        analysis: CallAnalysis (stored as JSON)
+
+    Returns:
+        bool: False if the lease was lost
+    """
+    done = _update_leased(
+        job_id, worker,
+        "UPDATE jobs SET status = ?, error = NULL, transcript = ?, analysis = ?, lease_until = NULL, updated_at = ?",
+        (DONE, transcript, json.dumps(analysis.to_dict(), ensure_ascii=False), time.time()),
+    )
+    if done:
+        _remove_audio(job_id)
+    return done
+
+
+def fail(job_id, worker, error, retry=True):
+    """
+    Record a failed attempt
+
+    The job is queued again after JOB_RETRY_BACKOFF_SECONDS (doubling with
+    each attempt) while it has attempts left and retry is True; otherwise it
+    is marked failed.
+
+    Returns:
+        str: The job's new status, or None if the lease was lost
+    """
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND status = ? AND worker = ?",
+                (job_id, RUNNING, worker),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            attempts, max_attempts = row
+            now = time.time()
+            if retry and attempts < max_attempts:
+                status = QUEUED
+                available_at = now + JOB_RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1)
+            else:
+                status, available_at = FAILED, now
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, available_at = ?, lease_until = NULL, updated_at = ? "
+                "WHERE id = ?",
+                (status, str(error), available_at, now, job_id),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
+    if status == FAILED:
+        _remove_audio(job_id)
+    return status
+
+
+def get_jobs(job_ids):
+    """
+    Current state of the given jobs
+
+    Returns:
+        dict: {job id: Job}; unknown ids are left out
+    """
+    job_ids = list(job_ids)
+    if not job_ids or not os.path.exists(JOB_QUEUE_DB):
+        return {}
+    conn = _connect()
+    try:
+        placeholders = ", ".join("?" for _ in job_ids)
+        rows = conn.execute(f"SELECT {_COLUMNS} FROM jobs WHERE id IN ({placeholders})", job_ids).fetchall()
+    finally:
+        conn.close()
+    return {row[0]: _row_to_job(row) for row in rows}
+
+
+def queue_stats():
+    """
+    Jobs per status
+
+    Returns:
+        dict: {status: count} for every status
+    """
+    stats = dict.fromkeys(STATUSES, 0)
+    if not os.path.exists(JOB_QUEUE_DB):
+        return stats
+    conn = _connect()
+    try:
+        for status, count in conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"):
+            stats[status] = count
+    finally:
+        conn.close()
+    return stats
+
+
+def purge_finished(older_than_seconds):
+    """
+    Delete done and failed jobs last updated more than older_than_seconds ago
+
+    Returns:
+        int: Jobs deleted
+    """
+    if not os.path.exists(JOB_QUEUE_DB):
+        return 0
+    conn = _connect()
+    try:
+        cursor = conn.execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+            (DONE, FAILED, time.time() - float(older_than_seconds)),
+        )
+        return cursor.rowcount
+    finally:
+        conn.close()
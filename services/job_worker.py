@@ -0,0 +1,206 @@
+"""Ingestion worker: transcribe, analyze and save jobs from the durable job queue
+
+Usage:
+    python -m services.job_worker [--concurrency 2] [--visibility-timeout 600] [--once]
+
+Runs --concurrency jobs at a time, each in its own thread, and extends
+their leases while they run. A failed attempt is queued again with backoff
+until the job's attempts are used up. The saved record's Record ID is the
+job id, and before saving the worker checks the record store for it. A
+retry of a job whose earlier attempt saved the record (and then lost its
+worker) therefore does not save a duplicate. SIGTERM or Ctrl+C stops claiming new jobs and lets
+running ones finish. Start more worker processes (see
+deploy/systemd/ingest-worker@.service) to scale independently of the web app.
+"""
+import argparse
+import os
+import signal
+import socket
+import sys
+import threading
+from datetime import datetime, timedelta
+
+from data.repository import get_records_by_audio_hash, get_records_by_id, save_records
+from data.schema import RECORD_ID_COLUMN
+from services.analysis_service import analyze_call
+from services.job_queue import (
+    JOB_VISIBILITY_TIMEOUT_SECONDS,
+    claim,
+    complete,
+    extend_lease,
+    fail,
+    queue_stats,
+)
+from services.transcription_service import transcribe_audio
+
+JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", "2"))
+# Seconds an idle worker waits before looking for new jobs again
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "2"))
+
+
+def _already_saved(job):
+    """True if an earlier attempt saved the job's record (or, for a cached job, a record of its audio)"""
+    # Both lookups only cover records dated since the job was queued, less a
+    # day for clock and time zone differences. Audio already stored before
+    # then is found at upload time (stored_results) and never queued.
+    since = datetime.fromtimestamp(job.created_at) - timedelta(days=1)
+    if job.use_cache and job.audio_hash is not None:
+        if not get_records_by_audio_hash([job.audio_hash], start=since).empty:
+            return True
+    # Records saved by the worker carry the job id as their Record ID
+    return not get_records_by_id([job.id], columns=[RECORD_ID_COLUMN], start=since).empty
+
+
+def process_job(client, job, audio_bytes):
+    """
+    Transcribe, analyze and save one job
+
+    Returns:
+        tuple: (transcript, CallAnalysis)
+
+    Raises:
+        RuntimeError: If the record could not be saved
+    """
+    transcript = transcribe_audio(
+        client, audio_bytes, job.filename, use_cache=job.use_cache, trim_silence=job.trim_silence
+    )
+    analysis = analyze_call(client, transcript, use_cache=job.use_cache)
+    if not _already_saved(job):
+        ok, error = save_records([(job.filename, transcript, analysis, job.audio_hash, job.id)])
+        if not ok:
+            raise RuntimeError(f"Saving the record failed: {error}")
+    return transcript, analysis
+
+
+def run_worker(client, concurrency=None, visibility_timeout=None, poll_seconds=None, once=False,
+               stop=None, log=print):
+    """
+    Process queued jobs until stopped
+
+    Args:
+        client: Groq client instance
+        concurrency: Jobs processed at a time (default: JOB_WORKER_CONCURRENCY)
+        visibility_timeout: Lease length in seconds (default: JOB_VISIBILITY_TIMEOUT_SECONDS)
+        poll_seconds: Idle wait between claims (default: JOB_POLL_SECONDS)
+        once: Return once no job is ready instead of waiting for more
+        stop: threading.Event that ends the loop once set (running jobs finish)
+        log: Progress output function
+
+    Returns:
+        dict: {"done": n, "retried": n, "failed": n, "lost": n}
+    """
+    concurrency = max(1, int(concurrency or JOB_WORKER_CONCURRENCY))
+    visibility_timeout = float(visibility_timeout or JOB_VISIBILITY_TIMEOUT_SECONDS)
+    poll_seconds = float(poll_seconds if poll_seconds is not None else JOB_POLL_SECONDS)
+    stop = stop or threading.Event()
+    prefix = f"{socket.gethostname()}:{os.getpid()}"
+
+    counts = {"done": 0, "retried": 0, "failed": 0, "lost": 0}
+    in_flight = {}
+    lock = threading.Lock()
+    # Leases are renewed until the running jobs finish, even after stop is set
+    finished = threading.Event()
+
+    def count(outcome):
+        with lock:
+            counts[outcome] += 1
+
+    def heartbeat():
+        # Renew every lease a few times per timeout, so a slow job is not re-delivered
+        while not finished.wait(visibility_timeout / 3):
+            with lock:
+                leases = list(in_flight.items())
+            for job_id, worker in leases:
+                if not extend_lease(job_id, worker, visibility_timeout):
+                    log(f"Lost lease on job {job_id}")
+
+    def work(slot):
+        worker = f"{prefix}:{slot}"
+        while not stop.is_set():
+            claimed = claim(worker, visibility_timeout)
+            if claimed is None:
+                if once:
+                    return
+                stop.wait(poll_seconds)
+                continue
+            job, audio_bytes = claimed
+            with lock:
+                in_flight[job.id] = worker
+            try:
+                transcript, analysis = process_job(client, job, audio_bytes)
+            except Exception as e:
+                status = fail(job.id, worker, e)
+                outcome = {"queued": "retried", "failed": "failed"}.get(status, "lost")
+                log(f"{outcome.upper()} {job.filename} (attempt {job.attempts}/{job.max_attempts}): {e}")
+                count(outcome)
+            else:
+                if complete(job.id, worker, transcript, analysis):
+                    log(f"Done {job.filename} (attempt {job.attempts})")
+                    count("done")
+                else:
+                    log(f"Finished {job.filename} after its lease expired; another worker has the job")
+                    count("lost")
+            finally:
+                with lock:
+                    in_flight.pop(job.id, None)
+
+    beat = threading.Thread(target=heartbeat, name="job-heartbeat", daemon=True)
+    beat.start()
+    threads = [threading.Thread(target=work, args=(slot,), name=f"job-worker-{slot}") for slot in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    finished.set()
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m services.job_worker", description=__doc__.splitlines()[0]
+    )
+    parser.add_argument("--concurrency", type=int, default=JOB_WORKER_CONCURRENCY, help="Jobs processed at a time")
+    parser.add_argument(
+        "--visibility-timeout", type=float, default=JOB_VISIBILITY_TIMEOUT_SECONDS,
+        help="Seconds a claimed job stays hidden from other workers without a lease renewal"
+    )
+    parser.add_argument("--poll", type=float, default=JOB_POLL_SECONDS, help="Idle seconds between claims")
+    parser.add_argument("--once", action="store_true", help="Exit once the queue has no ready jobs")
+    parser.add_argument(
+        "--fake-client", action="store_true",
+        help="Use the offline FakeGroq client (for exercising the queue without API calls)"
+    )
+    args = parser.parse_args(argv)
+
+    if args.fake_client:
+        from services.fake_groq_client import FakeGroq
+        from services.request_scheduler import ScheduledGroq
+
+        client = ScheduledGroq(FakeGroq())
+    else:
+        from services.groq_client import get_groq_client
+
+        try:
+            client = get_groq_client()
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+
+    stop = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stop.set())
+
+    print(f"Worker started with {args.concurrency} slot(s); queue: {queue_stats()}")
+    counts = run_worker(
+        client, concurrency=args.concurrency, visibility_timeout=args.visibility_timeout,
+        poll_seconds=args.poll, once=args.once, stop=stop,
+    )
+    print(
+        f"Worker stopped: {counts['done']} done, {counts['retried']} retried, "
+        f"{counts['failed']} failed, {counts['lost']} lost lease"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,462 @@
+"""Rate-limit-aware scheduling for Groq API calls
+
+Groq limits requests and tokens per minute for each model. Every call made
+through a ScheduledGroq client is admitted by a RequestScheduler, which
+keeps a token bucket per limit and a priority queue per model. Interactive
+uploads are admitted before batch backfills, and calls of equal priority go
+in arrival order. Rate-limit responses (429) pause the model until its
+retry-after time, then the call is queued again. Other transient failures
+(5xx, connection errors) are retried with jittered exponential backoff.
+
+The scheduler takes a clock, so tests can drive it with FakeClock instead
+of real time.
+"""
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from types import SimpleNamespace
+
+from services.token_budget import count_tokens
+
+INTERACTIVE = 0
+BATCH = 10
+
+WHISPER_MODEL = "whisper-large-v3"
+CHAT_MODEL = "llama-3.3-70b-versatile"
+
+GROQ_WHISPER_RPM = float(os.getenv("GROQ_WHISPER_RPM", "20"))
+GROQ_CHAT_RPM = float(os.getenv("GROQ_CHAT_RPM", "30"))
+GROQ_CHAT_TPM = float(os.getenv("GROQ_CHAT_TPM", "12000"))
+GROQ_RETRY_ATTEMPTS = int(os.getenv("GROQ_RETRY_ATTEMPTS", "6"))
+GROQ_BACKOFF_BASE_SECONDS = float(os.getenv("GROQ_BACKOFF_BASE_SECONDS", "1"))
+GROQ_BACKOFF_MAX_SECONDS = float(os.getenv("GROQ_BACKOFF_MAX_SECONDS", "60"))
+
+# Tokens reserved for the completion when a request sets no max_tokens
+COMPLETION_TOKEN_ALLOWANCE = int(os.getenv("GROQ_COMPLETION_TOKEN_ALLOWANCE", "512"))
+
+WAIT_SAMPLES = 1000
+RETRYABLE_STATUS = (408, 429, 500, 502, 503, 504)
+RETRYABLE_ERRORS = ("APIConnectionError", "APITimeoutError")
+
+
+@dataclass
+class RateLimit:
+    """Per-model limits; None disables that bucket"""
+
+    requests_per_minute: float | None = None
+    tokens_per_minute: float | None = None
+
+
+DEFAULT_LIMITS = {
+    WHISPER_MODEL: RateLimit(requests_per_minute=GROQ_WHISPER_RPM),
+    CHAT_MODEL: RateLimit(requests_per_minute=GROQ_CHAT_RPM, tokens_per_minute=GROQ_CHAT_TPM),
+}
+
+
+class MonotonicClock:
+    """Real time"""
+
+    def now(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        time.sleep(max(0.0, seconds))
+
+    async def sleep_async(self, seconds):
+        await asyncio.sleep(max(0.0, seconds))
+
+    def wait(self, condition, timeout):
+        condition.wait(timeout)
+
+
+class FakeClock:
+    """
+    Manually advanced time for tests
+
+    Sleeping always advances the clock instantly. With auto_advance (the
+    default), a caller waiting for rate-limit capacity also advances it, so
+    single-threaded tests run straight through. With auto_advance=False,
+    waiters block until the test calls advance(), which lets several
+    threads queue up before anything is admitted.
+    """
+
+    def __init__(self, start=0.0, auto_advance=True):
+        self._now = float(start)
+        self._lock = threading.Lock()
+        self._conditions = set()
+        self.auto_advance = auto_advance
+        self.slept = []
+
+    def now(self):
+        with self._lock:
+            return self._now
+
+    def advance(self, seconds):
+        with self._lock:
+            self._now += max(0.0, seconds)
+            conditions = list(self._conditions)
+        for condition in conditions:
+            with condition:
+                condition.notify_all()
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.advance(seconds)
+
+    async def sleep_async(self, seconds):
+        self.sleep(seconds)
+        await asyncio.sleep(0)
+
+    def wait(self, condition, timeout):
+        if timeout is not None and self.auto_advance:
+            self.advance(timeout)
+            return
+        with self._lock:
+            self._conditions.add(condition)
+        condition.wait()
+
+
+class TokenBucket:
+    """Refills at rate_per_minute / 60 per second, holding at most one minute's worth"""
+
+    def __init__(self, rate_per_minute, now):
+        self.capacity = float(rate_per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = now
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount, now):
+        """Seconds until amount can be taken (0 if it can be taken now)"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        # Tolerance for float rounding after waiting exactly the computed delay
+        if self.level >= amount - 1e-9:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount, now):
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+
+
+class _ModelState:
+    def __init__(self, limit, now):
+        self.requests = TokenBucket(limit.requests_per_minute, now) if limit.requests_per_minute else None
+        self.tokens = TokenBucket(limit.tokens_per_minute, now) if limit.tokens_per_minute else None
+        self.queue = []
+        self.paused_until = 0.0
+        self.in_flight = 0
+        self.waits = deque(maxlen=WAIT_SAMPLES)
+        self.counts = {"admitted": 0, "completed": 0, "failed": 0, "retries": 0, "rate_limited": 0}
+
+    def delay(self, tokens, now):
+        delays = [self.paused_until - now]
+        if self.requests is not None:
+            delays.append(self.requests.delay(1, now))
+        if self.tokens is not None:
+            delays.append(self.tokens.delay(tokens, now))
+        return max(0.0, *delays)
+
+    def take(self, tokens, now):
+        if self.requests is not None:
+            self.requests.take(1, now)
+        if self.tokens is not None:
+            self.tokens.take(tokens, now)
+
+
+def retry_after_seconds(error):
+    """Delay requested by a rate-limit response's headers, or None"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after-ms")
+    if value is not None:
+        try:
+            return float(value) / 1000.0
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _status_code(error):
+    return getattr(error, "status_code", None)
+
+
+def is_retryable(error):
+    """Rate limits, server errors, timeouts and dropped connections are retried"""
+    return _status_code(error) in RETRYABLE_STATUS or type(error).__name__ in RETRYABLE_ERRORS
+
+
+class RequestScheduler:
+    """
+    Admission control, prioritization and retries for API calls
+
+    Args:
+        limits: {model: RateLimit}; models not listed are queued and
+            retried but not rate limited
+        clock: MonotonicClock (default) or FakeClock
+        max_attempts: Attempts per call before the last error is raised
+        backoff_base: First backoff ceiling in seconds (doubles per attempt)
+        backoff_max: Backoff ceiling cap in seconds
+        rng: random.Random used for backoff jitter
+    """
+
+    def __init__(self, limits=None, clock=None, max_attempts=GROQ_RETRY_ATTEMPTS,
+                 backoff_base=GROQ_BACKOFF_BASE_SECONDS, backoff_max=GROQ_BACKOFF_MAX_SECONDS, rng=None):
+        self.limits = dict(DEFAULT_LIMITS if limits is None else limits)
+        self.clock = clock or MonotonicClock()
+        self.max_attempts = max(1, int(max_attempts))
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rng = rng or random.Random()
+        self._cond = threading.Condition()
+        self._models = {}
+        self._sequence = itertools.count()
+
+    def _state(self, model):
+        state = self._models.get(model)
+        if state is None:
+            state = _ModelState(self.limits.get(model, RateLimit()), self.clock.now())
+            self._models[model] = state
+        return state
+
+    def _enqueue(self, model, priority):
+        state = self._state(model)
+        ticket = (priority, next(self._sequence))
+        heapq.heappush(state.queue, ticket)
+        self._cond.notify_all()
+        return state, ticket
+
+    def _try_admit(self, state, ticket, tokens, started):
+        """Admit ticket if it is first in line and within limits; else seconds to wait (None: not first)"""
+        if state.queue[0] != ticket:
+            return None
+        now = self.clock.now()
+        delay = state.delay(tokens, now)
+        if delay > 0:
+            return delay
+        state.take(tokens, now)
+        heapq.heappop(state.queue)
+        state.in_flight += 1
+        state.counts["admitted"] += 1
+        state.waits.append(now - started)
+        self._cond.notify_all()
+        return 0.0
+
+    def _abandon(self, state, ticket):
+        if ticket in state.queue:
+            state.queue.remove(ticket)
+            heapq.heapify(state.queue)
+            self._cond.notify_all()
+
+    def acquire(self, model, tokens=0, priority=INTERACTIVE):
+        """Block until a call to model may start"""
+        with self._cond:
+            state, ticket = self._enqueue(model, priority)
+            started = self.clock.now()
+            try:
+                while True:
+                    delay = self._try_admit(state, ticket, tokens, started)
+                    if delay == 0.0:
+                        return
+                    self.clock.wait(self._cond, delay)
+            except BaseException:
+                self._abandon(state, ticket)
+                raise
+
+    async def acquire_async(self, model, tokens=0, priority=INTERACTIVE, poll_seconds=0.05):
+        """Wait without blocking the event loop until a call to model may start"""
+        with self._cond:
+            state, ticket = self._enqueue(model, priority)
+            started = self.clock.now()
+        try:
+            while True:
+                with self._cond:
+                    delay = self._try_admit(state, ticket, tokens, started)
+                if delay == 0.0:
+                    return
+                await self.clock.sleep_async(poll_seconds if delay is None else min(delay, 1.0))
+        except BaseException:
+            with self._cond:
+                self._abandon(state, ticket)
+            raise
+
+    def _backoff(self, attempt):
+        """Full jitter: uniform over [0, min(max, base * 2**attempt)]"""
+        return self.rng.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _finish(self, model, attempt, error=None):
+        """Record a call's outcome; returns the delay before retrying, or None to give up"""
+        with self._cond:
+            state = self._state(model)
+            state.in_flight -= 1
+            if error is None:
+                state.counts["completed"] += 1
+                return None
+            if not is_retryable(error) or attempt >= self.max_attempts - 1:
+                state.counts["failed"] += 1
+                return None
+            delay = retry_after_seconds(error)
+            if delay is None:
+                delay = self._backoff(attempt)
+            state.counts["retries"] += 1
+            if _status_code(error) == 429:
+                state.counts["rate_limited"] += 1
+                # The limit applies to every caller of this model: hold its queue, not just this call
+                state.paused_until = max(state.paused_until, self.clock.now() + delay)
+                return 0.0
+            return delay
+
+    def call(self, model, fn, tokens=0, priority=INTERACTIVE):
+        """
+        Run fn() once admitted, retrying transient failures
+
+        Args:
+            model: Model name (selects the rate limits and queue)
+            fn: Zero-argument callable making the API request
+            tokens: Estimated tokens the request consumes
+            priority: INTERACTIVE, BATCH or any int (lower goes first)
+
+        Returns:
+            Whatever fn returns
+        """
+        for attempt in range(self.max_attempts):
+            self.acquire(model, tokens, priority)
+            try:
+                result = fn()
+            except Exception as e:
+                delay = self._finish(model, attempt, e)
+                if delay is None:
+                    raise
+                self.clock.sleep(delay)
+                continue
+            self._finish(model, attempt)
+            return result
+
+    async def call_async(self, model, fn, tokens=0, priority=INTERACTIVE):
+        """Async variant of call; fn returns an awaitable"""
+        for attempt in range(self.max_attempts):
+            await self.acquire_async(model, tokens, priority)
+            try:
+                result = await fn()
+            except Exception as e:
+                delay = self._finish(model, attempt, e)
+                if delay is None:
+                    raise
+                await self.clock.sleep_async(delay)
+                continue
+            self._finish(model, attempt)
+            return result
+
+    def stats(self):
+        """
+        Per-model queue and wait metrics
+
+        Returns:
+            dict: {model: {queued, in_flight, paused_seconds, wait_p50,
+                wait_p95, wait_max, admitted, completed, failed, retries,
+                rate_limited}}
+        """
+        with self._cond:
+            now = self.clock.now()
+            snapshot = {}
+            for model, state in self._models.items():
+                waits = sorted(state.waits)
+                snapshot[model] = {
+                    "queued": len(state.queue),
+                    "in_flight": state.in_flight,
+                    "paused_seconds": max(0.0, state.paused_until - now),
+                    "wait_p50": waits[len(waits) // 2] if waits else 0.0,
+                    "wait_p95": waits[min(len(waits) - 1, int(0.95 * len(waits)))] if waits else 0.0,
+                    "wait_max": waits[-1] if waits else 0.0,
+                    **state.counts,
+                }
+            return snapshot
+
+
+class _ScheduledEndpoint:
+    def __init__(self, owner, path):
+        self._owner = owner
+        self._path = path
+
+    def create(self, **kwargs):
+        owner = self._owner
+        target = owner.client
+        for name in self._path:
+            target = getattr(target, name)
+        create = target.create
+        model = kwargs.get("model")
+        tokens = 0
+        if self._path[-1] == "completions":
+            # Admission cost: the prompt, counted like compaction counts it, plus the completion budget
+            tokens = sum(count_tokens(str(m.get("content", ""))) for m in kwargs.get("messages", []))
+            tokens += int(kwargs.get("max_tokens") or COMPLETION_TOKEN_ALLOWANCE)
+        if asyncio.iscoroutinefunction(create):
+            return owner.scheduler.call_async(model, lambda: create(**kwargs), tokens, owner.priority)
+        return owner.scheduler.call(model, lambda: create(**kwargs), tokens, owner.priority)
+
+
+class ScheduledGroq:
+    """
+    Groq or AsyncGroq client whose transcription and chat calls go through a scheduler
+
+    Other attributes (close, models, ...) are passed through to the
+    wrapped client.
+
+    Args:
+        client: groq.Groq, groq.AsyncGroq or FakeGroq
+        scheduler: RequestScheduler (default: the process-wide one)
+        priority: Priority of this client's calls
+    """
+
+    def __init__(self, client, scheduler=None, priority=INTERACTIVE):
+        self.client = client
+        self.scheduler = scheduler or get_scheduler()
+        self.priority = priority
+        self.audio = SimpleNamespace(transcriptions=_ScheduledEndpoint(self, ("audio", "transcriptions")))
+        self.chat = SimpleNamespace(completions=_ScheduledEndpoint(self, ("chat", "completions")))
+
+    def with_priority(self, priority):
+        """Same client and scheduler, different priority"""
+        return ScheduledGroq(self.client, self.scheduler, priority)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Process-wide scheduler shared by every ScheduledGroq client"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RequestScheduler()
+    return _scheduler
+
+
+def get_scheduler_stats():
+    """Queue depth and wait metrics of the process-wide scheduler"""
+    return get_scheduler().stats()
@@ -0,0 +1,243 @@
+"""Size-bounded LRU caches for API results, on local disk or S3
+
+Entries are small JSON documents keyed by a hex digest. Reads refresh an
+entry's recency; writes evict least-recently-used entries once the total
+size goes over the configured bound. An optional TTL expires entries by
+creation time. Cache failures never propagate to callers: a broken cache
+behaves like a miss.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+from data.s3_client import create_s3_client, use_s3
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+CACHE_ROOT = os.getenv("RESULT_CACHE_DIR", os.path.join(PROJECT_ROOT, ".cache"))
+# An S3 cache hit refreshes the object's recency (a billable copy) at most
+# this often; caches with a TTL refresh once their entry is TTL/2 old instead
+S3_CACHE_REFRESH_SECONDS = float(os.getenv("S3_CACHE_REFRESH_HOURS", "24")) * 3600
+
+
+def make_key(*parts) -> str:
+    """SHA-256 over the given parts (bytes or str), length-prefixed so parts can't collide"""
+    digest = hashlib.sha256()
+    for part in parts:
+        data = part if isinstance(part, bytes) else str(part).encode("utf-8")
+        digest.update(len(data).to_bytes(8, "big"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class _CacheStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "errors": 0}
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self._counts[name] += amount
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+        lookups = counts["hits"] + counts["misses"]
+        counts["hit_rate"] = counts["hits"] / lookups if lookups else 0.0
+        return counts
+
+
+class _BaseCache:
+    def __init__(self, max_bytes, ttl_seconds=None):
+        self.max_bytes = int(max_bytes)
+        self.ttl_seconds = ttl_seconds
+        self.stats = _CacheStats()
+        self._lock = threading.Lock()
+        self._total_bytes = None
+
+    def _expired(self, entry) -> bool:
+        return self.ttl_seconds is not None and time.time() - entry.get("created", 0) > self.ttl_seconds
+
+    def get(self, key):
+        """Return the cached value for key, or None on miss"""
+        try:
+            entry = self._read(key)
+            if entry is not None and self._expired(entry):
+                self._delete(key)
+                entry = None
+        except Exception:
+            self.stats.incr("errors")
+            entry = None
+
+        if entry is None:
+            self.stats.incr("misses")
+            return None
+        self.stats.incr("hits")
+        return entry.get("value")
+
+    def set(self, key, value):
+        """Store value (JSON-serializable) under key and evict if over budget"""
+        payload = json.dumps({"created": time.time(), "value": value}).encode("utf-8")
+        try:
+            self._write(key, payload)
+            self.stats.incr("writes")
+            with self._lock:
+                if self._total_bytes is not None:
+                    self._total_bytes += len(payload)
+                if self._total_bytes is None or self._total_bytes > self.max_bytes:
+                    self._evict()
+        except Exception:
+            self.stats.incr("errors")
+
+    def _evict(self):
+        """Drop least-recently-used entries until the cache fits in max_bytes"""
+        entries = sorted(self._list_entries(), key=lambda e: e[1])
+        total = sum(size for _, _, size in entries)
+        for key, _, size in entries:
+            if total <= self.max_bytes:
+                break
+            self._delete(key)
+            total -= size
+            self.stats.incr("evictions")
+        self._total_bytes = total
+
+
+class DiskCache(_BaseCache):
+    """Cache stored as one file per entry; file mtime tracks recency"""
+
+    def __init__(self, directory, max_bytes, ttl_seconds=None):
+        super().__init__(max_bytes, ttl_seconds)
+        self.directory = directory
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def _read(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                entry = json.loads(f.read())
+        except FileNotFoundError:
+            return None
+        os.utime(path)
+        return entry
+
+    def _write(self, key, payload):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+    def _delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _list_entries(self):
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                stat = os.stat(os.path.join(root, name))
+                entries.append((name[:-5], stat.st_mtime, stat.st_size))
+        return entries
+
+
+class S3Cache(_BaseCache):
+    """
+    Cache stored as one object per entry under a prefix; LastModified tracks recency
+
+    Refreshing LastModified takes a copy_object, which S3 bills as a write.
+    A hit only refreshes it once the object is older than the refresh
+    window, so recency is tracked to within that window and most reads
+    stay reads.
+    """
+
+    def __init__(self, client, bucket, prefix, max_bytes, ttl_seconds=None):
+        super().__init__(max_bytes, ttl_seconds)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.rstrip("/") + "/"
+        self.refresh_seconds = ttl_seconds / 2 if ttl_seconds else S3_CACHE_REFRESH_SECONDS
+
+    def _object_key(self, key):
+        return f"{self.prefix}{key}.json"
+
+    def _read(self, key):
+        from botocore.exceptions import ClientError
+
+        object_key = self._object_key(key)
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=object_key)
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+                return None
+            raise
+        entry = json.loads(response["Body"].read())
+        last_modified = response.get("LastModified")
+        if last_modified is None or time.time() - last_modified.timestamp() > self.refresh_seconds:
+            # Copying onto itself bumps LastModified, which is what eviction orders by
+            self.client.copy_object(
+                Bucket=self.bucket,
+                Key=object_key,
+                CopySource={"Bucket": self.bucket, "Key": object_key},
+                MetadataDirective="REPLACE",
+                ContentType="application/json",
+            )
+        return entry
+
+    def _write(self, key, payload):
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=self._object_key(key),
+            Body=payload,
+            ContentType="application/json",
+        )
+
+    def _delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+
+    def _list_entries(self):
+        entries = []
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for obj in page.get("Contents", []):
+                name = obj["Key"][len(self.prefix):]
+                if name.endswith(".json"):
+                    entries.append((name[:-5], obj["LastModified"].timestamp(), obj["Size"]))
+        return entries
+
+
+def build_cache(name, max_bytes, ttl_seconds=None):
+    """
+    Create a cache in S3 when USE_S3 is on and a bucket is configured, else on local disk
+
+    USE_S3 is read with data.s3_client.use_s3() (default true), as in
+    data/repository_s3.py, so replicas sharing an S3 record store also
+    share their caches.
+
+    Args:
+        name: Cache namespace, used as the directory / key prefix
+        max_bytes: Size bound for LRU eviction
+        ttl_seconds: Optional expiry by entry age
+
+    Returns:
+        DiskCache or S3Cache
+    """
+    bucket = os.getenv("S3_BUCKET_NAME")
+    if use_s3() and bucket:
+        try:
+            client = create_s3_client()
+            prefix = os.getenv("S3_CACHE_PREFIX", "cache").rstrip("/")
+            return S3Cache(client, bucket, f"{prefix}/{name}", max_bytes, ttl_seconds)
+        except Exception as e:
+            print(f"Warning: Could not initialize S3 cache '{name}': {e}")
+            print("Falling back to local cache")
+    return DiskCache(os.path.join(CACHE_ROOT, name), max_bytes, ttl_seconds)
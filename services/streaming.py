@@ -0,0 +1,137 @@
+"""Streamed chat completions with time-to-first-token tracking
+
+A CompletionStream yields text deltas as they arrive, so the UI can render
+them with st.write_stream, and assembles the full text for saving. Each
+stream records its time to first token and total latency under a label.
+get_latency_stats reports those per label, so perceived latency (TTFT) can
+be tracked separately from total generation time.
+"""
+import threading
+import time
+from collections import deque
+
+LATENCY_SAMPLES = 500
+
+
+class LatencyTracker:
+    """Recent TTFT and total-latency samples per label"""
+
+    def __init__(self, max_samples=LATENCY_SAMPLES):
+        self._lock = threading.Lock()
+        self._samples = {}
+        self.max_samples = max_samples
+
+    def record(self, label, ttft_seconds, total_seconds):
+        with self._lock:
+            samples = self._samples.setdefault(label, deque(maxlen=self.max_samples))
+            samples.append((ttft_seconds, total_seconds))
+
+    def snapshot(self) -> dict:
+        """
+        Returns:
+            dict: {label: {count, ttft_p50, ttft_p95, total_p50, total_p95}} in seconds
+        """
+        with self._lock:
+            samples = {label: list(values) for label, values in self._samples.items()}
+        stats = {}
+        for label, values in samples.items():
+            ttfts = sorted(v[0] for v in values)
+            totals = sorted(v[1] for v in values)
+            p95 = min(len(values) - 1, int(0.95 * len(values)))
+            stats[label] = {
+                "count": len(values),
+                "ttft_p50": ttfts[len(ttfts) // 2],
+                "ttft_p95": ttfts[p95],
+                "total_p50": totals[len(totals) // 2],
+                "total_p95": totals[p95],
+            }
+        return stats
+
+
+_tracker = LatencyTracker()
+
+
+def record_latency(label, ttft_seconds, total_seconds):
+    """Record one call's timings (for a non-streamed call, TTFT is the total)"""
+    _tracker.record(label, ttft_seconds, total_seconds)
+
+
+def get_latency_stats():
+    """TTFT and total latency percentiles per call type"""
+    return _tracker.snapshot()
+
+
+class CompletionStream:
+    """
+    Iterable of text deltas from a chat completion
+
+    Iterate it (or pass it to st.write_stream) to consume the deltas; the
+    request starts on first iteration. Afterwards, .text holds the full
+    completion, .result the value returned by finish, and .ttft_seconds /
+    .total_seconds the timings.
+
+    Args:
+        start: Zero-argument callable returning an iterable of stream chunks
+            (chat.completions.create(..., stream=True))
+        label: Name the timings are recorded under
+        finish: Optional callable(text) -> result, run once the stream is consumed
+    """
+
+    def __init__(self, start, label, finish=None):
+        self._start = start
+        self.label = label
+        self._finish = finish
+        self._parts = []
+        self._known_text = None
+        self.done = False
+        self.result = None
+        self.ttft_seconds = None
+        self.total_seconds = None
+
+    @classmethod
+    def from_text(cls, text, label, result=None):
+        """A stream that yields already-known text at once (e.g. a cache hit); not timed"""
+        stream = cls(None, label)
+        stream._known_text = text
+        stream.result = result
+        return stream
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    def _chunks(self):
+        if self._start is None:
+            yield self._known_text
+            return
+        for chunk in self._start():
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                yield delta
+
+    def __iter__(self):
+        if self.done:
+            yield self.text
+            return
+        started = time.perf_counter()
+        for delta in self._chunks():
+            if self.ttft_seconds is None:
+                self.ttft_seconds = time.perf_counter() - started
+            self._parts.append(delta)
+            yield delta
+        self.total_seconds = time.perf_counter() - started
+        if self.ttft_seconds is None:
+            self.ttft_seconds = self.total_seconds
+        self.done = True
+        if self._start is not None:
+            _tracker.record(self.label, self.ttft_seconds, self.total_seconds)
+        if self._finish is not None:
+            self.result = self._finish(self.text)
+
+    def consume(self) -> str:
+        """Read the rest of the stream and return the full text"""
+        for _ in self:
+            pass
+        return self.text
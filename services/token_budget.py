@@ -0,0 +1,318 @@
+"""Token estimates and prompt compaction before LLM calls
+
+count_tokens uses tiktoken's cl100k_base encoding when tiktoken is
+installed (`pip install tiktoken`; Llama 3's tokenizer is derived from it).
+Otherwise it splits text with the same style of pre-tokenizer regex and
+counts common words as one token and longer ones as several, which comes to
+about 1.3 tokens per English word.
+
+compact_transcript fits a transcript into a token budget in stages:
+    1. clean: drop fillers and disfluencies ("um", "uh", stutters, "you know")
+    2. collapse: replace repeated sentences and word loops (hold messages,
+       Whisper repetitions during music) with a single copy and a count
+    3. summarize: if still over budget and a client is given, condense the
+       transcript chunk by chunk with the LLM, repeating on the condensed
+       text until it fits (at most COMPACTION_MAX_LEVELS rounds)
+    4. truncate: keep the beginning and end and mark what was cut
+Stages 3 and 4 only run when the previous ones did not fit the budget.
+Tokens saved are recorded per call type (get_compaction_stats).
+"""
+import math
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PROMPT_COMPACTION = os.getenv("PROMPT_COMPACTION", "true").lower() == "true"
+# Max transcript tokens placed in one analysis prompt
+ANALYSIS_TOKEN_BUDGET = int(os.getenv("ANALYSIS_TOKEN_BUDGET", "6000"))
+# Max trend-summary tokens placed in one trend prompt
+TREND_TOKEN_BUDGET = int(os.getenv("TREND_TOKEN_BUDGET", "4000"))
+COMPACTION_CHUNK_TOKENS = int(os.getenv("COMPACTION_CHUNK_TOKENS", "2000"))
+COMPACTION_WORKERS = int(os.getenv("COMPACTION_WORKERS", "4"))
+COMPACTION_MAX_LEVELS = 3
+
+SUMMARY_MODEL = "llama-3.3-70b-versatile"
+SUMMARY_PROMPT = (
+    "Condense this part of a customer service call transcript to at most {words} words. "
+    "Keep who said what, the customer's issue, emotional turning points, exact quotes "
+    "that show frustration or satisfaction, and any commitments made. Reply with the "
+    "condensed transcript only.\n\n{chunk}"
+)
+
+_PRETOKEN = re.compile(r"'(?:s|t|re|ve|m|ll|d)| ?[^\W\d_]+| ?\d{1,3}| ?[^\s\w]+|\s+", re.IGNORECASE)
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def _tiktoken_encoding():
+    """cl100k_base if tiktoken is installed, else False"""
+    global _encoding
+    with _encoding_lock:
+        if _encoding is None:
+            try:
+                import tiktoken
+
+                _encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception:
+                _encoding = False
+    return _encoding
+
+
+def _estimate_piece(piece):
+    word = piece.strip()
+    if not word:
+        return 1
+    if word.isascii():
+        if word[0].isalpha():
+            # Common words are one token; long or rare ones split into ~5-char pieces
+            return 1 if len(word) <= 7 else math.ceil(len(word) / 5)
+        return math.ceil(len(word) / 2) if not word.isdigit() else 1
+    return math.ceil(len(word) / 2)
+
+
+def count_tokens(text) -> int:
+    """Estimated token count of text"""
+    if not text:
+        return 0
+    encoding = _tiktoken_encoding()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return sum(_estimate_piece(m.group(0)) for m in _PRETOKEN.finditer(text))
+
+
+# ---------- cleaning ----------
+
+_FILLERS = re.compile(r"(?<![\w'-])(?:u+h+|u+m+|e+r+m+|hmm+|mm+|a+h+)(?![\w'-])", re.IGNORECASE)
+# Punctuation left behind by a removed filler: "calling, , how" / "that. ." / "Customer: , yes"
+_ORPHAN_PUNCT = re.compile(r"([,.!?:])(?:\s*,|\s+\.)+")
+_PHRASE_FILLERS = re.compile(r",\s*(?:you know|I mean|like|sort of|kind of)\s*,", re.IGNORECASE)
+_STUTTER = re.compile(r"\b(\w{1,3})-\s+(?=\1)", re.IGNORECASE)
+_DOUBLED = re.compile(r"\b(I|the|a|an|to|and|we|you|it|so|but|my|is|that's)(?:,?\s+\1\b)+", re.IGNORECASE)
+_WORD_LOOP = re.compile(r"\b(\w+(?:\s+\w+){0,3}?)(?:[,.]?\s+\1\b){2,}", re.IGNORECASE)
+_NON_SPEECH = re.compile(
+    r"(?:\s*(?:\[(?:music|hold music|silence|inaudible|no speech)\]|\((?:music|hold music)\)|♪+))+",
+    re.IGNORECASE,
+)
+_SPACES = re.compile(r"[ \t]{2,}")
+_SPACE_BEFORE_PUNCT = re.compile(r"(?<=\w)\s+([,.!?])")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_NORMALIZE = re.compile(r"[^\w]+")
+
+
+def clean_transcript(text) -> str:
+    """Drop fillers and disfluencies without changing what was said"""
+    text = _NON_SPEECH.sub(" [music] ", text)
+    text = _PHRASE_FILLERS.sub("", text)
+    text = _FILLERS.sub("", text)
+    text = _STUTTER.sub("", text)
+    text = _DOUBLED.sub(r"\1", text)
+    text = _SPACE_BEFORE_PUNCT.sub(r"\1", text)
+    text = _ORPHAN_PUNCT.sub(r"\1 ", text)
+    return _SPACES.sub(" ", text).strip().lstrip(", ")
+
+
+def collapse_repeats(text, max_period=4) -> str:
+    """
+    Replace repeated runs with one copy and a count
+
+    Consecutive repeats of a block of 1 to max_period sentences (compared
+    case- and punctuation-insensitively) become "<block> [repeated N times]",
+    and words or short phrases said three or more times in a row are kept once.
+    """
+    text = _WORD_LOOP.sub(r"\1", text)
+    sentences = [s for s in _SENTENCE_END.split(text) if s]
+    keys = [_NORMALIZE.sub(" ", s).strip().lower() for s in sentences]
+    out, i = [], 0
+    while i < len(sentences):
+        best_period, best_count = 1, 1
+        for period in range(1, max_period + 1):
+            block = keys[i:i + period]
+            if len(block) < period or not any(block):
+                break
+            count = 1
+            while keys[i + count * period:i + (count + 1) * period] == block:
+                count += 1
+            if count > 1 and count * period > best_count * best_period:
+                best_period, best_count = period, count
+        out.extend(sentences[i:i + best_period])
+        if best_count > 1:
+            out[-1] = f"{out[-1]} [repeated {best_count} times]"
+        i += best_period * best_count
+    return " ".join(out)
+
+
+# ---------- budget fitting ----------
+
+def _split_chunks(text, chunk_tokens):
+    """Split at sentence boundaries into pieces of about chunk_tokens each"""
+    chunks, current, used = [], [], 0
+    for sentence in _SENTENCE_END.split(text):
+        cost = count_tokens(sentence) + 1
+        if current and used + cost > chunk_tokens:
+            chunks.append(" ".join(current))
+            current, used = [], 0
+        current.append(sentence)
+        used += cost
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def _summarize_chunk(client, chunk, target_tokens):
+    completion = client.chat.completions.create(
+        model=SUMMARY_MODEL,
+        messages=[
+            {"role": "user", "content": SUMMARY_PROMPT.format(words=max(30, int(target_tokens * 0.6)), chunk=chunk)}
+        ],
+        temperature=0.2,
+        max_tokens=max(64, int(target_tokens * 1.2)),
+    )
+    return completion.choices[0].message.content.strip()
+
+
+def summarize_to_budget(client, text, budget, chunk_tokens=None):
+    """
+    Condense text chunk by chunk with the LLM until it fits budget
+
+    Each round splits the text into chunks of about chunk_tokens, condenses
+    them concurrently to their share of the budget, and joins the results.
+    Rounds repeat on the condensed text while it is over budget and still
+    shrinking, up to COMPACTION_MAX_LEVELS.
+
+    Returns:
+        tuple: (text, rounds)
+    """
+    chunk_tokens = int(chunk_tokens or COMPACTION_CHUNK_TOKENS)
+    rounds = 0
+    tokens = count_tokens(text)
+    while tokens > budget and rounds < COMPACTION_MAX_LEVELS:
+        chunks = _split_chunks(text, chunk_tokens)
+        ratio = budget / tokens
+        targets = [max(50, int(count_tokens(c) * ratio)) for c in chunks]
+        with ThreadPoolExecutor(max(1, min(COMPACTION_WORKERS, len(chunks))), thread_name_prefix="compact") as pool:
+            parts = list(pool.map(lambda args: _summarize_chunk(client, *args), zip(chunks, targets)))
+        condensed = "\n".join(parts)
+        rounds += 1
+        condensed_tokens = count_tokens(condensed)
+        if condensed_tokens >= tokens:
+            break
+        text, tokens = condensed, condensed_tokens
+    return text, rounds
+
+
+def truncate_to_budget(text, budget) -> str:
+    """Keep the first two thirds and last third of the budget, marking the cut"""
+    total = count_tokens(text)
+    if total <= budget:
+        return text
+    keep_chars = int(len(text) * (budget / total)) - 40
+    head = text[: max(0, keep_chars * 2 // 3)]
+    tail = text[len(text) - max(0, keep_chars // 3):] if keep_chars > 0 else ""
+    return f"{head} [... {total - budget} tokens omitted ...] {tail}".strip()
+
+
+@dataclass
+class CompactionReport:
+    """Token counts before and after compaction"""
+
+    original_tokens: int
+    tokens: int
+    steps: list = field(default_factory=list)
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.original_tokens - self.tokens
+
+
+def compact_transcript(text, budget=None, client=None, label="call_analysis"):
+    """
+    Fit a transcript into a token budget (see module docstring for the stages)
+
+    Args:
+        text: Transcript text
+        budget: Max tokens (default: ANALYSIS_TOKEN_BUDGET)
+        client: Groq client for LLM summarization; without one, an
+            over-budget transcript is truncated instead
+        label: Call type the savings are recorded under
+
+    Returns:
+        tuple: (compacted text, CompactionReport)
+    """
+    budget = int(budget or ANALYSIS_TOKEN_BUDGET)
+    text = "" if text is None else str(text)
+    original = count_tokens(text)
+    report = CompactionReport(original, original)
+    if not PROMPT_COMPACTION or not text:
+        return text, report
+
+    text = collapse_repeats(clean_transcript(text))
+    report.steps.append("clean")
+    tokens = count_tokens(text)
+    if tokens > budget and client is not None:
+        text, rounds = summarize_to_budget(client, text, budget)
+        if rounds:
+            report.steps.append(f"summarize x{rounds}")
+        tokens = count_tokens(text)
+    if tokens > budget:
+        text = truncate_to_budget(text, budget)
+        report.steps.append("truncate")
+        tokens = count_tokens(text)
+    report.tokens = tokens
+    record_compaction(label, report)
+    return text, report
+
+
+def compaction_settings():
+    """Settings that shape compacted prompt text, for the cache keys of results built from it"""
+    if not PROMPT_COMPACTION:
+        return ("compaction off",)
+    return (
+        "compaction", ANALYSIS_TOKEN_BUDGET, COMPACTION_CHUNK_TOKENS, COMPACTION_MAX_LEVELS,
+        SUMMARY_MODEL, SUMMARY_PROMPT,
+    )
+
+
+def fit_prompt(text, budget, label):
+    """Truncate generated prompt text (e.g. a trend summary) to budget, recording savings"""
+    original = count_tokens(text)
+    report = CompactionReport(original, original)
+    if PROMPT_COMPACTION and original > budget:
+        text = truncate_to_budget(text, budget)
+        report.tokens = count_tokens(text)
+        report.steps.append("truncate")
+    record_compaction(label, report)
+    return text, report
+
+
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+def record_compaction(label, report):
+    with _stats_lock:
+        stats = _stats.setdefault(label, {"requests": 0, "compacted": 0, "tokens_in": 0, "tokens_out": 0})
+        stats["requests"] += 1
+        stats["compacted"] += int(report.saved_tokens > 0)
+        stats["tokens_in"] += report.original_tokens
+        stats["tokens_out"] += report.tokens
+
+
+def get_compaction_stats():
+    """
+    Tokens before and after compaction per call type
+
+    Returns:
+        dict: {label: {requests, compacted, tokens_in, tokens_out, saved_per_request}}
+    """
+    with _stats_lock:
+        snapshot = {label: dict(stats) for label, stats in _stats.items()}
+    for stats in snapshot.values():
+        stats["saved_per_request"] = (stats["tokens_in"] - stats["tokens_out"]) / max(1, stats["requests"])
+    return snapshot
@@ -1,21 +1,486 @@
 """Audio transcription service using Groq Whisper"""
+import asyncio
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 
-def transcribe_audio(client, audio_file, filename):
+from services.audio_processing import (
+    CODECS,
+    SpeechTimeline,
+    decode_audio,
+    downmix,
+    encode_audio,
+    resample,
+    split_audio,
+    trim_non_speech,
+)
+from services.result_cache import build_cache, make_key
+
+WHISPER_MODEL = "whisper-large-v3"
+TRANSCRIPTION_LANGUAGE = "en"
+
+# Groq rejects uploads over 25 MB; larger files are split into time windows
+MAX_UPLOAD_BYTES = 25 * 1024 * 1024
+CHUNK_SECONDS = float(os.getenv("TRANSCRIBE_CHUNK_SECONDS", "600"))
+CHUNK_OVERLAP_SECONDS = float(os.getenv("TRANSCRIBE_CHUNK_OVERLAP_SECONDS", "5"))
+CHUNK_WORKERS = int(os.getenv("TRANSCRIBE_CHUNK_WORKERS", "4"))
+
+TRANSCRIPT_CACHE_MAX_BYTES = int(float(os.getenv("TRANSCRIPT_CACHE_MAX_MB", "256")) * 1024 * 1024)
+
+# Downmix, resample and re-encode audio before upload (Whisper works on 16 kHz mono)
+AUDIO_PREPROCESS = os.getenv("AUDIO_PREPROCESS", "false").lower() == "true"
+AUDIO_PREPROCESS_CODEC = os.getenv("AUDIO_PREPROCESS_CODEC", "flac").strip().lower()
+AUDIO_PREPROCESS_SAMPLE_RATE = int(os.getenv("AUDIO_PREPROCESS_SAMPLE_RATE", "16000"))
+# Assumed upload bandwidth for the upload-time-saved estimate
+AUDIO_UPLOAD_MBPS = float(os.getenv("AUDIO_UPLOAD_MBPS", "20"))
+
+# Cut silence and hold music before upload (per call: transcribe_audio(trim_silence=...))
+VAD_TRIM = os.getenv("VAD_TRIM", "false").lower() == "true"
+VAD_OPTIONS = {
+    "threshold_db": float(os.getenv("VAD_THRESHOLD_DB", "12")),
+    "min_speech_ms": int(os.getenv("VAD_MIN_SPEECH_MS", "250")),
+    "min_silence_ms": int(os.getenv("VAD_MIN_SILENCE_MS", "600")),
+    "pad_ms": int(os.getenv("VAD_PAD_MS", "200")),
+    # Sustained sound varying less than this (dB over a second) counts as hold music; 0 disables
+    "music_std_db": float(os.getenv("VAD_MUSIC_STD_DB", "2.5")),
+}
+
+if AUDIO_PREPROCESS_CODEC not in CODECS:
+    raise ValueError(
+        f"Unknown AUDIO_PREPROCESS_CODEC '{AUDIO_PREPROCESS_CODEC}'. Expected one of: {', '.join(CODECS)}"
+    )
+
+_transcript_cache = None
+_transcript_cache_lock = threading.Lock()
+
+
+def _get_transcript_cache():
+    global _transcript_cache
+    with _transcript_cache_lock:
+        if _transcript_cache is None:
+            _transcript_cache = build_cache("transcripts", TRANSCRIPT_CACHE_MAX_BYTES)
+    return _transcript_cache
+
+
+def get_transcript_cache_stats():
+    """Hit/miss/eviction counters for the transcript cache"""
+    return _get_transcript_cache().stats.snapshot()
+
+
+@dataclass
+class PreprocessReport:
+    """Size and time effect of preprocessing one file"""
+
+    filename: str
+    bytes_in: int
+    bytes_out: int
+    seconds: float
+    applied: bool
+    note: str = ""
+    timeline: SpeechTimeline | None = None
+
+    @property
+    def upload_seconds_saved(self) -> float:
+        """Estimated upload time saved at AUDIO_UPLOAD_MBPS, net of preprocessing time"""
+        return (self.bytes_in - self.bytes_out) * 8 / (AUDIO_UPLOAD_MBPS * 1e6) - self.seconds
+
+
+_preprocess_lock = threading.Lock()
+_preprocess_reports = deque(maxlen=100)
+_preprocess_totals = {
+    "files": 0, "applied": 0, "bytes_in": 0, "bytes_out": 0, "seconds": 0.0, "upload_seconds_saved": 0.0,
+    "trimmed": 0, "audio_seconds": 0.0, "removed_seconds": 0.0,
+}
+_warned_codec_fallback = False
+
+
+def _record_preprocess(report):
+    with _preprocess_lock:
+        _preprocess_reports.append(report)
+        _preprocess_totals["files"] += 1
+        _preprocess_totals["applied"] += int(report.applied)
+        _preprocess_totals["bytes_in"] += report.bytes_in
+        _preprocess_totals["bytes_out"] += report.bytes_out
+        _preprocess_totals["seconds"] += report.seconds
+        _preprocess_totals["upload_seconds_saved"] += report.upload_seconds_saved
+        if report.timeline is not None:
+            _preprocess_totals["trimmed"] += 1
+            _preprocess_totals["audio_seconds"] += report.timeline.original_seconds
+            _preprocess_totals["removed_seconds"] += report.timeline.removed_seconds
+
+
+def get_preprocess_stats():
     """
-    Transcribe audio file to text using Groq Whisper
-    
+    Bytes, upload time and audio seconds saved by audio preprocessing
+
+    Returns:
+        dict: Totals (files, applied, bytes_in, bytes_out, seconds,
+        upload_seconds_saved; trimmed, audio_seconds, removed_seconds for
+        files run through the silence trimmer) plus "recent", the latest
+        PreprocessReports
+    """
+    with _preprocess_lock:
+        stats = dict(_preprocess_totals)
+        stats["recent"] = list(_preprocess_reports)
+    return stats
+
+
+def preprocess_audio(audio_bytes, filename, codec=None, sample_rate=None, trim_silence=False):
+    """
+    Decode, downmix to mono, resample and re-encode audio for upload
+
+    The original is kept when it cannot be decoded (e.g. MP3 without
+    pydub/ffmpeg) or when re-encoding would not make it smaller, as with an
+    already compact MP3. Without soundfile, FLAC and Opus fall back to WAV.
+
     Args:
-        client: Groq client instance
-        audio_file: Audio file bytes
+        audio_bytes: Audio file bytes
         filename: Name of the audio file
-        
+        codec: "flac", "opus" or "wav" (default: AUDIO_PREPROCESS_CODEC)
+        sample_rate: Target rate in Hz (default: AUDIO_PREPROCESS_SAMPLE_RATE)
+        trim_silence: Also cut silence and hold music (trim_non_speech with
+            VAD_OPTIONS); the report's timeline maps trimmed times back
+
     Returns:
-        str: Transcribed text
+        tuple: (audio bytes, filename, PreprocessReport)
     """
+    global _warned_codec_fallback
+    codec = codec or AUDIO_PREPROCESS_CODEC
+    sample_rate = int(sample_rate or AUDIO_PREPROCESS_SAMPLE_RATE)
+    start = time.perf_counter()
+
+    timeline = None
+
+    def _report(data, applied, note=""):
+        report = PreprocessReport(
+            filename, len(audio_bytes), len(data), time.perf_counter() - start, applied, note, timeline
+        )
+        _record_preprocess(report)
+        return report
+
+    try:
+        samples, source_rate = decode_audio(audio_bytes, filename)
+    except Exception as e:
+        return audio_bytes, filename, _report(audio_bytes, False, f"not decoded: {e}")
+
+    samples = downmix(samples)
+    if trim_silence:
+        samples, timeline = trim_non_speech(samples, source_rate, **VAD_OPTIONS)
+    samples = resample(samples, source_rate, sample_rate)
+    try:
+        encoded, extension = encode_audio(samples, sample_rate, codec)
+    except ImportError as e:
+        if not _warned_codec_fallback:
+            print(f"Warning: {e}; preprocessed audio is uploaded as WAV")
+            _warned_codec_fallback = True
+        encoded, extension = encode_audio(samples, sample_rate, "wav")
+
+    trimmed = timeline is not None and timeline.removed_seconds > 0
+    if len(encoded) >= len(audio_bytes) and not trimmed:
+        return audio_bytes, filename, _report(audio_bytes, False, "original is smaller")
+    stem = os.path.splitext(os.path.basename(str(filename)))[0] or "audio"
+    return encoded, f"{stem}.{extension}", _report(encoded, True)
+
+
+def _request_transcription(client, audio_bytes, filename):
     transcription = client.audio.transcriptions.create(
-        file=(filename, audio_file),
-        model="whisper-large-v3",
+        file=(filename, audio_bytes),
+        model=WHISPER_MODEL,
         response_format="json",
-        language="en"
+        language=TRANSCRIPTION_LANGUAGE
     )
     return transcription.text
+
+
+def _request_segments(client, audio_bytes, filename):
+    transcription = client.audio.transcriptions.create(
+        file=(filename, audio_bytes),
+        model=WHISPER_MODEL,
+        response_format="verbose_json",
+        language=TRANSCRIPTION_LANGUAGE
+    )
+    segments = []
+    # The Groq SDK returns verbose_json segments as plain dicts
+    for segment in getattr(transcription, "segments", None) or []:
+        field = segment.get if isinstance(segment, dict) else lambda name, default: getattr(segment, name, default)
+        segments.append({
+            "start": float(field("start", 0.0)),
+            "end": float(field("end", 0.0)),
+            "text": str(field("text", "")).strip(),
+        })
+    return transcription.text, segments
+
+
+async def _request_transcription_async(client, audio_bytes, filename):
+    transcription = await client.audio.transcriptions.create(
+        file=(filename, audio_bytes),
+        model=WHISPER_MODEL,
+        response_format="json",
+        language=TRANSCRIPTION_LANGUAGE
+    )
+    return transcription.text
+
+
+def _overlap_words(text):
+    return [re.sub(r"[^\w']", "", w).lower() for w in text.split()]
+
+
+def stitch_transcripts(texts, max_overlap_words=60, min_overlap_words=2):
+    """
+    Join chunk transcripts, dropping words repeated across the overlap
+
+    The longest run of words that ends the text so far and starts the next
+    chunk (compared case- and punctuation-insensitively) is kept only once.
+
+    Args:
+        texts: Chunk transcripts in playback order
+        max_overlap_words: Longest overlap to look for
+        min_overlap_words: Shorter matches are treated as coincidence
+
+    Returns:
+        str: Combined transcript
+    """
+    words = []
+    for text in texts:
+        incoming = (text or "").split()
+        if not incoming:
+            continue
+        tail = _overlap_words(" ".join(words[-max_overlap_words:]))
+        head = _overlap_words(" ".join(incoming[:max_overlap_words]))
+        overlap = 0
+        for size in range(min(len(tail), len(head)), min_overlap_words - 1, -1):
+            if tail[-size:] == head[:size]:
+                overlap = size
+                break
+        words.extend(incoming[overlap:])
+    return " ".join(words)
+
+
+def transcribe_audio_chunked(client, audio_file, filename, chunk_seconds=None,
+                             overlap_seconds=None, workers=None):
+    """
+    Transcribe a long recording as overlapping chunks in parallel
+
+    Args:
+        client: Groq client instance
+        audio_file: Audio file bytes
+        filename: Name of the audio file
+        chunk_seconds: Window length (default: TRANSCRIBE_CHUNK_SECONDS)
+        overlap_seconds: Window overlap (default: TRANSCRIBE_CHUNK_OVERLAP_SECONDS)
+        workers: Concurrent chunk uploads (default: TRANSCRIBE_CHUNK_WORKERS)
+
+    Returns:
+        tuple: (transcript: str, chunk_timings: list[dict]) with one timing
+        entry per chunk (index, start/end seconds, bytes, request seconds)
+    """
+    chunks = split_audio(
+        audio_file,
+        filename,
+        chunk_seconds or CHUNK_SECONDS,
+        CHUNK_OVERLAP_SECONDS if overlap_seconds is None else overlap_seconds,
+        max_chunk_bytes=MAX_UPLOAD_BYTES,
+        sample_rate=AUDIO_PREPROCESS_SAMPLE_RATE,
+        codec=AUDIO_PREPROCESS_CODEC,
+    )
+
+    def _run(chunk):
+        start = time.perf_counter()
+        text = _request_transcription(client, chunk.data, chunk.filename)
+        return text, {
+            "index": chunk.index,
+            "start_seconds": chunk.start_seconds,
+            "end_seconds": chunk.end_seconds,
+            "bytes": len(chunk.data),
+            "seconds": time.perf_counter() - start,
+        }
+
+    with ThreadPoolExecutor(max(1, int(workers or CHUNK_WORKERS)), thread_name_prefix="chunk") as pool:
+        results = list(pool.map(_run, chunks))
+
+    return stitch_transcripts([text for text, _ in results]), [timing for _, timing in results]
+
+
+def _transcript_cache_key(audio_file, trim_silence):
+    # Converted or trimmed audio can transcribe differently, so each setting is part of the key
+    parts = [audio_file, WHISPER_MODEL, TRANSCRIPTION_LANGUAGE]
+    if AUDIO_PREPROCESS or trim_silence:
+        parts += ["mono", AUDIO_PREPROCESS_CODEC, AUDIO_PREPROCESS_SAMPLE_RATE]
+    if trim_silence:
+        parts += ["vad", *sorted(VAD_OPTIONS.items())]
+    return make_key(*parts)
+
+
+def transcribe_audio(client, audio_file, filename, use_cache=True, chunked=None, trim_silence=None):
+    """
+    Transcribe audio file to text using Groq Whisper
+
+    Identical audio is only sent to Whisper once: results are cached by a
+    SHA-256 of the audio bytes plus model, language and the preprocessing
+    settings in effect. With
+    AUDIO_PREPROCESS=true, audio is converted to compact 16 kHz mono first
+    (preprocess_audio). With trim_silence, silence and hold music are cut
+    out as well, so Whisper neither bills them nor invents text over them.
+    Files still over the 25 MB upload limit are split and transcribed in
+    parallel chunks.
+
+    Args:
+        client: Groq client instance
+        audio_file: Audio file bytes
+        filename: Name of the audio file
+        use_cache: Look up and store the transcript in the cache
+        chunked: Force (True) or disable (False) chunked transcription;
+            by default only files over MAX_UPLOAD_BYTES are chunked
+        trim_silence: Cut non-speech before upload (default: VAD_TRIM)
+
+    Returns:
+        str: Transcribed text
+    """
+    trim_silence = VAD_TRIM if trim_silence is None else trim_silence
+    cache_key = _transcript_cache_key(audio_file, trim_silence)
+    if use_cache:
+        cached = _get_transcript_cache().get(cache_key)
+        if cached is not None:
+            return cached
+
+    if AUDIO_PREPROCESS or trim_silence:
+        audio_file, filename, _ = preprocess_audio(audio_file, filename, trim_silence=trim_silence)
+    if chunked is None:
+        chunked = len(audio_file) > MAX_UPLOAD_BYTES
+    if chunked:
+        text, _ = transcribe_audio_chunked(client, audio_file, filename)
+    else:
+        text = _request_transcription(client, audio_file, filename)
+
+    if use_cache:
+        _get_transcript_cache().set(cache_key, text)
+    return text
+
+
+def transcribe_audio_segments(client, audio_file, filename, use_cache=True, trim_silence=None):
+    """
+    Transcribe audio with Whisper segment timestamps on the original recording
+
+    Preprocessing, trimming and chunking work as in transcribe_audio.
+    Whisper is asked for verbose_json, and each segment's start and end
+    are shifted by its chunk's offset and mapped through the SpeechTimeline
+    of the trimmed audio, so they point into the uploaded recording.
+
+    Args:
+        client: Groq client instance
+        audio_file: Audio file bytes
+        filename: Name of the audio file
+        use_cache: Look up and store the result in the transcript cache
+        trim_silence: Cut non-speech before upload (default: VAD_TRIM)
+
+    Returns:
+        tuple: (transcript: str, segments: list[dict] with start/end seconds
+        and text, SpeechTimeline of the kept spans or None if not trimmed)
+    """
+    trim_silence = VAD_TRIM if trim_silence is None else trim_silence
+    cache_key = make_key(_transcript_cache_key(audio_file, trim_silence), "segments")
+    if use_cache:
+        cached = _get_transcript_cache().get(cache_key)
+        if cached is not None:
+            timeline = None
+            if cached["timeline"]:
+                spans = [tuple(span) for span in cached["timeline"]["spans"]]
+                timeline = SpeechTimeline(spans, cached["timeline"]["original_seconds"])
+            return cached["text"], cached["segments"], timeline
+
+    timeline = None
+    if AUDIO_PREPROCESS or trim_silence:
+        audio_file, filename, report = preprocess_audio(audio_file, filename, trim_silence=trim_silence)
+        timeline = report.timeline
+    if len(audio_file) > MAX_UPLOAD_BYTES:
+        chunks = split_audio(
+            audio_file, filename, CHUNK_SECONDS, CHUNK_OVERLAP_SECONDS, max_chunk_bytes=MAX_UPLOAD_BYTES,
+            sample_rate=AUDIO_PREPROCESS_SAMPLE_RATE, codec=AUDIO_PREPROCESS_CODEC,
+        )
+        with ThreadPoolExecutor(max(1, CHUNK_WORKERS), thread_name_prefix="chunk") as pool:
+            results = list(pool.map(lambda chunk: _request_segments(client, chunk.data, chunk.filename), chunks))
+        text = stitch_transcripts([chunk_text for chunk_text, _ in results])
+        segments = []
+        for chunk, (_, chunk_segments) in zip(chunks, results):
+            for segment in chunk_segments:
+                start = segment["start"] + chunk.start_seconds
+                end = segment["end"] + chunk.start_seconds
+                # The overlap with the previous chunk is already covered up to its last segment's end
+                if segments:
+                    if end <= segments[-1]["end"]:
+                        continue
+                    start = max(start, segments[-1]["end"])
+                segments.append({**segment, "start": start, "end": end})
+    else:
+        text, segments = _request_segments(client, audio_file, filename)
+
+    if timeline is not None:
+        segments = [
+            {**segment, "start": timeline.to_original(segment["start"]), "end": timeline.to_original(segment["end"])}
+            for segment in segments
+        ]
+    if use_cache:
+        _get_transcript_cache().set(cache_key, {
+            "text": text,
+            "segments": segments,
+            "timeline": None if timeline is None else {
+                "spans": timeline.spans, "original_seconds": timeline.original_seconds
+            },
+        })
+    return text, segments, timeline
+
+
+async def transcribe_audio_async(client, audio_file, filename, use_cache=True, chunked=None, trim_silence=None):
+    """
+    Async variant of transcribe_audio for an AsyncGroq client
+
+    Cache lookups, preprocessing and audio splitting run in worker threads so the event
+    loop keeps serving other requests. Chunks of a long recording are sent
+    concurrently, at most TRANSCRIBE_CHUNK_WORKERS at a time.
+
+    Args:
+        client: AsyncGroq client instance
+        audio_file: Audio file bytes
+        filename: Name of the audio file
+        use_cache: Look up and store the transcript in the cache
+        chunked: Force (True) or disable (False) chunked transcription
+        trim_silence: Cut non-speech before upload (default: VAD_TRIM)
+
+    Returns:
+        str: Transcribed text
+    """
+    trim_silence = VAD_TRIM if trim_silence is None else trim_silence
+    cache_key = _transcript_cache_key(audio_file, trim_silence)
+    if use_cache:
+        cached = await asyncio.to_thread(_get_transcript_cache().get, cache_key)
+        if cached is not None:
+            return cached
+
+    if AUDIO_PREPROCESS or trim_silence:
+        audio_file, filename, _ = await asyncio.to_thread(
+            preprocess_audio, audio_file, filename, trim_silence=trim_silence
+        )
+    if chunked is None:
+        chunked = len(audio_file) > MAX_UPLOAD_BYTES
+    if chunked:
+        chunks = await asyncio.to_thread(
+            split_audio, audio_file, filename, CHUNK_SECONDS, CHUNK_OVERLAP_SECONDS,
+            max_chunk_bytes=MAX_UPLOAD_BYTES, sample_rate=AUDIO_PREPROCESS_SAMPLE_RATE,
+            codec=AUDIO_PREPROCESS_CODEC,
+        )
+        limit = asyncio.Semaphore(max(1, CHUNK_WORKERS))
+
+        async def _run(chunk):
+            async with limit:
+                return await _request_transcription_async(client, chunk.data, chunk.filename)
+
+        text = stitch_transcripts(await asyncio.gather(*(_run(chunk) for chunk in chunks)))
+    else:
+        text = await _request_transcription_async(client, audio_file, filename)
+
+    if use_cache:
+        await asyncio.to_thread(_get_transcript_cache().set, cache_key, text)
+    return text
@@ -1,22 +1,20 @@
 """Trend analysis service for historical call data"""
+import time
 
-def analyze_trends(client, call_data_summary):
-    """
-    Analyze trends across multiple call records
-    
-    Args:
-        client: Groq client instance
-        call_data_summary: Summary of historical call data
-        
-    Returns:
-        str: Trend analysis with insights and recommendations
-    """
+from services.streaming import CompletionStream, record_latency
+from services.token_budget import TREND_TOKEN_BUDGET, fit_prompt
+
+LATENCY_LABEL = "trend_analysis"
+
+
+def _completion_kwargs(call_data_summary):
+    call_data_summary, _ = fit_prompt(call_data_summary, TREND_TOKEN_BUDGET, LATENCY_LABEL)
     prompt = f"""Analyze these call records:
 {call_data_summary}
 
 Provide: Trend Analysis, Critical Insights, and Recommendations."""
 
-    completion = client.chat.completions.create(
+    return dict(
         model="llama-3.3-70b-versatile",
         messages=[
             {"role": "system", "content": "You are a customer experience analyst. Find patterns and give actionable insights."},
@@ -24,5 +22,55 @@ Provide: Trend Analysis, Critical Insights, and Recommendations."""
         ],
         temperature=0.3
     )
+
+
+def analyze_trends(client, call_data_summary):
+    """
+    Analyze trends across multiple call records
     
+    Args:
+        client: Groq client instance
+        call_data_summary: Summary of historical call data
+        
+    Returns:
+        str: Trend analysis with insights and recommendations
+    """
+    start = time.perf_counter()
+    completion = client.chat.completions.create(**_completion_kwargs(call_data_summary))
+    elapsed = time.perf_counter() - start
+    record_latency(LATENCY_LABEL, elapsed, elapsed)
+    return completion.choices[0].message.content
+
+
+def stream_trends(client, call_data_summary):
+    """
+    Analyze trends, streaming the reply as it is generated
+
+    Args:
+        client: Groq client instance
+        call_data_summary: Summary of historical call data
+
+    Returns:
+        CompletionStream: Yields markdown deltas; .text is the full analysis
+            once consumed
+    """
+    request = _completion_kwargs(call_data_summary)
+    return CompletionStream(lambda: client.chat.completions.create(stream=True, **request), LATENCY_LABEL)
+
+
+async def analyze_trends_async(client, call_data_summary):
+    """
+    Async variant of analyze_trends for an AsyncGroq client
+
+    Args:
+        client: AsyncGroq client instance
+        call_data_summary: Summary of historical call data
+
+    Returns:
+        str: Trend analysis with insights and recommendations
+    """
+    start = time.perf_counter()
+    completion = await client.chat.completions.create(**_completion_kwargs(call_data_summary))
+    elapsed = time.perf_counter() - start
+    record_latency(LATENCY_LABEL, elapsed, elapsed)
     return completion.choices[0].message.content
@@ -0,0 +1,144 @@
+"""Processed-upload ledger, so Streamlit reruns do not redo finished uploads
+
+st.file_uploader keeps its files across reruns, so every widget interaction
+re-executes the upload block. Each upload is keyed by its uploader file_id
+plus the SHA-256 of its bytes (hashed once per file_id). Results for keys in
+the session ledger are rendered again as they are. Audio whose hash is
+already in the record store is shown from the saved record instead of being
+transcribed, analyzed and saved a second time. Reprocessing is an explicit
+action that forgets the keys first.
+
+With INGEST_MODE=queue, uploads are handed to the job queue instead, and
+finished jobs move into the ledger as the app polls them.
+"""
+from datetime import datetime
+
+from data.models import CallAnalysis
+from data.repository import get_records_by_audio_hash
+from data.schema import AUDIO_HASH_COLUMN, audio_digest
+from services.ingestion_pipeline import IngestionResult
+from services.job_queue import DONE, enqueue, get_jobs
+
+LEDGER_STATE_KEY = "upload_ledger"
+DIGEST_STATE_KEY = "upload_digests"
+JOBS_STATE_KEY = "upload_jobs"
+
+
+def upload_keys(state, uploads):
+    """
+    Ledger keys for uploaded files
+
+    Args:
+        state: Session state mapping (st.session_state)
+        uploads: Files returned by st.file_uploader
+
+    Returns:
+        list: (file_id, audio hash) per upload
+    """
+    digests = state.setdefault(DIGEST_STATE_KEY, {})
+    keys = []
+    for upload in uploads:
+        if upload.file_id not in digests:
+            digests[upload.file_id] = audio_digest(upload.getvalue())
+        keys.append((upload.file_id, digests[upload.file_id]))
+    return keys
+
+
+def get_ledger(state):
+    """{(file_id, audio hash): IngestionResult} for uploads processed this session"""
+    return state.setdefault(LEDGER_STATE_KEY, {})
+
+
+def record_results(state, results_by_key):
+    """Add processed uploads (successful or not) to the session ledger"""
+    get_ledger(state).update(results_by_key)
+
+
+def forget(state, keys):
+    """Drop uploads from the session ledger so the next run processes them again"""
+    ledger = get_ledger(state)
+    jobs = pending_jobs(state)
+    for key in keys:
+        ledger.pop(key, None)
+        jobs.pop(key, None)
+
+
+def pending_jobs(state):
+    """{(file_id, audio hash): job id} for uploads queued this session and not finished yet"""
+    return state.setdefault(JOBS_STATE_KEY, {})
+
+
+def enqueue_uploads(state, keys, uploads, use_cache=True, trim_silence=None):
+    """Queue uploads for the job workers, once per key"""
+    jobs = pending_jobs(state)
+    for key, upload in zip(keys, uploads):
+        if key not in jobs:
+            jobs[key] = enqueue(
+                upload.name, upload.getvalue(), key[1], use_cache=use_cache, trim_silence=trim_silence
+            )
+
+
+def collect_jobs(state):
+    """
+    Move finished jobs from pending_jobs into the session ledger
+
+    Returns:
+        tuple: ({key: IngestionResult} newly finished, {key: Job} still queued or running)
+    """
+    jobs = pending_jobs(state)
+    states = get_jobs(jobs.values())
+    finished, running = {}, {}
+    for key, job_id in list(jobs.items()):
+        job = states.get(job_id)
+        if job is None:
+            # Purged from the queue
+            del jobs[key]
+            continue
+        if not job.finished:
+            running[key] = job
+            continue
+        done = job.status == DONE
+        finished[key] = IngestionResult(
+            0,
+            job.filename,
+            transcript=job.transcript,
+            analysis=CallAnalysis.from_dict(job.analysis) if job.analysis else None,
+            error=None if done else job.error,
+            failed_stage=None if done else "job",
+            audio_hash=key[1],
+            saved_at=datetime.fromtimestamp(job.updated_at) if done else None,
+        )
+        del jobs[key]
+    record_results(state, finished)
+    return finished, running
+
+
+def stored_results(keys, filenames):
+    """
+    Results for uploads whose audio is already in the record store
+
+    Args:
+        keys: (file_id, audio hash) per upload
+        filenames: Upload file names, aligned with keys
+
+    Returns:
+        dict: {key: IngestionResult} with saved_at set to the record's Date
+    """
+    records = get_records_by_audio_hash(digest for _, digest in keys)
+    if records.empty:
+        return {}
+    by_hash = {row[AUDIO_HASH_COLUMN]: row for _, row in records.iterrows()}
+    found = {}
+    for index, (key, filename) in enumerate(zip(keys, filenames), 1):
+        row = by_hash.get(key[1])
+        if row is None:
+            continue
+        found[key] = IngestionResult(
+            index,
+            filename,
+            transcript=row["Transcript"],
+            analysis=CallAnalysis.from_markdown(row["Analysis"]),
+            audio_hash=key[1],
+            saved_at=row["Date"],
+        )
+    return found